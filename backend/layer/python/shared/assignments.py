@@ -0,0 +1,395 @@
+"""
+Task assignment (locking) helpers.
+A task is claimed by a single transaction that takes one of its open slots
+and creates the Assignment record. A task needing several independent
+submissions (requiredSubmissions > 1) stays 'Published' until its last
+slot is taken, so several workers can hold it at once; taking the last
+slot flips it to 'Assigned'. Batch claims lock several tasks under one
+lease record in the same way.
+
+Leases last a per-task-type duration and can be renewed by the worker
+(heartbeat) while still active, up to MAX_LEASE_RENEWALS times.
+"""
+import time
+import uuid
+import boto3
+from typing import List, Dict, Any, Optional, Tuple
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+from .config import config
+from .logging import logger
+from .models import TaskStatus, AssignmentStatus, TASK_TYPE_LEASE_SECONDS
+from .status_index import status_shard_key
+
+dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
+
+_deserializer = TypeDeserializer()
+
+# Default time a worker has to submit before the assignment expires
+ASSIGNMENT_TTL_SECONDS = 600
+
+# Assignment records of this type cover several tasks (batch claims)
+ASSIGNMENT_TYPE_LEASE = 'Lease'
+
+
+def lease_seconds_for(task_type: Optional[str]) -> int:
+    """Initial lease (and renewal extension) for a task type."""
+    return TASK_TYPE_LEASE_SECONDS.get(task_type, ASSIGNMENT_TTL_SECONDS)
+
+
+def task_slot_update(task_id: str, worker_id: str, expires_at: int, last_slot: bool) -> Dict[str, Any]:
+    """
+    Transaction item taking one open slot of a Published task for a worker.
+
+    DynamoDB can't branch inside an update, so there are two variants: the
+    last slot also moves the task to Assigned, any other slot leaves it
+    Published. Each is conditioned on being the right one; a worker never
+    holds two slots of the same task. Tasks without slot counters (created
+    before requiredSubmissions) have a single slot, so their counter starts
+    from one rather than being created at -1.
+
+    Args:
+        task_id: Task to claim
+        worker_id: Worker taking the slot
+        expires_at: Lease end, kept on the task as a hint
+        last_slot: Whether this is expected to be the task's last open slot
+    """
+    values = {
+        ':published_status': TaskStatus.PUBLISHED,
+        ':expires_at': expires_at,
+        ':one': 1,
+        ':worker_id': worker_id,
+        ':worker_set': {worker_id}
+    }
+    condition = '#status = :published_status AND NOT contains(workerIds, :worker_id)'
+    update = (
+        'SET leaseExpiresAt = :expires_at, openSlots = if_not_exists(openSlots, :one) - :one '
+        'ADD activeAssignments :one, workerIds :worker_set'
+    )
+
+    if last_slot:
+        condition += ' AND (attribute_not_exists(openSlots) OR openSlots = :one)'
+        update = update.replace('SET ', 'SET #status = :assigned_status, statusShard = :assigned_shard, ')
+        values[':assigned_status'] = TaskStatus.ASSIGNED
+        values[':assigned_shard'] = status_shard_key(TaskStatus.ASSIGNED, task_id)
+    else:
+        condition += ' AND openSlots > :one'
+
+    return {
+        'Update': {
+            'TableName': config.TASKS_TABLE,
+            'Key': {'taskId': task_id},
+            'UpdateExpression': update,
+            'ConditionExpression': condition,
+            'ExpressionAttributeNames': {'#status': 'status'},
+            'ExpressionAttributeValues': values,
+            # Tell the loser why: the task's current state
+            'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+        }
+    }
+
+
+def slot_available(task: Optional[Dict[str, Any]], worker_id: str) -> Optional[bool]:
+    """
+    Check a task (as returned by a failed claim) for a slot this worker can take.
+
+    Returns:
+        None if no slot is available, otherwise whether it is the last one
+    """
+    if not task or task.get('status') != TaskStatus.PUBLISHED:
+        return None
+    if worker_id in (task.get('workerIds') or set()):
+        return None
+    open_slots = int(task.get('openSlots', 1))
+    if open_slots < 1:
+        return None
+    return open_slots == 1
+
+
+def try_lock_task(
+    task_id: str,
+    worker_id: str,
+    ttl_seconds: int = ASSIGNMENT_TTL_SECONDS,
+    extra_attributes: Optional[Dict[str, Any]] = None,
+    open_slots: Optional[int] = None
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Atomically take an open slot of a Published task for a worker.
+
+    Args:
+        task_id: Task to lock
+        worker_id: Worker claiming the task
+        ttl_seconds: Seconds until the assignment expires
+        extra_attributes: Additional attributes stored on the assignment
+        open_slots: The caller's (possibly stale) view of the task's open
+                    slots; a wrong guess costs one retry
+
+    Returns:
+        tuple: (assignment, None) on success, or (None, current_task) when the
+               task is no longer available (current_task is None if it doesn't exist)
+
+    Raises:
+        ClientError: For DynamoDB errors other than a lost race
+    """
+    now = int(time.time())
+    expires_at = now + ttl_seconds
+    assignment = {
+        **(extra_attributes or {}),
+        'assignmentId': str(uuid.uuid4()),
+        'taskId': task_id,
+        'workerId': worker_id,
+        'status': AssignmentStatus.ASSIGNED,
+        'expiresAt': expires_at,
+        'leaseSeconds': ttl_seconds,
+        'createdAt': str(now)
+    }
+
+    last_slot = int(open_slots or 1) <= 1
+
+    # Second round only when the first guessed the wrong slot variant
+    for _ in range(2):
+        try:
+            # Resource client: values are plain Python types, serialized by boto3
+            dynamodb.meta.client.transact_write_items(
+                TransactItems=[
+                    task_slot_update(task_id, worker_id, expires_at, last_slot),
+                    {
+                        'Put': {
+                            'TableName': config.ASSIGNMENTS_TABLE,
+                            'Item': assignment,
+                            # Ensure assignment doesn't already exist for this ID (unlikely with uuid)
+                            'ConditionExpression': 'attribute_not_exists(assignmentId)'
+                        }
+                    }
+                ]
+            )
+            return assignment, None
+
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            reasons = e.response.get('CancellationReasons') or [{}]
+            current_task = deserialize_item(reasons[0].get('Item'))
+            available = slot_available(current_task, worker_id)
+            if available is None or available == last_slot:
+                # Another worker won the race (or the task left 'Published')
+                logger.debug(f"Lock lost for task {task_id}")
+                return None, current_task
+            last_slot = available
+
+    return None, current_task
+
+
+def lock_task(
+    task_id: str,
+    worker_id: str,
+    ttl_seconds: int = ASSIGNMENT_TTL_SECONDS,
+    open_slots: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Atomically lock a Published task for a worker.
+
+    Returns:
+        The new assignment dict, or None if the task is no longer available
+    """
+    assignment, _ = try_lock_task(task_id, worker_id, ttl_seconds, open_slots=open_slots)
+    return assignment
+
+
+def deserialize_item(item: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Convert a low-level (typed) item from CancellationReasons to Python types."""
+    if not item:
+        return None
+    return {k: _deserializer.deserialize(v) for k, v in item.items()}
+
+
+# One TransactWriteItems call holds up to 100 items: K task updates + 1 lease
+MAX_BATCH_CLAIM = 99
+
+# Rounds of dropping contended tasks before settling for what was claimed
+BATCH_CLAIM_ROUNDS = 3
+
+
+def claim_task_batch(
+    task_ids: List[str],
+    worker_id: str,
+    ttl_seconds: int = ASSIGNMENT_TTL_SECONDS,
+    open_slots: Optional[Dict[str, int]] = None
+) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """
+    Lock several Published tasks for one worker under a single lease.
+
+    All tasks and the lease record are written in one transaction. If some
+    tasks were taken in the meantime, the transaction is retried without
+    them (partial claim), up to BATCH_CLAIM_ROUNDS times. Tasks that failed
+    only because their slot count was guessed wrong are kept and retried
+    with the right slot variant.
+
+    Args:
+        task_ids: Candidate task IDs (at most MAX_BATCH_CLAIM are used)
+        worker_id: Worker claiming the tasks
+        ttl_seconds: Seconds until the lease expires
+        open_slots: The caller's view of each task's open slots (default 1)
+
+    Returns:
+        tuple: (lease, unavailable_task_ids) - lease is None if nothing was claimed
+    """
+    remaining = list(dict.fromkeys(task_ids))[:MAX_BATCH_CLAIM]
+    last_slot = {t: int((open_slots or {}).get(t) or 1) <= 1 for t in remaining}
+    unavailable: List[str] = []
+
+    for _ in range(BATCH_CLAIM_ROUNDS):
+        if not remaining:
+            break
+
+        now = int(time.time())
+        expires_at = now + ttl_seconds
+        lease = {
+            'assignmentId': str(uuid.uuid4()),
+            'type': ASSIGNMENT_TYPE_LEASE,
+            'workerId': worker_id,
+            'taskIds': remaining,
+            'pendingTaskIds': set(remaining),
+            'status': AssignmentStatus.ASSIGNED,
+            'expiresAt': expires_at,
+            'leaseSeconds': ttl_seconds,
+            'createdAt': str(now)
+        }
+
+        transact_items = [
+            task_slot_update(task_id, worker_id, expires_at, last_slot[task_id])
+            for task_id in remaining
+        ]
+        transact_items.append({
+            'Put': {
+                'TableName': config.ASSIGNMENTS_TABLE,
+                'Item': lease,
+                'ConditionExpression': 'attribute_not_exists(assignmentId)'
+            }
+        })
+
+        try:
+            dynamodb.meta.client.transact_write_items(TransactItems=transact_items)
+            logger.info(f"Lease {lease['assignmentId']}: {len(remaining)} tasks for worker {worker_id}")
+            return lease, unavailable
+
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            reasons = e.response.get('CancellationReasons') or []
+            # Reasons line up with TransactItems; drop tasks that failed their
+            # condition or conflicted with another claim, keep the rest
+            lost = set()
+            switched = False
+            for task_id, reason in zip(remaining, reasons):
+                if reason.get('Code') == 'TransactionConflict':
+                    lost.add(task_id)
+                elif reason.get('Code') == 'ConditionalCheckFailed':
+                    available = slot_available(deserialize_item(reason.get('Item')), worker_id)
+                    if available is None or available == last_slot[task_id]:
+                        lost.add(task_id)
+                    else:
+                        last_slot[task_id] = available
+                        switched = True
+            if not lost and not switched:
+                raise
+            unavailable.extend(t for t in remaining if t in lost)
+            remaining = [t for t in remaining if t not in lost]
+
+    return None, unavailable
+
+
+def renew_assignment(
+    assignment_id: str,
+    worker_id: str
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Extend an active assignment (or lease) by its lease duration.
+
+    The extension is conditional: the record must belong to the worker,
+    still be Assigned and unexpired, and be under the renewal limit. The
+    expiry sweeper checks expiresAt under the same condition, so a renewal
+    and an expiry can never both win.
+
+    Args:
+        assignment_id: Assignment or lease ID
+        worker_id: Worker sending the heartbeat
+
+    Returns:
+        tuple: (assignment, None) with the new expiresAt on success, or
+               (None, current_assignment) when it can't be renewed
+               (current_assignment is None if it doesn't exist)
+    """
+    now = int(time.time())
+    table = dynamodb.Table(config.ASSIGNMENTS_TABLE)
+
+    try:
+        response = table.update_item(
+            Key={'assignmentId': assignment_id},
+            UpdateExpression='SET expiresAt = if_not_exists(leaseSeconds, :default_lease) + :now, '
+                             'renewedAt = :now ADD renewalCount :one',
+            ConditionExpression='workerId = :worker_id AND #status = :assigned AND expiresAt >= :now '
+                                'AND (attribute_not_exists(renewalCount) OR renewalCount < :max_renewals)',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={
+                ':default_lease': ASSIGNMENT_TTL_SECONDS,
+                ':now': now,
+                ':one': 1,
+                ':worker_id': worker_id,
+                ':assigned': AssignmentStatus.ASSIGNED,
+                ':max_renewals': config.MAX_LEASE_RENEWALS
+            },
+            ReturnValues='ALL_NEW',
+            ReturnValuesOnConditionCheckFailure='ALL_OLD'
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            logger.debug(f"Renewal refused for assignment {assignment_id}")
+            return None, deserialize_item(e.response.get('Item'))
+        raise
+
+    assignment = response['Attributes']
+    if assignment.get('taskId'):
+        # Keep the task's lease hint in step (used to settle ready-queue races)
+        try:
+            dynamodb.Table(config.TASKS_TABLE).update_item(
+                Key={'taskId': assignment['taskId']},
+                UpdateExpression='SET leaseExpiresAt = :expires_at',
+                ExpressionAttributeValues={':expires_at': assignment['expiresAt']}
+            )
+        except Exception as e:
+            logger.warning(f"Could not update lease hint on task {assignment['taskId']}: {e}")
+
+    return assignment, None
+
+
+def close_for_review(task_id: str) -> bool:
+    """
+    Move a task to Review once it has collected all its submissions.
+
+    The transition is conditional on the task's own counters, so it happens
+    exactly once however many submissions race to trigger it. Tasks without
+    counters (created before requiredSubmissions) close on any submission.
+
+    Returns:
+        True if this call moved the task to Review
+    """
+    try:
+        dynamodb.Table(config.TASKS_TABLE).update_item(
+            Key={'taskId': task_id},
+            UpdateExpression='SET #status = :review_status, statusShard = :review_shard',
+            ConditionExpression='#status IN (:published_status, :assigned_status) AND '
+                                '(attribute_not_exists(requiredSubmissions) OR submissionCount >= requiredSubmissions)',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={
+                ':review_status': TaskStatus.REVIEW,
+                ':review_shard': status_shard_key(TaskStatus.REVIEW, task_id),
+                ':published_status': TaskStatus.PUBLISHED,
+                ':assigned_status': TaskStatus.ASSIGNED
+            }
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
@@ -0,0 +1,140 @@
+"""
+Write-sharded counters.
+
+A counter that every request increments (e.g. the platform wallet balance)
+is split across `shard_count` items keyed '<counterId>#shard<N>'. Each
+write picks a shard at random, so increments spread over N partitions
+instead of queueing (and conflicting in transactions) on one item. Reads
+sum every shard, plus the unsharded '<counterId>' item from before the
+counter was sharded, and are cached briefly per container.
+"""
+import random
+import time
+import boto3
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+from .config import config
+from .logging import logger
+from .rate_limit import backoff_delay
+
+dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
+
+# BatchGetItem accepts at most 100 keys per call
+MAX_SHARDS = 99
+
+# BatchGetItem calls made to read every shard before giving up
+READ_ATTEMPTS = 4
+
+
+class ShardedCounter:
+    """
+    Counter spread over several items of a table.
+
+    Args:
+        table_name: Table holding the shards
+        key_name: The table's partition key attribute
+        counter_id: Logical counter ID (shard keys are derived from it)
+        shard_count: Number of shards (at most MAX_SHARDS)
+        attribute: Numeric attribute holding each shard's value
+        cache_seconds: How long a summed read is reused
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        key_name: str,
+        counter_id: str,
+        shard_count: int,
+        attribute: str = 'value',
+        cache_seconds: float = 5.0
+    ):
+        self.table_name = table_name
+        self.key_name = key_name
+        self.counter_id = counter_id
+        self.shard_count = max(1, min(int(shard_count), MAX_SHARDS))
+        self.attribute = attribute
+        self.cache_seconds = cache_seconds
+        self._cached: Optional[Tuple[float, Decimal]] = None
+
+    def shard_keys(self) -> List[str]:
+        """Every shard's key, plus the unsharded legacy item."""
+        return [self.counter_id] + [f"{self.counter_id}#shard{n}" for n in range(self.shard_count)]
+
+    def random_shard(self) -> str:
+        """Key of a randomly chosen shard for the next write."""
+        return f"{self.counter_id}#shard{random.randrange(self.shard_count)}"
+
+    def increment_item(self, amount: Decimal) -> Dict[str, Any]:
+        """
+        TransactWriteItems item (low-level client format) adding `amount` to
+        a random shard, for increments that must commit with other writes.
+        """
+        return {
+            'Update': {
+                'TableName': self.table_name,
+                'Key': {self.key_name: {'S': self.random_shard()}},
+                'UpdateExpression': 'ADD #value :amount',
+                'ExpressionAttributeNames': {'#value': self.attribute},
+                'ExpressionAttributeValues': {':amount': {'N': str(amount)}}
+            }
+        }
+
+    def increment(self, amount: Decimal) -> None:
+        """Add `amount` to a random shard."""
+        dynamodb.Table(self.table_name).update_item(
+            Key={self.key_name: self.random_shard()},
+            UpdateExpression='ADD #value :amount',
+            ExpressionAttributeNames={'#value': self.attribute},
+            ExpressionAttributeValues={':amount': Decimal(str(amount))}
+        )
+        self._cached = None
+
+    def total(self, max_age: Optional[float] = None) -> Decimal:
+        """
+        Sum of all shards.
+
+        Args:
+            max_age: Accept a cached sum up to this many seconds old
+                     (defaults to cache_seconds; 0 forces a fresh read)
+        """
+        max_age = self.cache_seconds if max_age is None else max_age
+        now = time.monotonic()
+        if self._cached and now - self._cached[0] <= max_age:
+            return self._cached[1]
+
+        pending = {
+            self.table_name: {
+                'Keys': [{self.key_name: key} for key in self.shard_keys()],
+                'ProjectionExpression': '#value',
+                'ExpressionAttributeNames': {'#value': self.attribute},
+                'ConsistentRead': True
+            }
+        }
+        items = []
+        for attempt in range(READ_ATTEMPTS):
+            if attempt:
+                time.sleep(backoff_delay(attempt, base=0.05, cap=1.0))
+            response = dynamodb.batch_get_item(RequestItems=pending)
+            items.extend(response.get('Responses', {}).get(self.table_name, []))
+            pending = response.get('UnprocessedKeys') or {}
+            if not pending:
+                break
+        else:
+            # A partial sum would be wrong, not just stale
+            if self._cached:
+                logger.warning(f"Counter {self.counter_id}: shards unread, using last total")
+                return self._cached[1]
+            raise RuntimeError(f"Could not read every shard of counter {self.counter_id}")
+
+        total = sum((Decimal(str(item.get(self.attribute, 0))) for item in items), Decimal('0'))
+        self._cached = (now, total)
+        return total
+
+
+# Platform fee earnings, credited on every payment
+PLATFORM_WALLET_ID = 'PLATFORM_WALLET'
+
+platform_wallet = ShardedCounter(
+    config.WALLETS_TABLE, 'walletId', PLATFORM_WALLET_ID,
+    config.PLATFORM_WALLET_SHARDS, attribute='balance'
+)
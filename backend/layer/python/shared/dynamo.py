@@ -1,40 +1,185 @@
 """
 DynamoDB utility functions for batch operations.
 """
+import json
+import time
 import boto3
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Callable, Tuple
 from boto3.dynamodb.conditions import Key, Attr
+from botocore.exceptions import ClientError
 from .config import config
 from .logging import logger
+from .rate_limit import TokenBucket, is_throttling_error, backoff_delay
 
 dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
 
+# The resource isn't thread-safe; calls made from pool threads go through
+# its client, which is (and still takes plain Python values)
+client = dynamodb.meta.client
 
-def batch_write_items(table_name: str, items: List[Dict[str, Any]]) -> bool:
+
+# BatchWriteItem accepts at most 25 requests per call
+BATCH_WRITE_LIMIT = 25
+
+# Retries of a chunk's unprocessed/throttled items before reporting them failed
+BATCH_WRITE_RETRIES = 6
+
+
+class BatchWriteResult:
+    """
+    Outcome of batch_write_items.
+
+    Truthy only if every item was written, so callers that treat the
+    result as a bool keep working.
+    """
+
+    def __init__(self, total: int, written: int, failed: List[Dict[str, Any]], duplicates: int = 0):
+        self.total = total
+        self.written = written
+        self.failed = failed
+        self.duplicates = duplicates
+
+    def __bool__(self) -> bool:
+        return not self.failed
+
+    def __repr__(self) -> str:
+        return (f"BatchWriteResult(total={self.total}, written={self.written}, "
+                f"failed={len(self.failed)}, duplicates={self.duplicates})")
+
+
+_key_names_cache: Dict[str, List[str]] = {}
+
+
+def _table_key_names(table_name: str) -> List[str]:
+    """Primary key attribute names of a table (cached per container)."""
+    if table_name not in _key_names_cache:
+        _key_names_cache[table_name] = [k['AttributeName'] for k in dynamodb.Table(table_name).key_schema]
+    return _key_names_cache[table_name]
+
+
+def dedupe_by_key(items: List[Dict[str, Any]], key_names: List[str]) -> List[Dict[str, Any]]:
+    """
+    Drop items whose primary key repeats, keeping the last one (last write wins).
+    BatchWriteItem rejects a request that holds the same key twice.
+    """
+    unique: Dict[tuple, Dict[str, Any]] = {}
+    for item in items:
+        unique[tuple(item.get(k) for k in key_names)] = item
+    return list(unique.values())
+
+
+def estimate_wcu(item: Dict[str, Any]) -> int:
+    """Rough write capacity for putting an item (1 WCU per started KB)."""
+    size = len(json.dumps(item, default=str))
+    return max(1, -(-size // 1024))
+
+
+def batch_write_chunk(
+    table_name: str,
+    items: List[Dict[str, Any]],
+    max_retries: int = BATCH_WRITE_RETRIES,
+    wcu_budget: Optional[TokenBucket] = None
+) -> List[Dict[str, Any]]:
+    """
+    Put up to 25 items with one BatchWriteItem, retrying UnprocessedItems.
+
+    Unprocessed items and throttled calls are resubmitted with exponential,
+    jittered backoff.
+
+    Args:
+        table_name: Name of the DynamoDB table
+        items: At most BATCH_WRITE_LIMIT items with distinct keys
+        max_retries: Resubmissions before giving up
+        wcu_budget: Optional token bucket of write capacity units per second
+
+    Returns:
+        Items that could not be written (empty list on full success)
     """
-    Write multiple items to DynamoDB using batch_write_item.
-    Handles batching (max 25 items per batch) automatically.
+    requests = [{'PutRequest': {'Item': item}} for item in items]
+
+    for attempt in range(max_retries + 1):
+        if attempt:
+            time.sleep(backoff_delay(attempt, base=0.05, cap=5.0))
+        if wcu_budget:
+            wcu = sum(estimate_wcu(r['PutRequest']['Item']) for r in requests)
+            wcu_budget.acquire(min(wcu, wcu_budget.capacity))
+        try:
+            response = client.batch_write_item(RequestItems={table_name: requests})
+        except Exception as e:
+            if not is_throttling_error(e):
+                logger.error(f"Batch write to {table_name} failed: {e}")
+                break
+            continue
+        requests = response.get('UnprocessedItems', {}).get(table_name, [])
+        if not requests:
+            return []
+
+    logger.warning(f"{len(requests)} items left unwritten in {table_name}")
+    return [r['PutRequest']['Item'] for r in requests]
+
+
+def batch_write_items(
+    table_name: str,
+    items: List[Dict[str, Any]],
+    max_workers: Optional[int] = None,
+    wcu_per_second: Optional[float] = None,
+    key_names: Optional[List[str]] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None
+) -> BatchWriteResult:
+    """
+    Write multiple items to DynamoDB using parallel BatchWriteItem calls.
+    Items are split into 25-item chunks written across threads; unprocessed
+    items are retried with backoff and, if still unwritten, reported back.
     
     Args:
         table_name: Name of the DynamoDB table
         items: List of items to write
+        max_workers: Parallel chunks (default BATCH_WRITE_WORKERS)
+        wcu_per_second: Write capacity to stay under (default
+            BATCH_WRITE_WCU_BUDGET; 0 means unlimited)
+        key_names: Primary key attributes for de-duplication (default:
+            read from the table's key schema)
+        on_progress: Called with (items_done, total) after each chunk
         
     Returns:
-        True if all items written successfully, False otherwise
+        BatchWriteResult - truthy if all items were written
     """
+    total = len(items)
     try:
-        table = dynamodb.Table(table_name)
-        
-        with table.batch_writer() as batch:
-            for item in items:
-                batch.put_item(Item=item)
-        
-        logger.info(f"Successfully wrote {len(items)} items to {table_name}")
-        return True
-        
+        unique = dedupe_by_key(items, key_names or _table_key_names(table_name))
     except Exception as e:
-        logger.error(f"Error batch writing to {table_name}: {e}")
-        return False
+        logger.error(f"Error reading key schema of {table_name}: {e}")
+        return BatchWriteResult(total, 0, list(items))
+
+    chunks = [unique[i:i + BATCH_WRITE_LIMIT] for i in range(0, len(unique), BATCH_WRITE_LIMIT)]
+    if not chunks:
+        return BatchWriteResult(total, 0, [])
+
+    wcu_per_second = config.BATCH_WRITE_WCU_BUDGET if wcu_per_second is None else wcu_per_second
+    budget = TokenBucket(wcu_per_second, capacity=max(wcu_per_second, BATCH_WRITE_LIMIT * 2)) if wcu_per_second else None
+    workers = min(max_workers or config.BATCH_WRITE_WORKERS, len(chunks))
+
+    failed: List[Dict[str, Any]] = []
+    done = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(batch_write_chunk, table_name, chunk, BATCH_WRITE_RETRIES, budget) for chunk in chunks]
+        for future, chunk in zip(futures, chunks):
+            try:
+                failed.extend(future.result())
+            except Exception as e:
+                logger.error(f"Batch write chunk to {table_name} failed: {e}")
+                failed.extend(chunk)
+            done += len(chunk)
+            if on_progress:
+                on_progress(done, len(unique))
+
+    result = BatchWriteResult(total, len(unique) - len(failed), failed, duplicates=total - len(unique))
+    if failed:
+        logger.error(f"Batch write to {table_name}: {result}")
+    else:
+        logger.info(f"Successfully wrote {result.written} items to {table_name}")
+    return result
 
 
 def query(
@@ -43,18 +188,20 @@ def query(
     key_condition: Optional[Any] = None,
     filter_expression: Optional[Any] = None,
     limit: Optional[int] = None,
-    scan_forward: bool = True
+    scan_forward: bool = True,
+    projection: Optional[List[str]] = None
 ) -> List[Dict[str, Any]]:
     """
-    Query DynamoDB table or index.
+    Query DynamoDB table or index, following pagination.
     
     Args:
         table_name: Name of the DynamoDB table
         index_name: Optional GSI name
         key_condition: Key condition expression
         filter_expression: Optional filter expression
-        limit: Max items to return
+        limit: Max items to return (all pages if None)
         scan_forward: True for ascending, False for descending
+        projection: Optional attribute names to return
         
     Returns:
         List of items matching the query
@@ -72,17 +219,170 @@ def query(
             query_params['KeyConditionExpression'] = key_condition
         if filter_expression:
             query_params['FilterExpression'] = filter_expression
-        if limit:
-            query_params['Limit'] = limit
-            
-        response = table.query(**query_params)
-        return response.get('Items', [])
+        if projection:
+            names = {f'#p{i}': name for i, name in enumerate(projection)}
+            query_params['ProjectionExpression'] = ', '.join(names)
+            query_params['ExpressionAttributeNames'] = names
+
+        items = []
+        while True:
+            if limit:
+                query_params['Limit'] = limit - len(items)
+            response = table.query(**query_params)
+            items.extend(response.get('Items', []))
+
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key or (limit and len(items) >= limit):
+                return items
+            query_params['ExclusiveStartKey'] = last_key
         
     except Exception as e:
         logger.error(f"Error querying {table_name}: {e}")
         return []
 
 
+class TransitionResult:
+    """
+    Outcome of transition_status.
+
+    transitioned: updated items (all attributes, as returned by UpdateItem)
+    skipped: keys whose item was not in the expected status (or missing)
+    failed: keys whose update errored
+    """
+
+    def __init__(self):
+        self.transitioned: List[Dict[str, Any]] = []
+        self.skipped: List[Dict[str, Any]] = []
+        self.failed: List[Dict[str, Any]] = []
+
+    def __repr__(self) -> str:
+        return (f"TransitionResult(transitioned={len(self.transitioned)}, "
+                f"skipped={len(self.skipped)}, failed={len(self.failed)})")
+
+
+def _transition_one(
+    table_name: str,
+    key: Dict[str, Any],
+    from_status: str,
+    to_status: str,
+    attributes: Dict[str, Any]
+) -> Tuple[str, Any]:
+    """Conditionally move one item between statuses."""
+    names = {'#status': 'status'}
+    values = {':from_status': from_status, ':to_status': to_status}
+    assignments = ['#status = :to_status']
+    for i, (name, value) in enumerate(attributes.items()):
+        names[f'#a{i}'] = name
+        values[f':a{i}'] = value
+        assignments.append(f'#a{i} = :a{i}')
+
+    try:
+        response = client.update_item(
+            TableName=table_name,
+            Key=key,
+            UpdateExpression='SET ' + ', '.join(assignments),
+            ConditionExpression='#status = :from_status',
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+            ReturnValues='ALL_NEW'
+        )
+        return 'transitioned', response['Attributes']
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return 'skipped', key
+        logger.error(f"Status transition failed for {key}: {e}")
+        return 'failed', key
+
+
+def transition_status(
+    table_name: str,
+    keys: List[Dict[str, Any]],
+    from_status: str,
+    to_status: str,
+    attributes: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    max_workers: Optional[int] = None
+) -> TransitionResult:
+    """
+    Move many items from one status to another with concurrent UpdateItems.
+
+    Each update is conditioned on `status = from_status` and only touches
+    `status` plus the given attributes, so it never clobbers concurrent
+    writes to other attributes and is safe to repeat.
+
+    Args:
+        table_name: Name of the DynamoDB table
+        keys: Primary keys of the items
+        from_status: Status the items must currently have
+        to_status: New status
+        attributes: Optional function of the key returning extra attributes to SET
+        max_workers: Concurrent updates (default BATCH_WRITE_WORKERS)
+
+    Returns:
+        TransitionResult
+    """
+    result = TransitionResult()
+    if not keys:
+        return result
+
+    with ThreadPoolExecutor(max_workers=min(max_workers or config.BATCH_WRITE_WORKERS, len(keys))) as executor:
+        outcomes = executor.map(
+            lambda key: _transition_one(table_name, key, from_status, to_status, attributes(key) if attributes else {}),
+            keys
+        )
+        for outcome, value in outcomes:
+            getattr(result, outcome).append(value)
+
+    logger.info(f"{table_name} {from_status} -> {to_status}: {result}")
+    return result
+
+
+# BatchGetItem accepts at most 100 keys per call
+BATCH_GET_LIMIT = 100
+
+
+def batch_get_items(
+    table_name: str,
+    keys: List[Dict[str, Any]],
+    projection: Optional[List[str]] = None,
+    max_retries: int = BATCH_WRITE_RETRIES
+) -> List[Dict[str, Any]]:
+    """
+    Read many items by key, 100 per BatchGetItem call.
+
+    Unprocessed keys are retried with backoff; keys still unprocessed after
+    `max_retries` are left out of the result (like missing items).
+
+    Args:
+        table_name: Name of the DynamoDB table
+        keys: Primary keys to read (duplicates are read once)
+        projection: Optional attribute names to return
+
+    Returns:
+        The items found, in no particular order
+    """
+    unique = list({json.dumps(k, sort_keys=True, default=str): k for k in keys}.values())
+    request_base: Dict[str, Any] = {}
+    if projection:
+        names = {f'#p{i}': name for i, name in enumerate(projection)}
+        request_base['ProjectionExpression'] = ', '.join(names)
+        request_base['ExpressionAttributeNames'] = names
+
+    items: List[Dict[str, Any]] = []
+    for start in range(0, len(unique), BATCH_GET_LIMIT):
+        pending = {table_name: {**request_base, 'Keys': unique[start:start + BATCH_GET_LIMIT]}}
+        for attempt in range(max_retries + 1):
+            response = dynamodb.batch_get_item(RequestItems=pending)
+            items.extend(response.get('Responses', {}).get(table_name, []))
+            pending = response.get('UnprocessedKeys') or {}
+            if not pending:
+                break
+            if attempt < max_retries:
+                time.sleep(backoff_delay(attempt + 1, base=0.05, cap=2.0))
+        if pending:
+            logger.warning(f"{len(pending[table_name]['Keys'])} keys unread from {table_name}")
+    return items
+
+
 def get_item(table_name: str, key: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """Get a single item from DynamoDB."""
     try:
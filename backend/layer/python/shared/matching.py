@@ -0,0 +1,156 @@
+"""
+Task matching engine - picks the next task for a worker.
+Candidates come from the Published pool, filtered by worker level and
+certifications, then tried in randomized order so concurrent workers
+spread across different tasks instead of racing for the same one.
+"""
+import random
+import boto3
+from typing import List, Dict, Any, Optional, Set, Tuple
+from .config import config
+from .logging import logger
+from .models import TaskStatus, WorkerLevel, TASK_TYPE_CERTIFICATIONS
+from .gamification import can_access_task
+from .assignments import lock_task, claim_task_batch, lease_seconds_for, MAX_BATCH_CLAIM
+from .ready_queue import claim_from_ready_queue
+from .status_index import query_status
+
+dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
+
+
+def get_worker_profile(worker_id: str) -> Tuple[str, Set[str]]:
+    """
+    Get a worker's level and certifications.
+
+    Returns:
+        tuple: (level, certifications) - defaults to (NOVICE, empty) if no profile
+    """
+    try:
+        workers_table = dynamodb.Table(config.WORKERS_TABLE)
+        worker = workers_table.get_item(Key={'workerId': worker_id}).get('Item') or {}
+    except Exception as e:
+        logger.warning(f"Could not fetch worker profile for {worker_id}: {e}")
+        worker = {}
+
+    return worker.get('level', WorkerLevel.NOVICE), set(worker.get('certifications') or [])
+
+
+def is_eligible(task: Dict[str, Any], worker_level: str, certifications: Set[str]) -> bool:
+    """Check level and (explicit) certification requirements for a task."""
+    if not can_access_task(worker_level, task.get('requiredLevel', WorkerLevel.NOVICE)):
+        return False
+    required_cert = task.get('requiredCertification')
+    return not required_cert or required_cert in certifications
+
+
+def rank_candidates(tasks: List[Dict[str, Any]], certifications: Set[str]) -> List[Dict[str, Any]]:
+    """
+    Order candidates for lock attempts.
+
+    Tasks whose type matches one of the worker's certifications come first.
+    Each tier is shuffled so workers hitting the pool at the same moment
+    start on different tasks.
+    """
+    preferred, others = [], []
+    for task in tasks:
+        cert = TASK_TYPE_CERTIFICATIONS.get(task.get('type'))
+        (preferred if cert and cert in certifications else others).append(task)
+
+    random.shuffle(preferred)
+    random.shuffle(others)
+    return preferred + others
+
+
+def find_candidate_tasks(
+    worker_level: str,
+    certifications: Set[str],
+    limit: int = None,
+    worker_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Read up to `limit` Published tasks and keep those the worker may take
+    (skipping tasks where `worker_id` already holds a slot).
+    """
+    limit = limit or config.MATCH_CANDIDATE_LIMIT
+    published = query_status(TaskStatus.PUBLISHED, limit=limit)
+    return [
+        t for t in published
+        if is_eligible(t, worker_level, certifications) and worker_id not in (t.get('workerIds') or set())
+    ]
+
+
+def claim_next_task(worker_id: str, max_attempts: int = None) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Find and lock the next task for a worker.
+
+    Lost races are retried on alternate candidates, up to `max_attempts`.
+    With DISPATCH_MODE=queue, candidates are popped from the sharded ready
+    queues instead of read from the StatusIndex.
+
+    Returns:
+        tuple: (task, assignment), or None if nothing could be claimed
+    """
+    max_attempts = max_attempts or config.MATCH_MAX_ATTEMPTS
+    worker_level, certifications = get_worker_profile(worker_id)
+
+    if config.DISPATCH_MODE == 'queue':
+        return claim_from_ready_queue(worker_id, worker_level, certifications, max_attempts)
+
+    candidates = rank_candidates(find_candidate_tasks(worker_level, certifications, worker_id=worker_id), certifications)
+    if not candidates:
+        logger.info(f"No eligible tasks for worker {worker_id} (level={worker_level})")
+        return None
+
+    for attempt, task in enumerate(candidates[:max_attempts], start=1):
+        assignment = lock_task(task['taskId'], worker_id, lease_seconds_for(task.get('type')), task.get('openSlots'))
+        if assignment:
+            logger.info(f"Worker {worker_id} matched task {task['taskId']} on attempt {attempt}")
+            return task, assignment
+
+    logger.info(f"Worker {worker_id} lost {min(max_attempts, len(candidates))} lock races")
+    return None
+
+
+def claim_next_tasks(worker_id: str, count: int) -> Optional[Dict[str, Any]]:
+    """
+    Find and lock up to `count` tasks for a worker under one lease.
+
+    Candidates are ranked like claim_next_task. Tasks lost to other workers
+    are dropped and the lease holds whatever could be claimed; if a slice
+    is lost entirely, the next slice of candidates is tried. Batch claims
+    always read candidates from the status index.
+
+    Returns:
+        The lease dict (with 'taskIds'), or None if nothing could be claimed
+    """
+    count = max(1, min(count, MAX_BATCH_CLAIM))
+    worker_level, certifications = get_worker_profile(worker_id)
+
+    # Over-fetch so lost tasks can be replaced with alternates
+    pool = rank_candidates(
+        find_candidate_tasks(
+            worker_level, certifications,
+            limit=max(count * 2, config.MATCH_CANDIDATE_LIMIT),
+            worker_id=worker_id
+        ),
+        certifications
+    )
+    pool_ids = [t['taskId'] for t in pool]
+    task_types = {t['taskId']: t.get('type') for t in pool}
+    open_slots = {t['taskId']: t.get('openSlots') for t in pool}
+    if not pool_ids:
+        logger.info(f"No eligible tasks for worker {worker_id} (level={worker_level})")
+        return None
+
+    for _ in range(config.MATCH_MAX_ATTEMPTS):
+        batch, pool_ids = pool_ids[:count], pool_ids[count:]
+        if not batch:
+            break
+        # One lease covers the batch: size it for the slowest task type in it
+        ttl_seconds = max(lease_seconds_for(task_types[t]) for t in batch)
+        lease, unavailable = claim_task_batch(batch, worker_id, ttl_seconds, open_slots)
+        if lease:
+            logger.info(f"Worker {worker_id} claimed {len(lease['taskIds'])}/{count} tasks ({len(unavailable)} lost)")
+            return lease
+
+    return None
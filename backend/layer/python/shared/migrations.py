@@ -0,0 +1,67 @@
+"""
+Resumable table backfills.
+
+A backfill scans a table for items missing attributes that newer code
+writes, and updates each one. It runs as an on-demand Lambda: each
+invocation works until it is close to its timeout and returns the scan
+position, which is passed back in ({"startKey": ...}) to continue.
+{"done": true} means the whole table has been covered.
+
+Updates are expected to be conditional (on the attributes they were
+derived from), so a backfill can overlap live writes and be re-run; an
+item whose condition fails was rewritten meanwhile and is counted as
+skipped.
+"""
+from typing import Any, Callable, Dict, Optional
+import boto3
+from botocore.exceptions import ClientError
+from .config import config
+from .logging import logger
+
+dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
+
+# Return when less than this much time is left
+TIME_RESERVE_MS = 30 * 1000
+
+
+def run_backfill(
+    table_name: str,
+    filter_expression: Any,
+    update_item: Callable[[Any, Dict[str, Any]], None],
+    event: Optional[dict],
+    context: Any
+) -> Dict[str, Any]:
+    """
+    Scan `table_name` for items matching `filter_expression` and call
+    update_item(table, item) on each.
+
+    Returns:
+        dict: { updated, skipped, done, startKey (when not done) }
+    """
+    table = dynamodb.Table(table_name)
+    params = {'FilterExpression': filter_expression}
+    start_key = (event or {}).get('startKey')
+    if start_key:
+        params['ExclusiveStartKey'] = start_key
+
+    updated = skipped = 0
+    while True:
+        response = table.scan(**params)
+        for item in response.get('Items', []):
+            try:
+                update_item(table, item)
+                updated += 1
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+                skipped += 1
+
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            logger.info(f"Backfill of {table_name} complete: {updated} updated, {skipped} skipped")
+            return {'updated': updated, 'skipped': skipped, 'done': True}
+        params['ExclusiveStartKey'] = last_key
+
+        if context is not None and context.get_remaining_time_in_millis() < TIME_RESERVE_MS:
+            logger.info(f"Backfill of {table_name} paused: {updated} updated, {skipped} skipped")
+            return {'updated': updated, 'skipped': skipped, 'done': False, 'startKey': last_key}
@@ -16,6 +16,23 @@ class TaskStatus:
     EXPIRED = 'Expired'
 
 
+class BatchStatus:
+    """Task batch ingestion statuses."""
+    INGESTING = 'Ingesting'  # Manifest still being read
+    CREATED = 'Created'
+    FAILED = 'Failed'
+
+
+class TranscriptionStatus:
+    """Amazon Transcribe job statuses recorded on audio tasks."""
+    NOT_STARTED = 'NOT_STARTED'
+    QUEUED = 'QUEUED'  # Waiting in the transcription queue
+    THROTTLED = 'THROTTLED'  # Transcribe pushed back, retrying with backoff
+    IN_PROGRESS = 'IN_PROGRESS'
+    COMPLETED = 'COMPLETED'
+    FAILED = 'FAILED'
+
+
 class SubmissionStatus:
     """Submission review statuses."""
     PENDING = 'Pending'
@@ -73,3 +90,18 @@ class TaskType:
     SENTIMENT_LABELING = 'sentiment-labeling'
     DATA_VALIDATION = 'data-validation'
 
+
+# Certification that makes a worker a preferred match for each task type
+TASK_TYPE_CERTIFICATIONS = {
+    TaskType.IMAGE_CLASSIFICATION: Certification.IMAGE_LABELING,
+    TaskType.BOUNDING_BOX: Certification.BOUNDING_BOX,
+    TaskType.AUDIO_TRANSCRIPTION: Certification.AUDIO_TRANSCRIPTION,
+    TaskType.SENTIMENT_LABELING: Certification.SENTIMENT_ANALYSIS,
+    TaskType.DATA_VALIDATION: Certification.DATA_VALIDATION,
+}
+
+# Initial assignment lease per task type, in seconds (default: ASSIGNMENT_TTL_SECONDS)
+TASK_TYPE_LEASE_SECONDS = {
+    TaskType.AUDIO_TRANSCRIPTION: 1800,
+    TaskType.BOUNDING_BOX: 900,
+}
@@ -0,0 +1,35 @@
+"""
+Task pricing and the payment split.
+
+One place decides what an approved submission is worth and how it is
+divided, so the money moved by process_payment and the earnings shown in
+worker stats can't drift apart.
+"""
+from decimal import Decimal, ROUND_DOWN
+from typing import Any, Dict, Tuple
+
+# 20% of every task payment goes to the platform
+PLATFORM_FEE_PERCENT = Decimal('0.20')
+
+# Reward of a task whose payload sets none
+DEFAULT_REWARD = Decimal('0.5')
+
+
+def task_reward(task: Dict[str, Any]) -> Decimal:
+    """Full price of one approved submission of a task (payload.reward)."""
+    payload = task.get('payload') or {}
+    reward = payload.get('reward', task.get('reward', DEFAULT_REWARD))
+    return Decimal(str(reward))
+
+
+def payment_split(total_price: Decimal) -> Tuple[Decimal, Decimal]:
+    """
+    Split a payment between worker and platform.
+
+    The fee is rounded down to the cent; the worker gets the rest.
+
+    Returns:
+        tuple: (worker_amount, platform_fee)
+    """
+    platform_fee = (total_price * PLATFORM_FEE_PERCENT).quantize(Decimal('0.01'), rounding=ROUND_DOWN)
+    return total_price - platform_fee, platform_fee
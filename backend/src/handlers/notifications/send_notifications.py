@@ -0,0 +1,86 @@
+"""
+Send Notifications Handler.
+Triggered by SQS (Notification Queue), in batches collected over the
+event source's batching window.
+
+A user's intents of the same kind in one batch are coalesced into a single
+email (shared.notifications). Sends are paced by a token bucket
+(SES_SEND_RATE per sender; the event source caps concurrent senders).
+When SES throttles, or the time left runs out, the remaining messages are
+reported as failures so SQS redelivers them later.
+"""
+import json
+import boto3
+from shared.config import config
+from shared.logging import logger
+from shared.notifications import coalesce, render
+from shared.rate_limit import TokenBucket, is_throttling_error
+
+ses = boto3.client('ses', region_name=config.AWS_REGION)
+
+# Shared by every invocation in this container
+send_bucket = TokenBucket(config.SES_SEND_RATE)
+
+# Don't wait for tokens when less than this much time is left
+TIME_RESERVE_SECONDS = 5
+
+SENDER = 'noreply@crowdsourcing.com'
+
+
+def handler(event, context):
+    """
+    Handler for notification intents.
+    Message: { kind, userId, email, data }
+    """
+    intents = []
+    failures = []
+    for record in event.get('Records', []):
+        try:
+            intents.append((record['messageId'], json.loads(record['body'])))
+        except ValueError:
+            # Malformed: retrying can't help, let it go
+            logger.error(f"Dropping malformed notification {record['messageId']}")
+
+    throttled = False
+    sent = 0
+    for message_ids, kind, email, data_list in coalesce(intents):
+        time_left = context.get_remaining_time_in_millis() / 1000 - TIME_RESERVE_SECONDS
+        if throttled or not send_bucket.acquire(timeout=max(0.0, time_left)):
+            failures.extend({'itemIdentifier': m} for m in message_ids)
+            continue
+
+        try:
+            send_email(kind, email, data_list)
+            sent += 1
+        except ValueError as e:
+            logger.error(f"Dropping notification: {e}")
+        except Exception as e:
+            if is_throttling_error(e):
+                # SES quota reached: leave the rest of the batch for later
+                throttled = True
+                send_bucket.drain()
+                logger.warning("SES throttled, deferring remaining notifications")
+            else:
+                logger.error(f"Failed to send {kind} notification to {email}: {e}")
+            failures.extend({'itemIdentifier': m} for m in message_ids)
+
+    logger.info(f"Sent {sent} emails for {len(intents)} notifications, {len(failures)} deferred")
+    return {'batchItemFailures': failures}
+
+
+def send_email(kind, email, data_list):
+    """
+    Render and send one (possibly coalesced) notification.
+
+    Raises:
+        ValueError: For an unknown notification kind
+    """
+    subject, text = render(kind, data_list)
+    ses.send_email(
+        Source=SENDER,
+        Destination={'ToAddresses': [email]},
+        Message={
+            'Subject': {'Data': subject},
+            'Body': {'Text': {'Data': text}}
+        }
+    )
@@ -2,33 +2,69 @@
 Payment Processing Handler with Platform Fee.
 Triggered by DynamoDB Stream on Submissions Table.
 Implements 20% platform fee on all task payments.
+
+In batch settlement mode (PAYMENT_SETTLEMENT_MODE=batch) the approvals in
+one stream batch are settled together: per requester, one transaction
+debits the summed price once, credits each worker their summed share,
+credits the platform fee once, and writes every per-submission ledger row.
+That replaces one transaction per approval, all contending on the same
+requester wallet item. The platform fee is credited to one of
+PLATFORM_WALLET_SHARDS wallet items (shared.counters), so concurrent
+settlements rarely touch the same platform item.
+
+Ledger row IDs are derived from the submissionId and written with
+attribute_not_exists, so a submission can only be paid once: approvals
+whose payment row already exists are dropped before settling (one
+BatchGetItem), and a transaction that races another payment of the same
+submission is cancelled rather than paying twice.
 """
 import json
 import boto3
 import uuid
 import time
-from decimal import Decimal, ROUND_DOWN
+from collections import defaultdict
+from decimal import Decimal
 from botocore.exceptions import ClientError
 from shared.config import config
+from shared.counters import PLATFORM_WALLET_ID, platform_wallet
+from shared.dynamo import batch_get_items
+from shared.notifications import PAYMENT, notification, enqueue_notifications
+from shared.pricing import PLATFORM_FEE_PERCENT, task_reward, payment_split
+from shared.rate_limit import backoff_delay
+
+# TransactWriteItems limit
+MAX_TRANSACTION_ITEMS = 100
+
+# Attempts at a settlement transaction that lost a write conflict
+SETTLEMENT_ATTEMPTS = 3
 
-# Platform configuration
-PLATFORM_FEE_PERCENT = Decimal('0.20')  # 20% platform fee
-PLATFORM_WALLET_ID = 'PLATFORM_WALLET'  # Reserved wallet ID for platform earnings
+# Namespace for ledger transaction IDs derived from a submissionId
+LEDGER_NAMESPACE = uuid.UUID('6f1c0a52-3e4b-5d7a-9c1e-2b8f4d6a0e13')
 
 dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
-ses = boto3.client('ses', region_name=config.AWS_REGION)
 
 
 def handler(event, context):
     """
     Handler triggered by DynamoDB Stream on Submissions Table.
     Listens for MODIFY events where status changes to 'Approved'.
+
+    Only a requester's insufficient balance is settled here (the submission
+    is marked as payment failed). Any other failure is left to the stream:
+    in batch mode it propagates and the batch is retried (and bisected); in
+    per-record mode the failed record is reported, so the stream retries
+    from it. Payments are idempotent, so replayed approvals aren't paid
+    twice.
     """
     print("Received event:", json.dumps(event))
 
     if 'Records' not in event:
         return {'processed': 0}
 
+    if config.PAYMENT_SETTLEMENT_MODE == 'batch':
+        approvals = [approval_from_record(r) for r in event['Records'] if r['eventName'] == 'MODIFY']
+        return {'processed': settle_batch([a for a in approvals if a])}
+
     processed = 0
     for record in event['Records']:
         if record['eventName'] == 'MODIFY':
@@ -39,12 +75,22 @@ def handler(event, context):
                 print(f"Error processing record: {e}")
                 import traceback
                 traceback.print_exc()
+                return {
+                    'processed': processed,
+                    'batchItemFailures': [{'itemIdentifier': record['dynamodb']['SequenceNumber']}]
+                }
 
-    return {'processed': processed}
+    return {'processed': processed, 'batchItemFailures': []}
 
 
-def process_record(record) -> bool:
-    """Process a single stream record. Returns True if payment was executed."""
+def approval_from_record(record):
+    """
+    Extract a new approval from a stream record.
+
+    Returns:
+        tuple: (submission_id, task_id, worker_id), or None if the record
+               is not a change to 'Approved'
+    """
     new_image = record['dynamodb']['NewImage']
     old_image = record['dynamodb']['OldImage']
 
@@ -54,14 +100,19 @@ def process_record(record) -> bool:
     # Only process if status CHANGED to 'Approved'
     # This prevents double payment if the record is updated for other reasons later
     if new_status == 'Approved' and old_status != 'Approved':
-        submission_id = new_image['submissionId']['S']
-        worker_id = new_image['workerId']['S']
-        task_id = new_image['taskId']['S']
+        return new_image['submissionId']['S'], new_image['taskId']['S'], new_image['workerId']['S']
+    return None
 
-        execute_payment(submission_id, task_id, worker_id)
-        return True
-    
-    return False
+
+def process_record(record) -> bool:
+    """Process a single stream record. Returns True if payment was executed."""
+    approval = approval_from_record(record)
+    if not approval:
+        return False
+
+    submission_id, task_id, worker_id = approval
+    execute_payment(submission_id, task_id, worker_id)
+    return True
 
 
 def calculate_payment_split(total_price: Decimal) -> tuple:
@@ -74,9 +125,272 @@ def calculate_payment_split(total_price: Decimal) -> tuple:
     Returns:
         tuple: (worker_amount, platform_fee)
     """
-    platform_fee = (total_price * PLATFORM_FEE_PERCENT).quantize(Decimal('0.01'), rounding=ROUND_DOWN)
-    worker_amount = total_price - platform_fee
-    return worker_amount, platform_fee
+    return payment_split(total_price)
+
+
+def build_payment(submission_id: str, task: dict, worker_id: str) -> dict:
+    """Amounts and parties for paying one approved submission of a task."""
+    total_price = task_reward(task)
+    worker_amount, platform_fee = payment_split(total_price)
+    return {
+        'submissionId': submission_id,
+        'taskId': task['taskId'],
+        'workerId': worker_id,
+        'requesterId': task.get('requesterId'),
+        'total': total_price,
+        'workerAmount': worker_amount,
+        'platformFee': platform_fee
+    }
+
+
+def ledger_transaction_id(submission_id: str, kind: str) -> str:
+    """Deterministic ledger row ID for one kind of row paying a submission."""
+    return str(uuid.uuid5(LEDGER_NAMESPACE, f"{kind}#{submission_id}"))
+
+
+def ledger_items(payment: dict, timestamp: str) -> list:
+    """
+    Transaction items recording one payment (worker payment + platform fee rows).
+    Each put fails if the row exists, i.e. if the submission was already paid.
+
+    The TASK_PAYMENT row is also the payment event: update_worker_stats
+    reads the worker's earnings from it on the Transactions stream.
+    fromUserId/toUserId place the rows in the parties' histories.
+    """
+    return [
+        # Record Worker Payment Transaction
+        {
+            'Put': {
+                'TableName': config.TRANSACTIONS_TABLE,
+                'Item': {
+                    'transactionId': {'S': ledger_transaction_id(payment['submissionId'], 'TASK_PAYMENT')},
+                    'type': {'S': 'TASK_PAYMENT'},
+                    'amount': {'N': str(payment['workerAmount'])},
+                    'grossAmount': {'N': str(payment['total'])},
+                    'platformFee': {'N': str(payment['platformFee'])},
+                    'from': {'S': payment['requesterId']},
+                    'to': {'S': payment['workerId']},
+                    'fromUserId': {'S': payment['requesterId']},
+                    'toUserId': {'S': payment['workerId']},
+                    'referenceId': {'S': payment['submissionId']},
+                    'taskId': {'S': payment['taskId']},
+                    'createdAt': {'S': timestamp}
+                },
+                'ConditionExpression': 'attribute_not_exists(transactionId)'
+            }
+        },
+        # Record Platform Fee Transaction
+        {
+            'Put': {
+                'TableName': config.TRANSACTIONS_TABLE,
+                'Item': {
+                    'transactionId': {'S': ledger_transaction_id(payment['submissionId'], 'PLATFORM_FEE')},
+                    'type': {'S': 'PLATFORM_FEE'},
+                    'amount': {'N': str(payment['platformFee'])},
+                    'from': {'S': payment['requesterId']},
+                    'to': {'S': PLATFORM_WALLET_ID},
+                    # No toUserId: the platform isn't a user with a history
+                    'fromUserId': {'S': payment['requesterId']},
+                    'referenceId': {'S': payment['submissionId']},
+                    'taskId': {'S': payment['taskId']},
+                    'createdAt': {'S': timestamp}
+                },
+                'ConditionExpression': 'attribute_not_exists(transactionId)'
+            }
+        }
+    ]
+
+
+def settlement_items(requester_id: str, payments: list) -> list:
+    """
+    Transaction items settling several payments from one requester.
+
+    Balance changes are netted: one debit for the requester, one credit per
+    worker and one platform fee credit (to a platform wallet shard), plus
+    each payment's ledger rows.
+    """
+    total = sum((p['total'] for p in payments), Decimal('0'))
+    fees = sum((p['platformFee'] for p in payments), Decimal('0'))
+    worker_totals = defaultdict(Decimal)
+    for p in payments:
+        worker_totals[p['workerId']] += p['workerAmount']
+
+    items = [
+        # Deduct FULL price of every payment from Requester
+        {
+            'Update': {
+                'TableName': config.WALLETS_TABLE,
+                'Key': {'walletId': {'S': requester_id}},
+                'UpdateExpression': 'SET balance = balance - :amount ADD version :one',
+                'ConditionExpression': 'balance >= :amount',
+                'ExpressionAttributeValues': {':amount': {'N': str(total)}, ':one': {'N': '1'}}
+            }
+        }
+    ]
+    items.extend(
+        {
+            'Update': {
+                'TableName': config.WALLETS_TABLE,
+                'Key': {'walletId': {'S': worker_id}},
+                'UpdateExpression': 'ADD balance :amount, version :one',
+                'ExpressionAttributeValues': {':amount': {'N': str(amount)}, ':one': {'N': '1'}}
+            }
+        }
+        for worker_id, amount in worker_totals.items()
+    )
+    # Fees go to a random shard of the platform wallet, not one hot item
+    items.append(platform_wallet.increment_item(fees))
+
+    timestamp = str(int(time.time()))
+    for payment in payments:
+        items.extend(ledger_items(payment, timestamp))
+    return items
+
+
+def settlement_chunks(payments: list):
+    """Split one requester's payments into groups that fit in a transaction."""
+    chunk, workers = [], set()
+    for payment in payments:
+        chunk_workers = workers | {payment['workerId']}
+        # requester debit + worker credits + platform credit + 2 ledger rows each
+        size = 2 + len(chunk_workers) + 2 * (len(chunk) + 1)
+        if chunk and size > MAX_TRANSACTION_ITEMS:
+            yield chunk
+            chunk, chunk_workers = [], {payment['workerId']}
+        chunk.append(payment)
+        workers = chunk_workers
+    if chunk:
+        yield chunk
+
+
+def settle_batch(approvals: list) -> int:
+    """
+    Settle a stream batch's approvals with netted transactions.
+
+    Args:
+        approvals: (submission_id, task_id, worker_id) tuples
+
+    Returns:
+        Number of submissions paid
+    """
+    # A submission approved twice in one batch is paid once
+    approvals = list({a[0]: a for a in approvals}.values())
+    if not approvals:
+        return 0
+
+    tasks = {
+        t['taskId']: t for t in batch_get_items(
+            config.TASKS_TABLE,
+            [{'taskId': task_id} for _, task_id, _ in approvals],
+            # task_reward falls back to a top-level reward (older tasks)
+            projection=['taskId', 'requesterId', 'payload', 'reward']
+        )
+    }
+
+    paid_already = already_paid([submission_id for submission_id, _, _ in approvals])
+    if paid_already:
+        print(f"Skipping {len(paid_already)} submissions that were already paid")
+
+    by_requester = defaultdict(list)
+    for submission_id, task_id, worker_id in approvals:
+        if submission_id in paid_already:
+            continue
+        task = tasks.get(task_id)
+        if not task:
+            print(f"Task {task_id} not found")
+            continue
+        payment = build_payment(submission_id, task, worker_id)
+        by_requester[payment['requesterId']].append(payment)
+
+    paid = 0
+    for requester_id, payments in by_requester.items():
+        for chunk in settlement_chunks(payments):
+            paid += settle_chunk(requester_id, chunk)
+    return paid
+
+
+def already_paid(submission_ids: list) -> set:
+    """Submissions whose payment ledger row exists (one batched read)."""
+    if not submission_ids:
+        return set()
+    ids = {ledger_transaction_id(s, 'TASK_PAYMENT'): s for s in submission_ids}
+    rows = batch_get_items(
+        config.TRANSACTIONS_TABLE,
+        [{'transactionId': transaction_id} for transaction_id in ids],
+        projection=['transactionId']
+    )
+    return {ids[row['transactionId']] for row in rows}
+
+
+def settle_chunk(requester_id: str, payments: list) -> int:
+    """
+    Run one settlement transaction, retrying write conflicts.
+    Payments that another invocation settled meanwhile are dropped from the
+    retry.
+
+    If the requester can't cover the whole chunk (or conflicts persist),
+    the payments are made one by one so every payment that can be covered
+    still goes through.
+
+    Returns:
+        Number of submissions paid
+
+    Raises:
+        ClientError: the first failure other than insufficient funds, once
+                     every payment has been tried, so the batch is retried
+    """
+    client = boto3.client('dynamodb', region_name=config.AWS_REGION)
+
+    for attempt in range(1, SETTLEMENT_ATTEMPTS + 1):
+        try:
+            client.transact_write_items(TransactItems=settlement_items(requester_id, payments))
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            if requester_funds_short(e):
+                print(f"Requester {requester_id} can't cover {len(payments)} payments at once, paying singly")
+                break
+            if ledger_row_exists(e):
+                paid_already = already_paid([p['submissionId'] for p in payments])
+                payments = [p for p in payments if p['submissionId'] not in paid_already]
+                print(f"{len(paid_already)} payments from {requester_id} were settled elsewhere")
+                if not payments:
+                    return 0
+                continue
+            print(f"Settlement for {requester_id} conflicted (attempt {attempt})")
+            time.sleep(backoff_delay(attempt, base=0.1, cap=1.0))
+            continue
+
+        print(f"Settled {len(payments)} payments from requester {requester_id}")
+        notify_payments(payments)
+        return len(payments)
+
+    paid = 0
+    error = None
+    for payment in payments:
+        try:
+            paid += pay(payment)
+        except ClientError as e:
+            print(f"Payment for submission {payment['submissionId']} failed: {e}")
+            error = error or e
+    if error:
+        raise error
+    return paid
+
+
+def requester_funds_short(error: ClientError) -> bool:
+    """Whether a cancelled payment transaction failed on the requester's balance check (item 0)."""
+    reasons = error.response.get('CancellationReasons') or []
+    return bool(reasons) and reasons[0].get('Code') == 'ConditionalCheckFailed'
+
+
+def ledger_row_exists(error: ClientError) -> bool:
+    """
+    Whether a cancelled payment transaction failed because a ledger row
+    already exists (the only conditioned items after the requester debit).
+    """
+    reasons = error.response.get('CancellationReasons') or []
+    return any(r.get('Code') == 'ConditionalCheckFailed' for r in reasons[1:])
 
 
 def execute_payment(submission_id: str, task_id: str, worker_id: str):
@@ -89,6 +403,10 @@ def execute_payment(submission_id: str, task_id: str, worker_id: str):
     3. Add 20% to Platform wallet
     4. Record all transactions
     """
+    if already_paid([submission_id]):
+        print(f"Submission {submission_id} was already paid")
+        return
+
     tasks_table = dynamodb.Table(config.TASKS_TABLE)
 
     # 1. Get Task Details (Price & Requester)
@@ -99,138 +417,62 @@ def execute_payment(submission_id: str, task_id: str, worker_id: str):
         print(f"Task {task_id} not found")
         return
 
-    requester_id = task.get('requesterId')
-    # Default price if not set, e.g., $0.50
-    total_price = Decimal(str(task.get('payload', {}).get('reward', 0.5)))
-    
-    # Calculate split
-    worker_amount, platform_fee = calculate_payment_split(total_price)
+    pay(build_payment(submission_id, task, worker_id))
 
-    print(f"Processing payment: ${total_price} total")
-    print(f"  - Worker ({worker_id}): ${worker_amount} (80%)")
-    print(f"  - Platform fee: ${platform_fee} (20%)")
-    print(f"  - From requester: {requester_id}")
 
-    # 2. Atomic Transaction: Move funds
-    timestamp = str(int(time.time()))
-    worker_txn_id = str(uuid.uuid4())
-    fee_txn_id = str(uuid.uuid4())
+def pay(payment: dict) -> bool:
+    """
+    Pay one submission in its own transaction.
+
+    Returns:
+        True if paid (or already paid before), False if the requester's
+        balance was insufficient
+
+    Raises:
+        ClientError: Other failures (including write conflicts), so the
+                     stream batch is retried
+    """
+    print(f"Processing payment: ${payment['total']} total")
+    print(f"  - Worker ({payment['workerId']}): ${payment['workerAmount']} (80%)")
+    print(f"  - Platform fee: ${payment['platformFee']} (20%)")
+    print(f"  - From requester: {payment['requesterId']}")
 
     client = boto3.client('dynamodb', region_name=config.AWS_REGION)
 
     try:
-        client.transact_write_items(
-            TransactItems=[
-                # Deduct FULL price from Requester
-                {
-                    'Update': {
-                        'TableName': config.WALLETS_TABLE,
-                        'Key': {'walletId': {'S': requester_id}},
-                        'UpdateExpression': 'SET balance = balance - :amount',
-                        'ConditionExpression': 'balance >= :amount',
-                        'ExpressionAttributeValues': {
-                            ':amount': {'N': str(total_price)}
-                        }
-                    }
-                },
-                # Add 80% to Worker
-                {
-                    'Update': {
-                        'TableName': config.WALLETS_TABLE,
-                        'Key': {'walletId': {'S': worker_id}},
-                        'UpdateExpression': 'ADD balance :amount',
-                        'ExpressionAttributeValues': {
-                            ':amount': {'N': str(worker_amount)}
-                        }
-                    }
-                },
-                # Add 20% to Platform Wallet
-                {
-                    'Update': {
-                        'TableName': config.WALLETS_TABLE,
-                        'Key': {'walletId': {'S': PLATFORM_WALLET_ID}},
-                        'UpdateExpression': 'ADD balance :amount',
-                        'ExpressionAttributeValues': {
-                            ':amount': {'N': str(platform_fee)}
-                        }
-                    }
-                },
-                # Record Worker Payment Transaction
-                {
-                    'Put': {
-                        'TableName': config.TRANSACTIONS_TABLE,
-                        'Item': {
-                            'transactionId': {'S': worker_txn_id},
-                            'type': {'S': 'TASK_PAYMENT'},
-                            'amount': {'N': str(worker_amount)},
-                            'grossAmount': {'N': str(total_price)},
-                            'platformFee': {'N': str(platform_fee)},
-                            'from': {'S': requester_id},
-                            'to': {'S': worker_id},
-                            'referenceId': {'S': submission_id},
-                            'taskId': {'S': task_id},
-                            'createdAt': {'S': timestamp}
-                        }
-                    }
-                },
-                # Record Platform Fee Transaction
-                {
-                    'Put': {
-                        'TableName': config.TRANSACTIONS_TABLE,
-                        'Item': {
-                            'transactionId': {'S': fee_txn_id},
-                            'type': {'S': 'PLATFORM_FEE'},
-                            'amount': {'N': str(platform_fee)},
-                            'from': {'S': requester_id},
-                            'to': {'S': PLATFORM_WALLET_ID},
-                            'referenceId': {'S': submission_id},
-                            'taskId': {'S': task_id},
-                            'createdAt': {'S': timestamp}
-                        }
-                    }
-                }
-            ]
-        )
-        print(f"Payment successful!")
-        print(f"  - Worker transaction: {worker_txn_id}")
-        print(f"  - Fee transaction: {fee_txn_id}")
+        # 2. Atomic Transaction: Move funds
+        client.transact_write_items(TransactItems=settlement_items(payment['requesterId'], [payment]))
+        print(f"Payment successful for submission {payment['submissionId']}")
 
-        # Send Notification via SES
-        send_payment_notification(worker_id, worker_amount, task_id, platform_fee)
+        # Queue the worker's notification (sent asynchronously)
+        notify_payments([payment])
+        return True
 
     except ClientError as e:
-        if e.response['Error']['Code'] == 'TransactionCanceledException':
-            print(f"Payment failed: Insufficient funds or wallet locked.")
+        if e.response['Error']['Code'] == 'TransactionCanceledException' and ledger_row_exists(e):
+            print(f"Submission {payment['submissionId']} was already paid")
+            return True
+        if e.response['Error']['Code'] == 'TransactionCanceledException' and requester_funds_short(e):
+            print(f"Payment failed: Insufficient funds.")
             print(f"Detail: {e.response}")
             # Mark submission as payment failed
-            mark_payment_failed(submission_id)
-        else:
-            print(f"Payment error: {e}")
-            raise e
+            mark_payment_failed(payment['submissionId'])
+            return False
+        print(f"Payment error: {e}")
+        raise e
 
 
-def send_payment_notification(worker_id: str, amount: Decimal, task_id: str, fee: Decimal):
-    """Send payment notification email to worker."""
-    try:
-        ses.send_email(
-            Source='noreply@crowdsourcing.com',
-            Destination={'ToAddresses': ['worker@example.com']},  # Mocked email
-            Message={
-                'Subject': {'Data': 'Payment Received! 💰'},
-                'Body': {
-                    'Text': {
-                        'Data': (
-                            f'Great news! You have received ${amount} for completing task {task_id}.\n\n'
-                            f'Note: A platform fee of ${fee} (20%) was deducted from the original reward.\n\n'
-                            f'Thank you for using our platform!'
-                        )
-                    }
-                }
-            }
-        )
-        print(f"Payment notification sent to worker {worker_id}")
-    except Exception as e:
-        print(f"SES Error (non-critical): {e}")
+def notify_payments(payments: list):
+    """Queue a payment notification per payment (coalesced per worker by the sender)."""
+    enqueue_notifications([
+        notification(PAYMENT, p['workerId'], {
+            'amount': p['workerAmount'],
+            'fee': p['platformFee'],
+            'taskId': p['taskId'],
+            'submissionId': p['submissionId']
+        })
+        for p in payments
+    ])
 
 
 def mark_payment_failed(submission_id: str):
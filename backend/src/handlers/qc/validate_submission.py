@@ -1,6 +1,6 @@
 """
 QC Validation Handler - AI-Powered Quality Control with Majority Voting.
-Triggered by SQS (Validation Queue).
+Triggered by SQS (FIFO Validation Queue, one message per submission).
 
 Integrates with:
 - Fraud Detection for bots, copy-paste, and spam
@@ -18,6 +18,7 @@ from shared.config import config
 from shared.models import SubmissionStatus, TaskStatus
 from shared.utils import text_similarity, normalize_text
 from shared.fraud_detection import FraudDetector
+from shared.assignments import close_for_review
 from shared.ai_services import (
     detect_labels,
     compare_labels_with_answer,
@@ -32,25 +33,28 @@ events = boto3.client('events', region_name=config.AWS_REGION)
 def handler(event, context):
     """
     Handler for executing QC logic.
-    Triggered by SQS (Validation Queue).
+    Triggered by SQS (FIFO Validation Queue, fed by shared.submission_relay).
     """
     print("Received event:", json.dumps(event))
 
-    if 'Records' in event:
-        for record in event['Records']:
-            if 'body' in record:
-                try:
-                    process_sqs_message(record)
-                except Exception as e:
-                    print(f"Error processing SQS record: {e}")
-                    import traceback
-                    traceback.print_exc()
-            elif 'dynamodb' in record:
-                if record['eventName'] == 'INSERT':
-                    process_stream_record(record)
-        return {"message": "Processed records"}
+    if 'Records' not in event:
+        return {"message": "Direct invocation ignored"}
 
-    return {"message": "Direct invocation ignored"}
+    records = event['Records']
+    for index, record in enumerate(records):
+        try:
+            process_sqs_message(record)
+        except Exception as e:
+            print(f"Error processing SQS record: {e}")
+            import traceback
+            traceback.print_exc()
+            # FIFO: later messages may belong to the same task, so they wait
+            # for this one to be retried first
+            return {'batchItemFailures': [
+                {'itemIdentifier': r['messageId']} for r in records[index:]
+            ]}
+
+    return {'batchItemFailures': []}
 
 
 def process_sqs_message(record):
@@ -60,25 +64,25 @@ def process_sqs_message(record):
     task_id = body.get('taskId')
     worker_id = body.get('workerId', 'unknown')
     worker_answer = body.get('answer')
-    evaluate_submission(submission_id, task_id, worker_id, worker_answer)
 
+    if not is_pending(submission_id):
+        print(f"Submission {submission_id} already evaluated, skipping")
+        return
 
-def process_stream_record(record):
-    """Process a submission from DynamoDB Stream."""
-    new_image = record['dynamodb']['NewImage']
-    submission_id = new_image['submissionId']['S']
-    task_id = new_image['taskId']['S']
-    worker_id = new_image.get('workerId', {}).get('S', 'unknown')
-    worker_answer = new_image['answer']['S']
+    evaluate_submission(submission_id, task_id, worker_id, worker_answer)
 
-    try:
-        parsed_answer = json.loads(worker_answer)
-        if isinstance(parsed_answer, str):
-            worker_answer = parsed_answer
-    except:
-        pass
 
-    evaluate_submission(submission_id, task_id, worker_id, worker_answer)
+def is_pending(submission_id):
+    """Whether a submission still awaits QC (guards against redelivered messages)."""
+    submissions_table = dynamodb.Table(config.SUBMISSIONS_TABLE)
+    response = submissions_table.get_item(
+        Key={'submissionId': submission_id},
+        ProjectionExpression='#status',
+        ExpressionAttributeNames={'#status': 'status'},
+        ConsistentRead=True
+    )
+    item = response.get('Item')
+    return bool(item) and item.get('status') == SubmissionStatus.PENDING
 
 
 # =============================================================================
@@ -426,13 +430,21 @@ def evaluate_submission(submission_id, task_id, worker_id, worker_answer):
     tasks_table = dynamodb.Table(config.TASKS_TABLE)
     submissions_table = dynamodb.Table(config.SUBMISSIONS_TABLE)
 
-    task_resp = tasks_table.get_item(Key={'taskId': task_id})
+    # Consistent read: the counters must include this submission
+    task_resp = tasks_table.get_item(Key={'taskId': task_id}, ConsistentRead=True)
     task = task_resp.get('Item')
 
     if not task:
         print(f"Task {task_id} not found")
         return
 
+    # All independent submissions are in: the task stops taking work
+    required = int(task.get('requiredSubmissions', 1))
+    if task.get('status') in (TaskStatus.PUBLISHED, TaskStatus.ASSIGNED) and \
+            int(task.get('submissionCount', required)) >= required:
+        if close_for_review(task_id):
+            print(f"Task {task_id} has {required} submissions, moved to Review")
+
     # Normalize task type from 'category' or 'type' field
     task_type = normalize_task_type(task)
     payload = task.get('payload', {})
@@ -566,7 +578,7 @@ def evaluate_submission(submission_id, task_id, worker_id, worker_answer):
         })
     
     # Step 4: Check quorum
-    quorum = config.CONSENSUS_QUORUM
+    quorum = int(task.get('requiredSubmissions') or config.CONSENSUS_QUORUM)
     submission_count = len(existing_submissions)
     
     print(f"Quorum check: {submission_count}/{quorum} submissions")
@@ -1,20 +1,29 @@
 import json
 import boto3
-import os
 import time
 import uuid
 from botocore.exceptions import ClientError
 from shared.config import config
-from shared.models import TaskStatus, SubmissionStatus
+from shared.models import SubmissionStatus, AssignmentStatus
+from shared.assignments import ASSIGNMENT_TYPE_LEASE, deserialize_item
+from shared.utils import format_response
 
 dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
-sqs = boto3.client('sqs', region_name=config.AWS_REGION)
+
+# Position of the assignment update in the submit transaction
+ASSIGNMENT_ITEM_INDEX = 1
+
 
 def handler(event, context):
     """
     Handler for submitting work for a task.
     POST /worker/tasks/{taskId}/submit
     Body: { "assignmentId": "...", "answer": "..." }
+       or { "leaseId": "...", "answer": "..." } for a task claimed in a batch
+
+    The assignment is checked by the submit transaction itself, so a submit
+    is a single DynamoDB call; a failed check returns the assignment as it
+    was, which is mapped to the 404/403/400 response.
     """
     try:
         task_id = event['pathParameters']['taskId']
@@ -24,183 +33,157 @@ def handler(event, context):
         worker_id = claims['sub']
 
         body = json.loads(event.get('body', '{}'))
-        assignment_id = body.get('assignmentId')
+        assignment_id = body.get('assignmentId') or body.get('leaseId')
         answer = body.get('answer')
 
         if not assignment_id or not answer:
-             return {
-                "statusCode": 400,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Credentials": True,
-                },
-                "body": json.dumps({
-                    "message": "Missing assignmentId or answer"
-                })
-            }
-
-        tasks_table = dynamodb.Table(config.TASKS_TABLE)
-        assignments_table = dynamodb.Table(config.ASSIGNMENTS_TABLE)
-        submissions_table = dynamodb.Table(config.SUBMISSIONS_TABLE)
-
-        # Verify assignment
-        # We need to check:
-        # 1. Assignment exists
-        # 2. Assignment belongs to this worker
-        # 3. Assignment is for this task
-        # 4. Assignment is active (not expired) and status is 'Assigned'
-
-        assignment = assignments_table.get_item(Key={'assignmentId': assignment_id})
-        item = assignment.get('Item')
-
-        if not item:
-            return {
-                "statusCode": 404,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Credentials": True,
-                },
-                "body": json.dumps({"message": "Assignment not found"})
-            }
-
-        if item.get('workerId') != worker_id:
-             return {
-                "statusCode": 403,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Credentials": True,
-                },
-                "body": json.dumps({"message": "Not authorized for this assignment"})
-            }
-
-        if item.get('taskId') != task_id:
-             return {
-                "statusCode": 400,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Credentials": True,
-                },
-                "body": json.dumps({"message": "Assignment does not match task"})
-            }
+            return format_response(400, {"message": "Missing assignmentId or answer"})
 
         current_time = int(time.time())
-        if current_time > int(item.get('expiresAt', 0)):
-             return {
-                "statusCode": 400,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Credentials": True,
-                },
-                "body": json.dumps({"message": "Assignment expired"})
-            }
-
-        if item.get('status') != 'Assigned':
-             return {
-                "statusCode": 400,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Credentials": True,
-                },
-                "body": json.dumps({"message": "Assignment is not active"})
-            }
-
-        submission_id = str(uuid.uuid4()) # Need to import uuid
-
-        # Transactional write:
-        # 1. Create Submission
-        # 2. Update Assignment status to 'Submitted'
-        # 3. Update Task status to 'Review' (or trigger QC)
-
-        try:
-            dynamodb.meta.client.transact_write_items(
-                TransactItems=[
-                    {
-                        'Put': {
-                            'TableName': config.SUBMISSIONS_TABLE,
-                            'Item': {
-                                'submissionId': {'S': submission_id},
-                                'taskId': {'S': task_id},
-                                'workerId': {'S': worker_id},
-                                'assignmentId': {'S': assignment_id},
-                                'status': {'S': SubmissionStatus.PENDING},
-                                'answer': {'S': json.dumps(answer) if isinstance(answer, (dict, list)) else str(answer)},
-                                'createdAt': {'S': str(current_time)}
-                            }
-                        }
-                    },
-                    {
-                        'Update': {
-                            'TableName': config.ASSIGNMENTS_TABLE,
-                            'Key': {'assignmentId': {'S': assignment_id}},
-                            'UpdateExpression': 'SET #status = :submitted_status',
-                            'ConditionExpression': '#status = :assigned_status',
-                            'ExpressionAttributeNames': {'#status': 'status'},
-                            'ExpressionAttributeValues': {
-                                ':assigned_status': {'S': 'Assigned'},
-                                ':submitted_status': {'S': 'Submitted'}
-                            }
-                        }
-                    },
-                    {
-                        'Update': {
-                            'TableName': config.TASKS_TABLE,
-                            'Key': {'taskId': {'S': task_id}},
-                            'UpdateExpression': 'SET #status = :review_status',
-                            'ExpressionAttributeNames': {'#status': 'status'},
-                            'ExpressionAttributeValues': {
-                                ':review_status': {'S': 'Review'} # Or whatever status implies QC needed
-                            }
-                        }
-                    }
-                ]
-            )
-
-            if config.SUBMISSION_QUEUE_URL:
-                sqs.send_message(
-                    QueueUrl=config.SUBMISSION_QUEUE_URL,
-                    MessageBody=json.dumps({
-                        'submissionId': submission_id,
-                        'taskId': task_id,
-                        'workerId': worker_id,
-                        'assignmentId': assignment_id,
-                        'answer': answer
-                    })
-                )
-
-            return {
-                "statusCode": 200,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Credentials": True,
-                },
-                "body": json.dumps({
-                    "message": "Work submitted successfully",
-                    "submissionId": submission_id
-                })
-            }
-
-        except ClientError as e:
-            print(f"Transaction error: {e}")
-            return {
-                "statusCode": 500,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Credentials": True,
-                },
-                "body": json.dumps({
-                    "message": "Failed to save submission"
-                })
-            }
+        submission = {
+            'submissionId': str(uuid.uuid4()),
+            'taskId': task_id,
+            'workerId': worker_id,
+            'assignmentId': assignment_id,
+            'status': SubmissionStatus.PENDING,
+            'answer': json.dumps(answer) if isinstance(answer, (dict, list)) else str(answer),
+            'createdAt': str(current_time)
+        }
+
+        is_lease = not body.get('assignmentId')
+        rejected = submit(submission, is_lease, current_time)
+
+        if rejected and rejected[0] and not is_lease and (rejected[1] or {}).get('type') == ASSIGNMENT_TYPE_LEASE:
+            # A lease ID sent as assignmentId: submit against the lease
+            rejected = submit(submission, True, current_time)
+
+        if rejected:
+            checks_failed, assignment = rejected
+            if not checks_failed:
+                return format_response(500, {"message": "Failed to save submission"})
+            status_code, message = rejection(assignment, worker_id, task_id, current_time)
+            return format_response(status_code, {"message": message})
+
+        # QC is queued by the Submissions stream relay (shared.submission_relay):
+        # the submission row written above is the only record of the work.
+        # A ready-queue message for the task is settled by the next claimer
+        # that receives it (deleted once the task has no open slots left).
+
+        return format_response(200, {
+            "message": "Work submitted successfully",
+            "submissionId": submission['submissionId']
+        })
 
     except Exception as e:
         print(f"Error submitting work: {str(e)}")
-        return {
-            "statusCode": 500,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Credentials": True,
-            },
-            "body": json.dumps({
-                "message": "Internal Server Error"
-            })
+        return format_response(500, {"message": "Internal Server Error"})
+
+
+def submit(submission, is_lease, now):
+    """
+    Transactional write:
+    1. Create Submission
+    2. Update Assignment status to 'Submitted' (or, for a lease, take the
+       task off its pending set; the lease stays active), conditioned on
+       owner, task, expiry and status
+    3. Count the submission on the task (its slot is now used up)
+
+    Returns:
+        None on success, or (checks_failed, assignment) if the transaction
+        was cancelled: checks_failed is True when the assignment conditions
+        failed, and assignment is the record as it was (None if missing)
+
+    Raises:
+        ClientError: For errors other than a cancelled transaction
+    """
+    task_id = submission['taskId']
+    condition_values = {
+        ':worker_id': submission['workerId'],
+        ':task_id': task_id,
+        ':now': now,
+        ':assigned_status': AssignmentStatus.ASSIGNED
+    }
+    condition = 'workerId = :worker_id AND expiresAt >= :now AND #status = :assigned_status'
+
+    if is_lease:
+        assignment_update = {
+            'UpdateExpression': 'DELETE pendingTaskIds :task_set',
+            'ConditionExpression': f'{condition} AND contains(pendingTaskIds, :task_id)',
+            'ExpressionAttributeValues': {**condition_values, ':task_set': {task_id}}
+        }
+    else:
+        assignment_update = {
+            'UpdateExpression': 'SET #status = :submitted_status',
+            'ConditionExpression': f'{condition} AND taskId = :task_id',
+            'ExpressionAttributeValues': {**condition_values, ':submitted_status': AssignmentStatus.SUBMITTED}
         }
+
+    try:
+        # Resource client: values are plain Python types, serialized by boto3
+        dynamodb.meta.client.transact_write_items(
+            TransactItems=[
+                {
+                    'Put': {
+                        'TableName': config.SUBMISSIONS_TABLE,
+                        'Item': submission
+                    }
+                },
+                {
+                    'Update': {
+                        'TableName': config.ASSIGNMENTS_TABLE,
+                        'Key': {'assignmentId': submission['assignmentId']},
+                        'ExpressionAttributeNames': {'#status': 'status'},
+                        'ReturnValuesOnConditionCheckFailure': 'ALL_OLD',
+                        **assignment_update
+                    }
+                },
+                {
+                    'Update': {
+                        'TableName': config.TASKS_TABLE,
+                        'Key': {'taskId': task_id},
+                        # Counters only: QC moves the task to Review once
+                        # submissionCount reaches requiredSubmissions
+                        'UpdateExpression': 'ADD submissionCount :one, activeAssignments :minus_one',
+                        'ExpressionAttributeValues': {':one': 1, ':minus_one': -1}
+                    }
+                }
+            ]
+        )
+        return None
+
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+        print(f"Transaction error: {e}")
+        reasons = e.response.get('CancellationReasons') or []
+        reason = reasons[ASSIGNMENT_ITEM_INDEX] if len(reasons) > ASSIGNMENT_ITEM_INDEX else {}
+        return reason.get('Code') == 'ConditionalCheckFailed', deserialize_item(reason.get('Item'))
+
+
+def rejection(assignment, worker_id, task_id, now):
+    """
+    Explain a failed assignment check from the assignment as it was.
+
+    Returns:
+        tuple: (status_code, message)
+    """
+    if not assignment:
+        return 404, "Assignment not found"
+
+    if assignment.get('workerId') != worker_id:
+        return 403, "Not authorized for this assignment"
+
+    if assignment.get('type') == ASSIGNMENT_TYPE_LEASE:
+        if task_id not in (assignment.get('pendingTaskIds') or set()):
+            return 400, "Task is not pending under this lease"
+    elif assignment.get('taskId') != task_id:
+        return 400, "Assignment does not match task"
+
+    if now > int(assignment.get('expiresAt', 0)):
+        return 400, "Assignment expired"
+
+    if assignment.get('status') != AssignmentStatus.ASSIGNED:
+        return 400, "Assignment is not active"
+
+    # The assignment changed between the check and the read (e.g. renewed)
+    return 409, "Assignment changed, please retry"
@@ -1,71 +1,81 @@
 import json
 import boto3
-import os
-import uuid
-import time
-from botocore.exceptions import ClientError
 from shared.config import config
-from shared.models import TaskStatus
+from shared.assignments import lock_task, lease_seconds_for, MAX_BATCH_CLAIM
+from shared.matching import claim_next_task, claim_next_tasks
 
 dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
 
+
 def handler(event, context):
     """
     Handler for assigning a task to a worker (Locking).
-    POST /worker/tasks/{taskId}/assign
+    POST /worker/tasks/{taskId}/assign  - lock a task chosen by the client
+    POST /worker/tasks/next             - let the matching engine pick one
+         Body (optional): { "count": K } - claim up to K tasks under one lease
     """
     try:
-        task_id = event['pathParameters']['taskId']
+        task_id = (event.get('pathParameters') or {}).get('taskId')
         # Get workerId from Cognito authorizer claims
         claims = event['requestContext']['authorizer']['claims']
         worker_id = claims['sub']
 
-        # We can set a TTL for the assignment (e.g., 10 minutes)
-        expires_at = int(time.time()) + 600
-        assignment_id = str(uuid.uuid4())
-
-        tasks_table = dynamodb.Table(config.TASKS_TABLE)
-        assignments_table = dynamodb.Table(config.ASSIGNMENTS_TABLE)
+        body = json.loads(event.get('body') or '{}')
+        try:
+            count = int(body.get('count', 1))
+        except (TypeError, ValueError):
+            count = 0
+        if count < 1:
+            return {
+                "statusCode": 400,
+                "headers": {
+                    "Access-Control-Allow-Origin": "*",
+                    "Access-Control-Allow-Credentials": True,
+                },
+                "body": json.dumps({
+                    "message": "count must be a positive integer."
+                })
+            }
+        count = min(count, MAX_BATCH_CLAIM)
 
-        # Transactional write to ensure atomicity:
+        # Transactional lock (see shared.assignments.lock_task):
         # 1. Check if Task is in 'Published' status.
         # 2. Update Task status to 'Assigned'.
         # 3. Create Assignment record.
 
-        try:
-            dynamodb.meta.client.transact_write_items(
-                TransactItems=[
-                    {
-                        'Update': {
-                            'TableName': config.TASKS_TABLE,
-                            'Key': {'taskId': {'S': task_id}},
-                            'UpdateExpression': 'SET #status = :assigned_status',
-                            'ConditionExpression': '#status = :published_status',
-                            'ExpressionAttributeNames': {'#status': 'status'},
-                            'ExpressionAttributeValues': {
-                                ':published_status': {'S': TaskStatus.PUBLISHED},
-                                ':assigned_status': {'S': 'Assigned'} # Adding Assigned to TaskStatus logic locally for now as it wasn't in models.py
-                            }
-                        }
+        if task_id:
+            # Lease duration depends on the task type
+            task = dynamodb.Table(config.TASKS_TABLE).get_item(
+                Key={'taskId': task_id},
+                ProjectionExpression='#type',
+                ExpressionAttributeNames={'#type': 'type'}
+            ).get('Item') or {}
+            assignment = lock_task(task_id, worker_id, lease_seconds_for(task.get('type')))
+            if not assignment:
+                # Multiple workers might race for the same task.
+                return {
+                    "statusCode": 409,
+                    "headers": {
+                        "Access-Control-Allow-Origin": "*",
+                        "Access-Control-Allow-Credentials": True,
                     },
-                    {
-                        'Put': {
-                            'TableName': config.ASSIGNMENTS_TABLE,
-                            'Item': {
-                                'assignmentId': {'S': assignment_id},
-                                'taskId': {'S': task_id},
-                                'workerId': {'S': worker_id},
-                                'status': {'S': 'Assigned'},
-                                'expiresAt': {'N': str(expires_at)},
-                                'createdAt': {'S': str(int(time.time()))}
-                            },
-                            # Ensure assignment doesn't already exist for this ID (unlikely with uuid)
-                            'ConditionExpression': 'attribute_not_exists(assignmentId)'
-                        }
-                    }
-                ]
-            )
-
+                    "body": json.dumps({
+                        "message": "Task is no longer available or already assigned."
+                    })
+                }
+        elif count > 1:
+            lease = claim_next_tasks(worker_id, count)
+            if not lease:
+                return {
+                    "statusCode": 404,
+                    "headers": {
+                        "Access-Control-Allow-Origin": "*",
+                        "Access-Control-Allow-Credentials": True,
+                    },
+                    "body": json.dumps({
+                        "message": "No tasks available for your level right now."
+                    })
+                }
             return {
                 "statusCode": 200,
                 "headers": {
@@ -73,30 +83,40 @@ def handler(event, context):
                     "Access-Control-Allow-Credentials": True,
                 },
                 "body": json.dumps({
-                    "message": "Task assigned successfully",
-                    "assignmentId": assignment_id,
-                    "expiresAt": expires_at
+                    "message": f"{len(lease['taskIds'])} tasks assigned successfully",
+                    "leaseId": lease['assignmentId'],
+                    "taskIds": lease['taskIds'],
+                    "expiresAt": lease['expiresAt']
                 })
             }
-
-        except ClientError as e:
-            error_code = e.response['Error']['Code']
-            if error_code == 'TransactionCanceledException':
-                # Cancellation reasons correspond to the TransactItems list order
-                # We need to parse which one failed, but typically it's the ConditionCheck on Task status
-                # because multiple workers might race for the same task.
+        else:
+            match = claim_next_task(worker_id)
+            if not match:
                 return {
-                    "statusCode": 409,
+                    "statusCode": 404,
                     "headers": {
                         "Access-Control-Allow-Origin": "*",
                         "Access-Control-Allow-Credentials": True,
                     },
                     "body": json.dumps({
-                        "message": "Task is no longer available or already assigned."
+                        "message": "No tasks available for your level right now."
                     })
                 }
-            else:
-                raise e
+            _, assignment = match
+
+        return {
+            "statusCode": 200,
+            "headers": {
+                "Access-Control-Allow-Origin": "*",
+                "Access-Control-Allow-Credentials": True,
+            },
+            "body": json.dumps({
+                "message": "Task assigned successfully",
+                "taskId": assignment['taskId'],
+                "assignmentId": assignment['assignmentId'],
+                "expiresAt": assignment['expiresAt']
+            })
+        }
 
     except Exception as e:
         print(f"Error assigning task: {str(e)}")
@@ -0,0 +1,37 @@
+"""
+Backfill Status Shards Handler.
+Invoked on demand after StatusShardIndex is deployed; re-invoke with the
+returned { "startKey": ... } until it reports done.
+
+Writes `statusShard` on tasks created before status sharding, so they
+appear in StatusShardIndex. Readers stay on StatusIndex until
+STATUS_SHARD_READS is turned on, which should happen once this has run.
+"""
+from boto3.dynamodb.conditions import Attr
+from shared.config import config
+from shared.migrations import run_backfill
+from shared.status_index import STATUS_SHARD_ATTRIBUTE, status_shard_key
+
+
+def handler(event, context):
+    return run_backfill(
+        config.TASKS_TABLE,
+        Attr(STATUS_SHARD_ATTRIBUTE).not_exists() & Attr('status').exists(),
+        add_status_shard,
+        event,
+        context
+    )
+
+
+def add_status_shard(table, task):
+    """Set a task's statusShard, unless its status changed since the scan."""
+    table.update_item(
+        Key={'taskId': task['taskId']},
+        UpdateExpression='SET statusShard = :shard',
+        ConditionExpression='#status = :status',
+        ExpressionAttributeNames={'#status': 'status'},
+        ExpressionAttributeValues={
+            ':shard': status_shard_key(task['status'], task['taskId']),
+            ':status': task['status']
+        }
+    )
@@ -0,0 +1,30 @@
+"""
+Backfill Task Counts Handler.
+Invoked on demand after RequesterStatusIndex and track_task_status are
+deployed; re-invoke with the returned { "startKey": ... } until it reports
+done.
+
+Indexes and counts the tasks whose status hasn't changed since tracking
+started (track_task_status only sees changes). The dashboard keeps reading
+RequesterIdIndex until REQUESTER_STATUS_READS is turned on, which should
+happen once this has run.
+"""
+from boto3.dynamodb.conditions import Attr
+from shared.config import config
+from shared.migrations import run_backfill
+from shared.task_counts import COUNTED_STATUS_ATTRIBUTE, record_status
+
+
+def handler(event, context):
+    return run_backfill(
+        config.TASKS_TABLE,
+        Attr(COUNTED_STATUS_ATTRIBUTE).not_exists() & Attr('status').exists(),
+        count_task,
+        event,
+        context
+    )
+
+
+def count_task(table, task):
+    """Record a task's status (a no-op if the stream got there first)."""
+    record_status(task)
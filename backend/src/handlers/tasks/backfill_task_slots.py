@@ -0,0 +1,44 @@
+"""
+Backfill Task Slots Handler.
+Invoked on demand; re-invoke with the returned { "startKey": ... } until
+it reports done.
+
+Writes the slot counters (requiredSubmissions, openSlots) on tasks created
+before redundant submissions: a single slot, open unless the task is
+already Assigned. This also repairs the openSlots that claims of such
+tasks used to create at -1 (left at 0 once the claim expired, so the task
+could never be claimed again).
+"""
+from boto3.dynamodb.conditions import Attr
+from shared.config import config
+from shared.migrations import run_backfill
+from shared.models import TaskStatus
+
+# Statuses in which a task's slots are still in use
+OPEN_STATUSES = (TaskStatus.CREATED, TaskStatus.PUBLISHED, TaskStatus.ASSIGNED)
+
+
+def handler(event, context):
+    return run_backfill(
+        config.TASKS_TABLE,
+        Attr('requiredSubmissions').not_exists() & Attr('status').is_in(list(OPEN_STATUSES)),
+        add_slot_counters,
+        event,
+        context
+    )
+
+
+def add_slot_counters(table, task):
+    """Give a task one slot, unless it was claimed or changed since the scan."""
+    open_slots = 0 if task['status'] == TaskStatus.ASSIGNED else 1
+    table.update_item(
+        Key={'taskId': task['taskId']},
+        UpdateExpression='SET requiredSubmissions = :one, openSlots = :open_slots',
+        ConditionExpression='#status = :status AND attribute_not_exists(requiredSubmissions)',
+        ExpressionAttributeNames={'#status': 'status'},
+        ExpressionAttributeValues={
+            ':one': 1,
+            ':open_slots': open_slots,
+            ':status': task['status']
+        }
+    )
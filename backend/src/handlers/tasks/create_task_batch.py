@@ -1,7 +1,12 @@
 """
 Create Task Batch Handler.
 Creates multiple tasks in a batch, with optional Gold Standard tasks.
-For audio-transcription tasks, automatically starts Amazon Transcribe jobs.
+For audio-transcription tasks, queues Amazon Transcribe jobs (started by
+dispatch_transcriptions at a rate Transcribe accepts).
+
+Large batches can instead be uploaded as a JSONL/CSV manifest to the media
+bucket, under manifests/<requesterId>/, and referenced with "manifestS3Key"; the tasks are then created
+asynchronously by ingest_manifest and progress is kept on the batch record.
 """
 import json
 import uuid
@@ -9,8 +14,20 @@ import datetime
 from shared.config import config
 from shared.logging import logger, log_event
 from shared.auth import get_user_sub
-from shared.models import TaskStatus
+from shared.models import BatchStatus, TranscriptionStatus
 from shared.dynamo import batch_write_items
+from shared.ingestion import (
+    build_task_item,
+    get_audio_key,
+    mark_transcription_queued,
+    queue_transcriptions,
+    manifest_format,
+    manifest_prefix,
+    create_batch_record,
+    start_ingestion,
+    MANIFEST_FORMAT_JSONL,
+    MANIFEST_FORMAT_CSV
+)
 
 
 def handler(event, context):
@@ -25,6 +42,16 @@ def handler(event, context):
         }
 
     requester_id = get_user_sub(event)
+
+    if body.get('manifestS3Key'):
+        # Manifest access is scoped to the caller, so no body fallback here
+        if not requester_id:
+            return {
+                'statusCode': 401,
+                'body': json.dumps({'error': 'Unauthorized'})
+            }
+        return start_manifest_batch(body, requester_id)
+
     if not requester_id:
         requester_id = body.get('requesterId', 'demo-requester')
 
@@ -40,85 +67,110 @@ def handler(event, context):
     timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
 
     items_to_write = []
-    transcription_started = 0
 
-    for task_input in tasks_data:
+    for index, task_input in enumerate(tasks_data):
         task_id = str(uuid.uuid4())
-        task_type = task_input.get('type', 'generic')
-        payload = task_input.get('payload', {})
-        
-        # Logic: if goldAnswer is present and truthy, it is gold. Or if isGold is explicitly true.
-        is_gold = task_input.get('isGold', False)
-        gold_answer = task_input.get('goldAnswer')
-
-        if gold_answer:
-            is_gold = True
-
-        item = {
-            'taskId': task_id,
-            'requesterId': requester_id,
-            'batchId': batch_id,
-            'status': TaskStatus.CREATED,
-            'type': task_type,
-            'payload': payload,
-            'createdAt': timestamp,
-            'isGold': is_gold,
-            'requiredLevel': task_input.get('requiredLevel', 'Novice')  # Gamification: skill level required
-        }
-
-        # Only add goldAnswer if it exists (not None)
-        if is_gold and gold_answer is not None:
-            item['goldAnswer'] = gold_answer
-
-        # =================================================================
-        # Audio Transcription: Start Amazon Transcribe job pre-emptively
-        # =================================================================
-        if task_type == 'audio-transcription' and not is_gold:
-            audio_key = payload.get('audioS3Key') or payload.get('audio_key') or payload.get('audioKey')
-            
-            if audio_key and config.MEDIA_BUCKET:
-                try:
-                    from shared.ai_services import start_transcription_job
-                    
-                    job_name = start_transcription_job(
-                        bucket=config.MEDIA_BUCKET,
-                        key=audio_key,
-                        language=config.TRANSCRIBE_LANGUAGE
-                    )
-                    
-                    item['transcriptionJobName'] = job_name
-                    item['transcriptionStatus'] = 'IN_PROGRESS'
-                    transcription_started += 1
-                    print(f"Started transcription job {job_name} for task {task_id}")
-                    
-                except Exception as e:
-                    print(f"Failed to start transcription for task {task_id}: {e}")
-                    # Continue without transcription - will be handled at QC time
-                    item['transcriptionStatus'] = 'NOT_STARTED'
+        try:
+            item = build_task_item(task_input, requester_id, batch_id, task_id, timestamp)
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': f'Task {index}: {e}'})
+            }
+
+        # Audio Transcription: Transcribe jobs are started asynchronously by
+        # dispatch_transcriptions, paced to the service's quotas
+        if get_audio_key(item):
+            if config.MEDIA_BUCKET and config.TRANSCRIPTION_QUEUE_URL:
+                mark_transcription_queued(item)
             else:
-                print(f"Missing audio_key or MEDIA_BUCKET for audio-transcription task {task_id}")
+                print(f"Missing MEDIA_BUCKET or TRANSCRIPTION_QUEUE_URL for audio-transcription task {task_id}")
+                item['transcriptionStatus'] = TranscriptionStatus.NOT_STARTED
 
         items_to_write.append(item)
 
-    success = batch_write_items(config.TASKS_TABLE, items_to_write)
+    write_result = batch_write_items(config.TASKS_TABLE, items_to_write, key_names=['taskId'])
 
-    if not success:
+    if write_result.written == 0:
         return {
             'statusCode': 500,
             'body': json.dumps({'error': 'Failed to save tasks'})
         }
 
+    failed_ids = {item['taskId'] for item in write_result.failed}
+    created = [item for item in items_to_write if item['taskId'] not in failed_ids]
+    transcriptions_queued = queue_transcriptions(created)
+
     response_body = {
-        'message': f'Created {len(items_to_write)} tasks',
+        'message': f'Created {len(created)} tasks',
         'batchId': batch_id,
         'requesterId': requester_id
     }
+    if write_result.failed:
+        # Partial success: report which inputs (by position) were not saved
+        response_body['failedTaskIndexes'] = [
+            i for i, item in enumerate(items_to_write) if item['taskId'] in failed_ids
+        ]
     
-    if transcription_started > 0:
-        response_body['transcriptionJobsStarted'] = transcription_started
+    if transcriptions_queued > 0:
+        response_body['transcriptionJobsQueued'] = transcriptions_queued
 
     return {
-        'statusCode': 201,
+        'statusCode': 207 if write_result.failed else 201,
         'body': json.dumps(response_body)
     }
 
+
+def start_manifest_batch(body, requester_id):
+    """
+    Register a manifest batch and queue its ingestion.
+    Body: { "manifestS3Key": "...", "manifestFormat": "jsonl" | "csv" (optional) }
+    """
+    manifest_key = body['manifestS3Key']
+    # A requester can only ingest manifests they uploaded
+    if not isinstance(manifest_key, str) or not manifest_key.startswith(manifest_prefix(requester_id)):
+        return {
+            'statusCode': 403,
+            'body': json.dumps({'error': f'Manifest must be under {manifest_prefix(requester_id)}'})
+        }
+
+    fmt = manifest_format(manifest_key, body.get('manifestFormat'))
+    if fmt not in (MANIFEST_FORMAT_JSONL, MANIFEST_FORMAT_CSV):
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': f'Unsupported manifest format: {fmt}'})
+        }
+
+    if not config.MEDIA_BUCKET or not config.BATCHES_TABLE or not config.INGESTION_QUEUE_URL:
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': 'Manifest ingestion is not configured'})
+        }
+
+    batch_id = str(uuid.uuid4())
+    # Manifests are only read from the media bucket
+    create_batch_record(batch_id, requester_id, config.MEDIA_BUCKET, manifest_key, fmt)
+
+    queued = start_ingestion({
+        'batchId': batch_id,
+        'requesterId': requester_id,
+        'bucket': config.MEDIA_BUCKET,
+        'key': manifest_key,
+        'format': fmt,
+        'offset': 0
+    })
+    if not queued:
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': 'Failed to queue manifest ingestion'})
+        }
+
+    return {
+        'statusCode': 202,
+        'body': json.dumps({
+            'message': 'Manifest accepted, tasks are being created',
+            'batchId': batch_id,
+            'requesterId': requester_id,
+            'status': BatchStatus.INGESTING
+        })
+    }
@@ -0,0 +1,170 @@
+"""
+Dispatch Transcriptions Handler.
+Triggered by SQS (Transcription Queue). Starts the Amazon Transcribe job
+requested for each audio task and records it on the task, so task creation
+never waits on Transcribe.
+
+Job starts are paced by a token bucket (TRANSCRIBE_START_RATE per
+dispatcher; the event source caps how many dispatchers run at once). When
+Transcribe throttles or its concurrent-job quota is full, the rest of the
+batch is handed back to SQS with an exponential, jittered visibility delay
+instead of hammering the API.
+"""
+import json
+import math
+import time
+import boto3
+from botocore.exceptions import ClientError
+from shared.config import config
+from shared.logging import logger
+from shared.models import TranscriptionStatus
+from shared.ai_services import start_transcription_job
+from shared.rate_limit import TokenBucket, is_throttling_error, backoff_delay
+
+dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
+sqs = boto3.client('sqs', region_name=config.AWS_REGION)
+
+# Shared by every invocation in this container
+start_bucket = TokenBucket(config.TRANSCRIBE_START_RATE, config.TRANSCRIBE_START_BURST)
+
+# Quick in-invocation retries on throttling before requeueing through SQS
+START_RETRIES = 2
+
+# Don't wait for tokens when less than this much time is left
+TIME_RESERVE_SECONDS = 5
+
+# Requests Transcribe will never accept; retrying can't help
+PERMANENT_ERROR_CODES = {'BadRequestException'}
+
+
+def transcription_job_name(task_id: str) -> str:
+    """One job per task: a redelivered request can't start a second job."""
+    return f"task-transcription-{task_id}"
+
+
+def handler(event, context):
+    """
+    Handler for Transcribe job requests.
+    Message: { taskId, bucket, key }
+    Failed and deferred messages are reported back to SQS individually;
+    malformed ones are dropped.
+    """
+    failures = []
+    throttled = False
+
+    for record in event.get('Records', []):
+        try:
+            request = json.loads(record['body'])
+            request['taskId']
+        except (ValueError, KeyError, TypeError):
+            # Malformed: retrying can't help, let it go
+            logger.error(f"Dropping malformed transcription request {record.get('messageId')}")
+            continue
+
+        receive_count = int(record.get('attributes', {}).get('ApproximateReceiveCount', 1))
+        time_left = context.get_remaining_time_in_millis() / 1000 - TIME_RESERVE_SECONDS
+
+        if throttled:
+            # Transcribe is pushing back: don't spend the rest of the batch on it
+            requeue(record, throttle_delay(receive_count))
+            failures.append({'itemIdentifier': record['messageId']})
+            continue
+
+        if not start_bucket.acquire(timeout=max(0.0, time_left)):
+            requeue(record, math.ceil(start_bucket.wait_time()))
+            failures.append({'itemIdentifier': record['messageId']})
+            continue
+
+        try:
+            dispatch(request)
+        except Exception as e:
+            if is_throttling_error(e):
+                throttled = True
+                set_transcription_status(request['taskId'], TranscriptionStatus.THROTTLED)
+                requeue(record, throttle_delay(receive_count))
+                logger.warning(f"Transcribe throttled on task {request['taskId']}, backing off")
+            else:
+                logger.error(f"Transcription request {record.get('messageId')} failed: {e}")
+            failures.append({'itemIdentifier': record['messageId']})
+
+    return {'batchItemFailures': failures}
+
+
+def dispatch(request):
+    """
+    Start one transcription job and mark the task IN_PROGRESS.
+
+    Raises:
+        ClientError: Throttling that persisted through START_RETRIES, or a
+                     retryable service error
+    """
+    task_id = request['taskId']
+    job_name = transcription_job_name(task_id)
+
+    for attempt in range(START_RETRIES + 1):
+        try:
+            start_transcription_job(
+                bucket=request['bucket'],
+                key=request['key'],
+                job_name=job_name,
+                language=config.TRANSCRIBE_LANGUAGE
+            )
+            break
+        except ClientError as e:
+            code = e.response['Error']['Code']
+            if code == 'ConflictException':
+                # Already started by an earlier delivery of this request
+                logger.info(f"Transcription job {job_name} already exists")
+                break
+            if code in PERMANENT_ERROR_CODES:
+                set_transcription_status(task_id, TranscriptionStatus.FAILED, error=str(e)[:200])
+                logger.error(f"Transcribe rejected task {task_id}: {e}")
+                return
+            if not is_throttling_error(e) or attempt == START_RETRIES:
+                raise
+            # Others in this container are hitting the same limit
+            start_bucket.drain()
+            time.sleep(backoff_delay(attempt + 1, base=0.5, cap=4.0))
+
+    set_transcription_status(task_id, TranscriptionStatus.IN_PROGRESS, job_name=job_name)
+    logger.info(f"Started transcription job {job_name} for task {task_id}")
+
+
+def set_transcription_status(task_id, status, job_name=None, error=None):
+    """Record dispatch progress on the task (never overwriting a finished transcription)."""
+    assignments = ['transcriptionStatus = :status']
+    values = {':status': status, ':one': 1, ':completed': TranscriptionStatus.COMPLETED}
+    if job_name:
+        assignments.append('transcriptionJobName = :job')
+        values[':job'] = job_name
+    if error:
+        assignments.append('transcriptionError = :error')
+        values[':error'] = error
+
+    try:
+        dynamodb.Table(config.TASKS_TABLE).update_item(
+            Key={'taskId': task_id},
+            UpdateExpression=f"SET {', '.join(assignments)} ADD transcriptionAttempts :one",
+            ConditionExpression='attribute_not_exists(transcriptionStatus) OR transcriptionStatus <> :completed',
+            ExpressionAttributeValues=values
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+
+def throttle_delay(receive_count: int) -> int:
+    """Requeue delay after throttling, growing with each receive of the message."""
+    return int(backoff_delay(receive_count, config.TRANSCRIBE_BACKOFF_BASE, config.TRANSCRIBE_BACKOFF_MAX)) + 1
+
+
+def requeue(record, delay_seconds: int):
+    """Hide a message for `delay_seconds` so SQS redelivers it later."""
+    try:
+        sqs.change_message_visibility(
+            QueueUrl=config.TRANSCRIPTION_QUEUE_URL,
+            ReceiptHandle=record['receiptHandle'],
+            VisibilityTimeout=max(0, min(int(delay_seconds), 12 * 60 * 60))
+        )
+    except Exception as e:
+        logger.warning(f"Could not delay message {record.get('messageId')}: {e}")
@@ -5,12 +5,14 @@ Triggered by EventBridge scheduler every minute to expire stale assignments.
 import json
 import boto3
 import time
-from datetime import datetime, timezone, timedelta
+from botocore.exceptions import ClientError
 from shared.config import config
 from shared.models import TaskStatus, AssignmentStatus
+from shared.status_index import status_shard_key
+from shared.assignments import ASSIGNMENT_TYPE_LEASE
 
-# Assignment expires after this many minutes
-ASSIGNMENT_TIMEOUT_MINUTES = 10
+# TransactWriteItems limit
+MAX_TRANSACTION_ITEMS = 100
 
 dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
 
@@ -19,81 +21,50 @@ def handler(event, context):
     """
     Scheduled handler to expire old task assignments.
     Should be triggered every 1-5 minutes by EventBridge.
+
+    An assignment is stale once its expiresAt has passed. Leases renewed by
+    a heartbeat have a later expiresAt and are left alone; the expiry is
+    conditioned on expiresAt so a renewal racing the sweep wins.
     
     When an assignment expires:
     1. Assignment status -> 'Expired'
-    2. Task status -> 'Published' (re-released to pool)
-    3. Task assignedTo -> null
+    2. The worker's slot on the task is given back (openSlots +1)
+    3. Task status -> 'Published' (re-released to pool)
+
+    For a batch lease, every task still pending under it is re-released.
     """
     print(f"Running assignment expiration check...")
     
     assignments_table = dynamodb.Table(config.ASSIGNMENTS_TABLE)
     tasks_table = dynamodb.Table(config.TASKS_TABLE)
     
-    # Calculate cutoff timestamp
-    cutoff = datetime.now(timezone.utc) - timedelta(minutes=ASSIGNMENT_TIMEOUT_MINUTES)
-    cutoff_ts = str(int(cutoff.timestamp()))
+    now = int(time.time())
     
-    # Scan for assigned (active) assignments older than timeout
-    # In production, use GSI on status + createdAt for efficiency
+    # Scan for assigned (active) assignments whose lease has lapsed
+    # In production, use GSI on status + expiresAt for efficiency
     response = assignments_table.scan(
-        FilterExpression='#status = :assigned AND createdAt < :cutoff',
+        FilterExpression='#status = :assigned AND expiresAt < :now',
         ExpressionAttributeNames={'#status': 'status'},
         ExpressionAttributeValues={
             ':assigned': AssignmentStatus.ASSIGNED,
-            ':cutoff': cutoff_ts
+            ':now': now
         }
     )
     
     stale_assignments = response.get('Items', [])
-    print(f"Found {len(stale_assignments)} stale assignments older than {ASSIGNMENT_TIMEOUT_MINUTES} min")
+    print(f"Found {len(stale_assignments)} expired assignments")
     
     expired_count = 0
-    timestamp = str(int(time.time()))
-    
+
     for assignment in stale_assignments:
         try:
-            assignment_id = assignment['assignmentId']
-            task_id = assignment['taskId']
-            worker_id = assignment.get('workerId', 'unknown')
-            
-            # Use transaction to ensure atomicity
-            client = boto3.client('dynamodb', region_name=config.AWS_REGION)
-            
-            client.transact_write_items(
-                TransactItems=[
-                    # Expire the assignment
-                    {
-                        'Update': {
-                            'TableName': config.ASSIGNMENTS_TABLE,
-                            'Key': {'assignmentId': {'S': assignment_id}},
-                            'UpdateExpression': 'SET #status = :expired, expiredAt = :ts',
-                            'ExpressionAttributeNames': {'#status': 'status'},
-                            'ExpressionAttributeValues': {
-                                ':expired': {'S': AssignmentStatus.EXPIRED},
-                                ':ts': {'S': timestamp}
-                            }
-                        }
-                    },
-                    # Re-release the task
-                    {
-                        'Update': {
-                            'TableName': config.TASKS_TABLE,
-                            'Key': {'taskId': {'S': task_id}},
-                            'UpdateExpression': 'SET #status = :published, assignedTo = :null, assignedAt = :null',
-                            'ExpressionAttributeNames': {'#status': 'status'},
-                            'ExpressionAttributeValues': {
-                                ':published': {'S': TaskStatus.PUBLISHED},
-                                ':null': {'NULL': True}
-                            }
-                        }
-                    }
-                ]
-            )
-            
-            print(f"Expired assignment {assignment_id} (task: {task_id}, worker: {worker_id})")
+            released = expire_assignment(assignment, now)
+            if released is None:
+                print(f"Assignment {assignment['assignmentId']} was renewed or submitted, skipping")
+                continue
+            print(f"Expired assignment {assignment['assignmentId']} "
+                  f"(worker: {assignment.get('workerId', 'unknown')}, {released} tasks released)")
             expired_count += 1
-            
         except Exception as e:
             print(f"Error processing assignment {assignment.get('assignmentId')}: {e}")
     
@@ -101,3 +72,144 @@ def handler(event, context):
         'checked': len(stale_assignments),
         'expired': expired_count
     }
+
+
+def expire_assignment(assignment: dict, now: int):
+    """
+    Expire an assignment or batch lease and give its slots back.
+
+    A single assignment is expired and its task released in one
+    transaction, conditioned on the assignment still being active and not
+    renewed since the scan. If the task has moved on, the assignment is
+    expired alone.
+
+    A lapsed lease can no longer be renewed or submitted against (both
+    require expiresAt >= now), so its pending tasks are read consistently
+    and released first, in transactions of up to MAX_TRANSACTION_ITEMS,
+    each task only if this worker still holds a slot. The lease is marked
+    Expired last: if a release fails it stays Assigned and the next sweep
+    retries it.
+
+    Returns:
+        Number of tasks released, or None if the assignment was renewed or submitted
+    """
+    client = boto3.client('dynamodb', region_name=config.AWS_REGION)
+    worker_id = assignment.get('workerId', 'unknown')
+
+    if assignment.get('type') != ASSIGNMENT_TYPE_LEASE:
+        try:
+            client.transact_write_items(
+                TransactItems=[
+                    _expire_assignment_item(assignment['assignmentId'], now),
+                    _release_task_item(assignment['taskId'], worker_id)
+                ]
+            )
+            return 1
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            reasons = e.response.get('CancellationReasons') or []
+            if not reasons or reasons[0].get('Code') == 'ConditionalCheckFailed':
+                # Renewed, submitted (or already expired) since the scan
+                return None
+            if len(reasons) < 2 or reasons[1].get('Code') != 'ConditionalCheckFailed':
+                raise
+        # The task moved on without this worker: only the assignment expires
+        return 0 if _expire(client, assignment['assignmentId'], now) else None
+
+    lease = client.get_item(
+        TableName=config.ASSIGNMENTS_TABLE,
+        Key={'assignmentId': {'S': assignment['assignmentId']}},
+        ProjectionExpression='#status, expiresAt, pendingTaskIds',
+        ExpressionAttributeNames={'#status': 'status'},
+        ConsistentRead=True
+    ).get('Item', {})
+    if (lease.get('status', {}).get('S') != AssignmentStatus.ASSIGNED
+            or int(lease.get('expiresAt', {}).get('N', now)) >= now):
+        return None
+
+    pending = lease.get('pendingTaskIds', {}).get('SS', [])
+    released = 0
+    for i in range(0, len(pending), MAX_TRANSACTION_ITEMS):
+        chunk = pending[i:i + MAX_TRANSACTION_ITEMS]
+        try:
+            client.transact_write_items(
+                TransactItems=[_release_task_item(task_id, worker_id) for task_id in chunk]
+            )
+            released += len(chunk)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            # Some task moved on; release the rest one by one
+            for task_id in chunk:
+                try:
+                    client.update_item(**_release_task_item(task_id, worker_id)['Update'])
+                    released += 1
+                except ClientError as e:
+                    if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                        raise
+
+    return released if _expire(client, assignment['assignmentId'], now) else None
+
+
+def _expire(client, assignment_id: str, now: int) -> bool:
+    """Expire an assignment on its own; False if it is no longer a lapsed active one."""
+    try:
+        client.update_item(**_expire_assignment_item(assignment_id, now)['Update'])
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+
+
+def _expire_assignment_item(assignment_id: str, now: int) -> dict:
+    """Transaction item expiring an assignment that is still active and lapsed."""
+    return {
+        'Update': {
+            'TableName': config.ASSIGNMENTS_TABLE,
+            'Key': {'assignmentId': {'S': assignment_id}},
+            'UpdateExpression': 'SET #status = :expired, expiredAt = :ts',
+            'ConditionExpression': '#status = :assigned AND expiresAt < :now',
+            'ExpressionAttributeNames': {'#status': 'status'},
+            'ExpressionAttributeValues': {
+                ':expired': {'S': AssignmentStatus.EXPIRED},
+                ':assigned': {'S': AssignmentStatus.ASSIGNED},
+                ':now': {'N': str(now)},
+                ':ts': {'S': str(now)}
+            }
+        }
+    }
+
+
+def _release_task_item(task_id: str, worker_id: str) -> dict:
+    """
+    Transaction item giving a worker's slot back to a task and re-publishing it.
+
+    Applies only while the worker still holds a slot on a task that hasn't
+    moved on to Review. Tasks claimed before slot counters existed have no
+    workerIds and are released while still Assigned.
+    """
+    return {
+        'Update': {
+            'TableName': config.TASKS_TABLE,
+            'Key': {'taskId': {'S': task_id}},
+            # assignedTo/assignedAt key GSIs, so they are removed rather than nulled
+            'UpdateExpression': 'SET #status = :published, statusShard = :shard '
+                                'ADD openSlots :one, activeAssignments :minus_one '
+                                'DELETE workerIds :worker_set '
+                                'REMOVE assignedTo, assignedAt, leaseId, leaseExpiresAt',
+            'ConditionExpression': '(#status IN (:published, :assigned) AND contains(workerIds, :worker_id)) '
+                                   'OR (#status = :assigned AND attribute_not_exists(workerIds))',
+            'ExpressionAttributeNames': {'#status': 'status'},
+            'ExpressionAttributeValues': {
+                ':published': {'S': TaskStatus.PUBLISHED},
+                ':assigned': {'S': TaskStatus.ASSIGNED},
+                ':shard': {'S': status_shard_key(TaskStatus.PUBLISHED, task_id)},
+                ':one': {'N': '1'},
+                ':minus_one': {'N': '-1'},
+                ':worker_id': {'S': worker_id},
+                ':worker_set': {'SS': [worker_id]}
+            }
+        }
+    }
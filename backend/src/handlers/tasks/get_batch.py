@@ -0,0 +1,32 @@
+"""
+Get Batch Handler.
+Returns a batch record, including manifest ingestion progress.
+"""
+from shared.logging import log_event
+from shared.auth import get_user_sub
+from shared.ingestion import get_batch
+from shared.utils import format_response
+
+
+def handler(event, context):
+    """
+    GET /requester/batches/{batchId}
+    """
+    log_event(event)
+
+    requester_id = get_user_sub(event)
+    if not requester_id:
+        return format_response(401, {'error': 'Unauthorized'})
+
+    batch_id = (event.get('pathParameters') or {}).get('batchId')
+    if not batch_id:
+        return format_response(400, {'error': 'Missing batchId'})
+
+    batch = get_batch(batch_id)
+    if not batch:
+        return format_response(404, {'error': 'Batch not found'})
+
+    if batch.get('requesterId') != requester_id:
+        return format_response(403, {'error': 'Not authorized for this batch'})
+
+    return format_response(200, batch)
@@ -0,0 +1,113 @@
+"""
+Ingest Manifest Handler.
+Triggered by SQS (Ingestion Queue). Streams a JSONL/CSV task manifest from
+S3 and creates its tasks window by window, recording progress on the
+batch record. When the invocation runs low on time it queues a
+continuation job at the current byte offset and returns.
+"""
+import json
+import datetime
+from shared.config import config
+from shared.logging import logger
+from shared.models import BatchStatus
+from shared.ingestion import (
+    MANIFEST_FORMAT_CSV,
+    build_task_item,
+    get_batch,
+    get_audio_key,
+    mark_transcription_queued,
+    iter_manifest,
+    read_csv_header,
+    row_task_id,
+    write_tasks_parallel,
+    queue_transcriptions,
+    record_progress,
+    start_ingestion
+)
+
+# Stop reading new rows when less than this much time is left
+TIME_RESERVE_MS = 60 * 1000
+
+
+def handler(event, context):
+    """
+    Handler for manifest ingestion jobs.
+    Message: { batchId, requesterId, bucket, key, format, offset, fieldnames? }
+    """
+    for record in event.get('Records', []):
+        job = json.loads(record['body'])
+        ingest(job, context)
+
+    return {"message": "Processed records"}
+
+
+def ingest(job, context):
+    """Ingest one manifest from job['offset'] until done or out of time."""
+    batch_id = job['batchId']
+    timestamp = job.setdefault('createdAt', datetime.datetime.now(datetime.timezone.utc).isoformat())
+
+    batch = get_batch(batch_id)
+    if not batch or batch.get('status') != BatchStatus.INGESTING:
+        logger.info(f"Batch {batch_id} is not ingesting, dropping job")
+        return
+
+    if job['format'] == MANIFEST_FORMAT_CSV and not job.get('fieldnames'):
+        job['fieldnames'], header_end = read_csv_header(job['bucket'], job['key'])
+        if int(batch['manifestOffset']) == 0:
+            record_progress(batch_id, 0, header_end, 0, 0, 0, 0)
+        job['offset'] = max(job['offset'], header_end)
+
+    # Redelivered or duplicate job: resume where the batch record says
+    job['offset'] = max(job['offset'], int(batch['manifestOffset']))
+
+    window, invalid_rows = [], 0
+    window_start = end_offset = job['offset']
+
+    def flush(offset, status=None):
+        nonlocal window, invalid_rows, window_start
+        failed = write_tasks_parallel(window)
+        failed_ids = {item['taskId'] for item in failed}
+        queued = queue_transcriptions([item for item in window if item['taskId'] not in failed_ids])
+        recorded = record_progress(
+            batch_id,
+            window_start,
+            offset,
+            rows=len(window) + invalid_rows,
+            written=len(window) - len(failed),
+            failed=len(failed) + invalid_rows,
+            queued=queued,
+            status=status
+        )
+        logger.info(f"Batch {batch_id}: wrote {len(window) - len(failed)} tasks up to byte {offset}")
+        window, invalid_rows, window_start = [], 0, offset
+        return recorded
+
+    rows = iter_manifest(job['bucket'], job['key'], job['format'], job['offset'], job.get('fieldnames'))
+    for row_offset, task_input, end_offset in rows:
+        item = None
+        if task_input is not None:
+            task_id = row_task_id(batch_id, row_offset)
+            try:
+                item = build_task_item(task_input, job['requesterId'], batch_id, task_id, timestamp)
+            except ValueError as e:
+                logger.warning(f"Invalid manifest row at byte {row_offset} of {job['key']}: {e}")
+
+        if item is None:
+            invalid_rows += 1
+        else:
+            if get_audio_key(item):
+                # Started later by dispatch_transcriptions
+                mark_transcription_queued(item)
+            window.append(item)
+
+        if len(window) + invalid_rows >= config.INGEST_WINDOW_SIZE:
+            if not flush(end_offset):
+                # A concurrent invocation already got past this window
+                return
+            if context.get_remaining_time_in_millis() < TIME_RESERVE_MS:
+                start_ingestion({**job, 'offset': end_offset})
+                logger.info(f"Batch {batch_id}: continuing from byte {end_offset} in a new invocation")
+                return
+
+    flush(end_offset, status=BatchStatus.CREATED)
+    logger.info(f"Batch {batch_id}: manifest ingestion complete")
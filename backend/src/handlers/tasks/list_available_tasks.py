@@ -1,21 +1,32 @@
 """
 List Available Tasks Handler.
-Returns published tasks filtered by worker level access.
-Tasks above worker's level are returned with locked=True.
+Returns published tasks filtered by worker level access, one page at a
+time (?limit=&cursor=). Tasks above worker's level are returned with
+locked=True.
 """
 import json
 import boto3
 from decimal import Decimal
-from boto3.dynamodb.conditions import Key
 from shared.config import config
 from shared.logging import logger, log_event
 from shared.models import TaskStatus, WorkerLevel
 from shared.gamification import can_access_task
 from shared.auth import get_user_sub
-from shared.s3_utils import generate_presigned_url, is_media_key
+from shared.utils import credentialed_cors_headers, encode_cursor, decode_cursor
+from shared.status_index import query_status_page
+from shared.s3_utils import (
+    generate_media_urls,
+    generate_signed_cookies,
+    signed_cookie_headers,
+    is_media_key,
+    MEDIA_MODE_CLOUDFRONT_COOKIE
+)
 
 dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
 
 class DecimalEncoder(json.JSONEncoder):
     """Custom encoder to handle Decimal types from DynamoDB."""
@@ -29,9 +40,19 @@ def handler(event, context):
     log_event(event)
 
     try:
-        tasks_table = dynamodb.Table(config.TASKS_TABLE)
         workers_table = dynamodb.Table(config.WORKERS_TABLE)
 
+        query_params = event.get('queryStringParameters') or {}
+        try:
+            limit = min(max(int(query_params.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+            positions = decode_cursor(query_params.get('cursor'))
+        except ValueError:
+            return {
+                'statusCode': 400,
+                'headers': credentialed_cors_headers(event),
+                'body': json.dumps({'error': 'Invalid limit or cursor'})
+            }
+
         # Get worker ID from Cognito claims
         worker_id = get_user_sub(event)
         
@@ -46,13 +67,16 @@ def handler(event, context):
             except Exception as e:
                 logger.warning(f"Could not fetch worker profile: {e}")
 
-        # Query tasks with status 'Published'
-        response = tasks_table.query(
-            IndexName='StatusIndex',
-            KeyConditionExpression=Key('status').eq(TaskStatus.PUBLISHED)
-        )
+        # One page of 'Published' tasks (scatter-gather over status shards)
+        items, next_positions = query_status_page(TaskStatus.PUBLISHED, limit, positions)
 
-        items = response.get('Items', [])
+        # Sign media for the whole page at once (only tasks the worker can open)
+        media_keys = [
+            task.get('mediaUrl') for task in items
+            if can_access_task(worker_level, task.get('requiredLevel', WorkerLevel.NOVICE))
+            and is_media_key(task.get('mediaUrl'))
+        ]
+        signed_urls = generate_media_urls(media_keys)
 
         # Process tasks: add locked flag based on level access
         processed_tasks = []
@@ -60,10 +84,10 @@ def handler(event, context):
             required_level = task.get('requiredLevel', WorkerLevel.NOVICE)
             has_access = can_access_task(worker_level, required_level)
             
-            # Generate presigned URL for media if user has access
+            # Use the presigned URL for media if user has access
             media_url = task.get('mediaUrl')
-            if media_url and has_access and is_media_key(media_url):
-                media_url = generate_presigned_url(media_url)
+            if media_url and has_access:
+                media_url = signed_urls.get(media_url, media_url)
             
             processed_task = {
                 **task,
@@ -78,32 +102,35 @@ def handler(event, context):
             
             processed_tasks.append(processed_task)
 
-        # Sort: unlocked tasks first, then by createdAt
+        # Sort the page: unlocked tasks first, then by createdAt
         processed_tasks.sort(key=lambda t: (t.get('locked', False), t.get('createdAt', '')))
 
-        return {
+        response = {
             'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Credentials': True,
-            },
+            'headers': credentialed_cors_headers(event),
             'body': json.dumps({
                 'tasks': processed_tasks,
                 'workerLevel': worker_level,
                 'totalTasks': len(processed_tasks),
-                'unlockedTasks': len([t for t in processed_tasks if not t.get('locked')])
+                'unlockedTasks': len([t for t in processed_tasks if not t.get('locked')]),
+                'nextCursor': encode_cursor(next_positions) if next_positions else None
             }, cls=DecimalEncoder)
         }
 
+        # Cookie mode: one prefix-scoped signature covers every media URL
+        if config.MEDIA_URL_MODE == MEDIA_MODE_CLOUDFRONT_COOKIE and config.MEDIA_COOKIE_DOMAIN and media_keys:
+            cookies = generate_signed_cookies()
+            if cookies:
+                response['multiValueHeaders'] = {'Set-Cookie': signed_cookie_headers(cookies)}
+
+        return response
+
     except Exception as e:
         logger.error(f"Error listing available tasks: {e}")
         import traceback
         traceback.print_exc()
         return {
             'statusCode': 500,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Credentials': True,
-            },
+            'headers': credentialed_cors_headers(event),
             'body': json.dumps({'error': str(e)})
         }
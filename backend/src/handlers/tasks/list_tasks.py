@@ -1,45 +1,212 @@
-import json
+"""
+List Tasks Handler.
+Requester dashboard: the requester's tasks in one or more statuses, newest
+first, one page at a time.
+
+Each status is read by its own query (in parallel) and the results are
+merged by createdAt. The cursor holds every status's position, so the
+next page resumes each query exactly after the last task it contributed.
+Only summary fields are read; per-status counts come with the first page.
+
+A status is one begins_with query of RequesterStatusIndex (sorted on
+'<status>#<createdAt>', summary fields projected) and the counts are the
+requester's status counters (shared.task_counts). Until their backfill has
+run and REQUESTER_STATUS_READS is on, statuses are read from
+RequesterIdIndex with a filter and counted by query.
+"""
+import heapq
 import boto3
-from boto3.dynamodb.conditions import Key
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Key, Attr
 from shared.config import config
 from shared.logging import logger, log_event
 from shared.auth import get_user_sub
 from shared.models import TaskStatus
+from shared.task_counts import REQUESTER_STATUS_INDEX, STATUS_DATE_ATTRIBUTE, status_date_key, read_counts
+from shared.utils import format_response, encode_cursor, decode_cursor
+
+dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
+
+# Queries run in pool threads, so they go through the (thread-safe) client
+client = dynamodb.meta.client
+
+# Tasks by requester, sorted by createdAt (fallback: one status via a filter)
+REQUESTER_INDEX = 'RequesterIdIndex'
+
+# Fields returned per task (and the GSI key needed to resume a query)
+SUMMARY_FIELDS = [
+    'taskId', 'requesterId', 'createdAt', 'status', 'type', 'batchId',
+    'requiredLevel', 'requiredSubmissions', 'submissionCount', 'transcriptionStatus'
+]
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+ALL_STATUSES = [
+    TaskStatus.CREATED, TaskStatus.SCHEDULED, TaskStatus.PUBLISHED, TaskStatus.ASSIGNED,
+    TaskStatus.SUBMITTED, TaskStatus.REVIEW, TaskStatus.COMPLETED, TaskStatus.EXPIRED
+]
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(config.TASKS_TABLE)
 
 def handler(event, context):
+    """
+    GET /requester/tasks?status=Published,Review&limit=50&cursor=...
+
+    Returns:
+        { tasks, nextCursor, counts } - counts (per status) on the first page only
+    """
     log_event(event)
 
     requester_id = get_user_sub(event)
     if not requester_id:
-        # Try query params for testing? Or just fail.
         # For now, fallback
         requester_id = 'demo-requester'
 
-    # Get status from query params
     query_params = event.get('queryStringParameters') or {}
-    status = query_params.get('status', TaskStatus.CREATED)
+    statuses = [s.strip() for s in (query_params.get('status') or '').split(',') if s.strip()] or ALL_STATUSES
+    unknown = [s for s in statuses if s not in ALL_STATUSES]
+    if unknown:
+        return format_response(400, {'error': f"Unknown status: {', '.join(unknown)}"})
 
     try:
-        response = table.query(
-            IndexName='RequesterStatusIndex',
-            KeyConditionExpression=Key('requesterId').eq(requester_id) & Key('status').eq(status)
-        )
+        limit = min(max(int(query_params.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        cursor = decode_cursor(query_params.get('cursor'))
+    except ValueError:
+        return format_response(400, {'error': 'Invalid limit or cursor'})
 
-        items = response.get('Items', [])
+    # Statuses absent from a cursor were exhausted on an earlier page
+    if cursor is not None:
+        statuses = [s for s in statuses if s in cursor]
 
-        # Handle pagination if LastEvaluatedKey exists (simplified for now)
-
-        return {
-            'statusCode': 200,
-            'body': json.dumps({'tasks': items})
+    try:
+        tasks, next_positions = list_requester_tasks(requester_id, statuses, limit, cursor or {})
+        body = {
+            'tasks': tasks,
+            'nextCursor': encode_cursor(next_positions) if next_positions else None
         }
+        if cursor is None:
+            body['counts'] = count_by_status(requester_id, statuses)
+        return format_response(200, body)
 
     except Exception as e:
         logger.error(f"Error listing tasks: {e}")
-        return {
-            'statusCode': 500,
-            'body': json.dumps({'error': str(e)})
+        return format_response(500, {'error': 'Failed to list tasks'})
+
+
+def list_requester_tasks(requester_id, statuses, limit, positions):
+    """
+    Read one page across several statuses, newest first.
+
+    Args:
+        requester_id: Owner of the tasks
+        statuses: Statuses to include
+        limit: Page size
+        positions: Per-status ExclusiveStartKey from the previous page
+
+    Returns:
+        tuple: (tasks, next_positions) - next_positions maps each status that
+               may have more tasks to where its next query starts
+    """
+    if not statuses:
+        return [], {}
+
+    with ThreadPoolExecutor(max_workers=len(statuses)) as executor:
+        results = dict(zip(statuses, executor.map(
+            lambda status: _query_status_page(requester_id, status, limit, positions.get(status)),
+            statuses
+        )))
+
+    merged = heapq.merge(
+        *[[(status, item) for item in items] for status, (items, _) in results.items()],
+        key=lambda entry: entry[1].get('createdAt', ''),
+        reverse=True
+    )
+    page = [entry for _, entry in zip(range(limit), merged)]
+
+    next_positions = {}
+    for status, (items, has_more) in results.items():
+        taken = [item for s, item in page if s == status]
+        if len(taken) < len(items):
+            # Resume after the last task this status contributed
+            next_positions[status] = _index_key(taken[-1]) if taken else positions.get(status)
+        elif has_more:
+            next_positions[status] = _index_key(items[-1]) if items else positions.get(status)
+
+    return [item for _, item in page], next_positions
+
+
+def _query_status_page(requester_id, status, limit, start_key):
+    """
+    Read up to `limit` tasks in one status, newest first.
+
+    Returns:
+        tuple: (items, has_more)
+    """
+    names = {f'#p{i}': name for i, name in enumerate(SUMMARY_FIELDS)}
+    params = {
+        'TableName': config.TASKS_TABLE,
+        'ProjectionExpression': ', '.join(names),
+        'ExpressionAttributeNames': names,
+        'ScanIndexForward': False
+    }
+    if config.REQUESTER_STATUS_READS:
+        params['IndexName'] = REQUESTER_STATUS_INDEX
+        params['KeyConditionExpression'] = (
+            Key('requesterId').eq(requester_id) & Key(STATUS_DATE_ATTRIBUTE).begins_with(f"{status}#")
+        )
+    else:
+        params['IndexName'] = REQUESTER_INDEX
+        params['KeyConditionExpression'] = Key('requesterId').eq(requester_id)
+        params['FilterExpression'] = Attr('status').eq(status)
+    if start_key:
+        params['ExclusiveStartKey'] = start_key
+
+    items = []
+    while True:
+        params['Limit'] = limit - len(items)
+        response = client.query(**params)
+        items.extend(response.get('Items', []))
+
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return items, False
+        if len(items) >= limit:
+            return items, True
+        params['ExclusiveStartKey'] = last_key
+
+
+def count_by_status(requester_id, statuses):
+    """Count the requester's tasks in each status."""
+    if config.REQUESTER_STATUS_READS:
+        return read_counts(requester_id, statuses)
+
+    def count(status):
+        params = {
+            'TableName': config.TASKS_TABLE,
+            'IndexName': REQUESTER_INDEX,
+            'KeyConditionExpression': Key('requesterId').eq(requester_id),
+            'FilterExpression': Attr('status').eq(status),
+            'Select': 'COUNT'
         }
+        total = 0
+        while True:
+            response = client.query(**params)
+            total += response.get('Count', 0)
+            if not response.get('LastEvaluatedKey'):
+                return total
+            params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    if not statuses:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(statuses)) as executor:
+        return dict(zip(statuses, executor.map(count, statuses)))
+
+
+def _index_key(item):
+    """ExclusiveStartKey for the index being read, positioned at `item`."""
+    key = {'taskId': item['taskId'], 'requesterId': item['requesterId']}
+    if config.REQUESTER_STATUS_READS:
+        key[STATUS_DATE_ATTRIBUTE] = status_date_key(item['status'], item['createdAt'])
+    else:
+        key['createdAt'] = item['createdAt']
+    return key
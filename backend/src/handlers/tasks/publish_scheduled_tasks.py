@@ -8,6 +8,8 @@ import time
 from datetime import datetime, timezone
 from shared.config import config
 from shared.models import TaskStatus
+from shared.ready_queue import enqueue_ready_tasks
+from shared.status_index import transition_tasks
 
 dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
 
@@ -38,28 +40,24 @@ def handler(event, context):
     tasks_to_publish = response.get('Items', [])
     print(f"Found {len(tasks_to_publish)} tasks ready to publish")
     
-    published_count = 0
+    # Conditional in-place update (status = Scheduled -> Published), so a
+    # task changed since the scan is left alone
+    result = transition_tasks(
+        [task['taskId'] for task in tasks_to_publish],
+        TaskStatus.SCHEDULED,
+        TaskStatus.PUBLISHED,
+        attributes={'publishedAt': now_ts}
+    )
+    published_tasks = result.transitioned
+    published_count = len(published_tasks)
+    for task in published_tasks:
+        print(f"Published scheduled task {task['taskId']}")
+    for key in result.failed:
+        print(f"Error publishing task {key['taskId']}")
     
-    for task in tasks_to_publish:
-        try:
-            task_id = task['taskId']
-            
-            # Update task status to Published
-            tasks_table.update_item(
-                Key={'taskId': task_id},
-                UpdateExpression='SET #status = :published, publishedAt = :ts',
-                ExpressionAttributeNames={'#status': 'status'},
-                ExpressionAttributeValues={
-                    ':published': TaskStatus.PUBLISHED,
-                    ':ts': now_ts
-                }
-            )
-            
-            print(f"Published scheduled task {task_id}")
-            published_count += 1
-            
-        except Exception as e:
-            print(f"Error publishing task {task.get('taskId')}: {e}")
+    # Make newly published tasks claimable from the ready queues
+    if published_tasks and not enqueue_ready_tasks(published_tasks):
+        print("Failed to enqueue some scheduled tasks to ready queues")
     
     return {
         'checked': len(tasks_to_publish),
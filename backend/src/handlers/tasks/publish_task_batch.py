@@ -1,11 +1,12 @@
 import json
-import boto3
-from boto3.dynamodb.conditions import Key
+import time
+from boto3.dynamodb.conditions import Key, Attr
 from shared.config import config
 from shared.logging import logger, log_event
 from shared.models import TaskStatus
-from shared.dynamo import query, batch_write_items
-from shared.sqs import send_message_batch
+from shared.dynamo import query
+from shared.ready_queue import enqueue_ready_tasks
+from shared.status_index import transition_tasks
 
 def handler(event, context):
     log_event(event)
@@ -18,59 +19,41 @@ def handler(event, context):
             'body': json.dumps({'error': 'Missing batchId'})
         }
 
-    # Query tasks by batchId
-    # We need to use Key('batchId').eq(batch_id)
-    # We import Key from boto3.dynamodb.conditions
-
+    # Only the IDs of Created tasks are needed: the transition itself
+    # returns the updated items
     tasks = query(
         config.TASKS_TABLE,
-        IndexName='BatchIndex',
-        KeyConditionExpression=Key('batchId').eq(batch_id)
+        index_name='BatchIdIndex',
+        key_condition=Key('batchId').eq(batch_id),
+        filter_expression=Attr('status').eq(TaskStatus.CREATED),
+        projection=['taskId']
     )
 
     if not tasks:
-        return {
-            'statusCode': 404,
-            'body': json.dumps({'error': 'Batch not found or empty'})
-        }
-
-    updated_tasks = []
-    sqs_entries = []
-
-    for task in tasks:
-        # Only publish created tasks
-        if task.get('status') == TaskStatus.CREATED:
-            task['status'] = TaskStatus.PUBLISHED
-            updated_tasks.append(task)
-
-            sqs_entries.append({
-                'Id': task['taskId'],
-                'MessageBody': json.dumps({
-                    'taskId': task['taskId'],
-                    'type': task.get('type'),
-                    'batchId': batch_id
-                })
-            })
-
-    if not updated_tasks:
         return {
             'statusCode': 200,
-            'body': json.dumps({'message': 'No tasks to publish (already published?)'})
+            'body': json.dumps({'message': 'No tasks to publish (batch empty or already published?)'})
         }
 
-    # Update DynamoDB
-    # Note: batch_write_items uses PutItem, so it overwrites.
-    # Since we queried the full item and modified status, this is effectively an update.
-    db_success = batch_write_items(config.TASKS_TABLE, updated_tasks)
+    # Conditional in-place update (status = Created -> Published): only the
+    # changed attributes are written, and concurrent writers (e.g.
+    # process_transcription) are never overwritten
+    result = transition_tasks(
+        [task['taskId'] for task in tasks],
+        TaskStatus.CREATED,
+        TaskStatus.PUBLISHED,
+        attributes={'publishedAt': str(int(time.time()))}
+    )
+    published_tasks = result.transitioned
 
-    if not db_success:
+    if result.failed and not published_tasks:
          return {
             'statusCode': 500,
             'body': json.dumps({'error': 'Failed to update tasks status'})
         }
 
-    # Send to SQS
-    sqs_success = send_message_batch(config.AVAILABLE_TASKS_QUEUE_URL, sqs_entries)
+    # Send to the sharded ready queues (per level / type)
+    sqs_success = enqueue_ready_tasks(published_tasks)
 
     if not sqs_success:
         # If SQS fails, we might want to revert DB or mark as error.
@@ -81,10 +64,18 @@ def handler(event, context):
             'body': json.dumps({'error': 'Tasks published to DB but failed to enqueue'})
         }
 
+    response_body = {
+        'message': f'Published {len(published_tasks)} tasks',
+        'batchId': batch_id
+    }
+    if result.skipped:
+        # Changed status since the query (e.g. published concurrently)
+        response_body['skipped'] = len(result.skipped)
+    if result.failed:
+        # Partial success: these stay Created and can be published again
+        response_body['failedTaskIds'] = sorted(key['taskId'] for key in result.failed)
+
     return {
-        'statusCode': 200,
-        'body': json.dumps({
-            'message': f'Published {len(updated_tasks)} tasks',
-            'batchId': batch_id
-        })
+        'statusCode': 207 if result.failed else 200,
+        'body': json.dumps(response_body)
     }
@@ -0,0 +1,75 @@
+"""
+Renew Assignment Handler (lease heartbeat).
+Long-running tasks (e.g. audio transcription) call this periodically so the
+assignment doesn't expire while the worker is still on it.
+"""
+import json
+from shared.assignments import renew_assignment
+from shared.ready_queue import extend_ready_message
+
+
+def handler(event, context):
+    """
+    Handler for extending an active assignment or batch lease.
+    POST /worker/assignments/{assignmentId}/heartbeat
+    """
+    try:
+        assignment_id = event['pathParameters']['assignmentId']
+
+        # Get workerId from Cognito authorizer claims
+        claims = event['requestContext']['authorizer']['claims']
+        worker_id = claims['sub']
+
+        assignment, current = renew_assignment(assignment_id, worker_id)
+
+        if not assignment:
+            if not current:
+                status_code, message = 404, "Assignment not found"
+            elif current.get('workerId') != worker_id:
+                status_code, message = 403, "Not authorized for this assignment"
+            else:
+                # Expired, already submitted, or out of renewals
+                status_code, message = 409, "Assignment can no longer be renewed"
+            return {
+                "statusCode": status_code,
+                "headers": {
+                    "Access-Control-Allow-Origin": "*",
+                    "Access-Control-Allow-Credentials": True,
+                },
+                "body": json.dumps({"message": message})
+            }
+
+        # Task claimed from a ready queue: keep its message hidden for the new lease
+        if assignment.get('readyReceiptHandle'):
+            extend_ready_message(
+                assignment['readyQueueUrl'],
+                assignment['readyReceiptHandle'],
+                int(assignment['expiresAt'])
+            )
+
+        return {
+            "statusCode": 200,
+            "headers": {
+                "Access-Control-Allow-Origin": "*",
+                "Access-Control-Allow-Credentials": True,
+            },
+            "body": json.dumps({
+                "message": "Assignment renewed",
+                "assignmentId": assignment_id,
+                "expiresAt": int(assignment['expiresAt']),
+                "renewalCount": int(assignment.get('renewalCount', 0))
+            })
+        }
+
+    except Exception as e:
+        print(f"Error renewing assignment: {str(e)}")
+        return {
+            "statusCode": 500,
+            "headers": {
+                "Access-Control-Allow-Origin": "*",
+                "Access-Control-Allow-Credentials": True,
+            },
+            "body": json.dumps({
+                "message": "Internal Server Error"
+            })
+        }
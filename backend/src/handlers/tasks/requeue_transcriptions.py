@@ -0,0 +1,82 @@
+"""
+Requeue Transcriptions Handler.
+Runs every 15 minutes (EventBridge).
+
+Audio tasks are written QUEUED before their Transcribe request is sent, so
+a failed send (or a crash in between) would leave them QUEUED forever.
+This sweep reads the tasks that have been QUEUED for longer than
+TRANSCRIPTION_REQUEUE_MINUTES (TranscriptionQueueIndex) and sends their
+requests again. Each task's queued time is bumped first, conditionally, so
+a task is resent at most once per period; a duplicate request is harmless
+because dispatch_transcriptions uses one job name per task.
+"""
+import time
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from shared.config import config
+from shared.logging import logger
+from shared.models import TranscriptionStatus
+from shared.ingestion import queue_transcriptions
+
+dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
+
+TRANSCRIPTION_QUEUE_INDEX = 'TranscriptionQueueIndex'
+
+# Tasks resent per run
+MAX_REQUEUE_PER_RUN = 500
+
+
+def handler(event, context):
+    """
+    Returns:
+        { stale, requeued }
+    """
+    now = int(time.time())
+    stale = read_stale_tasks(str(now - config.TRANSCRIPTION_REQUEUE_MINUTES * 60))
+    claimed = [task for task in stale if claim(task, str(now))]
+    requeued = queue_transcriptions(claimed)
+
+    if claimed:
+        logger.warning(f"Requeued {requeued} of {len(claimed)} transcriptions stuck in QUEUED")
+    return {'stale': len(stale), 'requeued': requeued}
+
+
+def read_stale_tasks(cutoff: str):
+    """Tasks QUEUED since before `cutoff`, oldest first."""
+    table = dynamodb.Table(config.TASKS_TABLE)
+    params = {
+        'IndexName': TRANSCRIPTION_QUEUE_INDEX,
+        'KeyConditionExpression': (
+            Key('transcriptionStatus').eq(TranscriptionStatus.QUEUED) & Key('transcriptionQueuedAt').lt(cutoff)
+        )
+    }
+    items = []
+    while len(items) < MAX_REQUEUE_PER_RUN:
+        params['Limit'] = MAX_REQUEUE_PER_RUN - len(items)
+        response = table.query(**params)
+        items.extend(response.get('Items', []))
+        if not response.get('LastEvaluatedKey'):
+            break
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return items
+
+
+def claim(task, now: str) -> bool:
+    """Bump a task's queued time unless it was dispatched or claimed meanwhile."""
+    try:
+        dynamodb.Table(config.TASKS_TABLE).update_item(
+            Key={'taskId': task['taskId']},
+            UpdateExpression='SET transcriptionQueuedAt = :now',
+            ConditionExpression='transcriptionStatus = :queued AND transcriptionQueuedAt = :queued_at',
+            ExpressionAttributeValues={
+                ':now': now,
+                ':queued': TranscriptionStatus.QUEUED,
+                ':queued_at': task['transcriptionQueuedAt']
+            }
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
@@ -0,0 +1,33 @@
+"""
+Track Task Status Handler.
+Triggered by the Tasks table stream (inserts and updates).
+
+Keeps each task's RequesterStatusIndex key and its requester's per-status
+counters in step with the task's status (shared.task_counts). Updates
+that don't change the status, including this handler's own writes, are
+no-ops. A record that fails is reported back to the stream, which retries
+the batch from it.
+"""
+from boto3.dynamodb.types import TypeDeserializer
+from shared.logging import logger
+from shared.task_counts import record_status
+
+deserializer = TypeDeserializer()
+
+
+def handler(event, context):
+    recorded = 0
+    for record in event.get('Records', []):
+        image = record['dynamodb'].get('NewImage')
+        if not image:
+            continue
+        task = {k: deserializer.deserialize(v) for k, v in image.items()}
+        try:
+            if record_status(task):
+                recorded += 1
+        except Exception as e:
+            logger.error(f"Could not record status of task {task.get('taskId')}: {e}")
+            return {'batchItemFailures': [{'itemIdentifier': record['dynamodb']['SequenceNumber']}]}
+
+    logger.info(f"Recorded {recorded} task status changes")
+    return {'batchItemFailures': []}
@@ -0,0 +1,47 @@
+"""
+Backfill Ledger Parties Handler.
+Invoked on demand after FromUserIndex and ToUserIndex are deployed;
+re-invoke with the returned { "startKey": ... } until it reports done.
+
+Ledger rows written before the per-user history indexes only have `from`
+and `to`. This copies them to fromUserId/toUserId, which key FromUserIndex
+and ToUserIndex, so those rows show up in the user's transaction history.
+The platform wallet is left out, as on new rows (the indexes are sparse).
+"""
+from boto3.dynamodb.conditions import Attr
+from shared.config import config
+from shared.counters import PLATFORM_WALLET_ID
+from shared.migrations import run_backfill
+
+# (ledger attribute, indexed copy)
+PARTIES = (('from', 'fromUserId'), ('to', 'toUserId'))
+
+
+def handler(event, context):
+    missing = None
+    for source, target in PARTIES:
+        condition = Attr(source).exists() & Attr(target).not_exists() & ~Attr(source).begins_with(PLATFORM_WALLET_ID)
+        missing = condition if missing is None else missing | condition
+    return run_backfill(config.TRANSACTIONS_TABLE, missing, add_parties, event, context)
+
+
+def add_parties(table, row):
+    """Copy a row's user parties, conditioned on them being unchanged and still missing."""
+    sets, conditions, names, values = [], [], {}, {}
+    for i, (source, target) in enumerate(PARTIES):
+        user_id = row.get(source)
+        if not user_id or row.get(target) or user_id.startswith(PLATFORM_WALLET_ID):
+            continue
+        names[f'#s{i}'] = source
+        names[f'#t{i}'] = target
+        values[f':u{i}'] = user_id
+        sets.append(f'#t{i} = :u{i}')
+        conditions.append(f'#s{i} = :u{i} AND attribute_not_exists(#t{i})')
+
+    table.update_item(
+        Key={'transactionId': row['transactionId']},
+        UpdateExpression='SET ' + ', '.join(sets),
+        ConditionExpression=' AND '.join(conditions),
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values
+    )
@@ -7,17 +7,35 @@ import boto3
 import uuid
 import time
 from decimal import Decimal
+from botocore.exceptions import ClientError
 from shared.config import config
 
 dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
 
+# Namespace for deposit ledger IDs derived from (user, idempotency key)
+DEPOSIT_NAMESPACE = uuid.UUID('0b7e5c1d-8f2a-5e46-a3d9-71c4e2f8b650')
+
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+# Position of the ledger row in the deposit transaction
+LEDGER_ITEM_INDEX = 1
+
 
 def handler(event, context):
     """
     POST /wallet/deposit
+    Headers: Idempotency-Key: <client-chosen key> (or "idempotencyKey" in the body)
     Body: { "amount": 100.00 }
     
     Mock deposit - in production this would integrate with Stripe/PayPal.
+
+    The ledger row's ID is derived from the user and the idempotency key,
+    so a retried request is recognised by the same transaction that would
+    apply it: the wallet is credited at most once per key. Requests
+    without a key get a fresh one (and are not safe to retry).
+    The credit is relative (ADD), so it commutes with settlements credited
+    meanwhile, and no balance is returned: read it with GET /wallet (pass
+    ?minVersion= one above the last version read to skip a cached balance).
     """
     try:
         # Get userId from Cognito
@@ -42,45 +60,32 @@ def handler(event, context):
         if amount > 10000:
             return response(400, {'error': 'Maximum deposit is $10,000'})
 
-        # Execute deposit
-        wallet_table = dynamodb.Table(config.WALLETS_TABLE)
-        transactions_table = dynamodb.Table(config.TRANSACTIONS_TABLE)
-        
-        timestamp = str(int(time.time()))
-        transaction_id = str(uuid.uuid4())
-
-        # Update wallet balance (upsert)
-        wallet_table.update_item(
-            Key={'walletId': user_id},
-            UpdateExpression='ADD balance :amount SET updatedAt = :ts',
-            ExpressionAttributeValues={
-                ':amount': amount,
-                ':ts': timestamp
-            }
-        )
+        idempotency_key = get_idempotency_key(event, body)
+        if idempotency_key is not None and not 0 < len(idempotency_key) <= MAX_IDEMPOTENCY_KEY_LENGTH:
+            return response(400, {'error': 'Invalid idempotency key'})
 
-        # Record transaction
-        transactions_table.put_item(
-            Item={
+        # Execute deposit: balance and ledger row in one transaction
+        transaction_id = deposit_transaction_id(user_id, idempotency_key)
+        try:
+            deposit(user_id, amount, transaction_id)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException' or not ledger_row_exists(e):
+                raise
+            # A retry of a deposit that already went through
+            previous = deposit_record(transaction_id)
+            if Decimal(str(previous.get('amount', 0))) != amount:
+                return response(409, {'error': 'Idempotency key already used for a different amount'})
+            return response(200, {
+                'message': 'Deposit already processed',
                 'transactionId': transaction_id,
-                'type': 'DEPOSIT',
-                'amount': amount,
-                'to': user_id,
-                'status': 'COMPLETED',
-                'paymentMethod': 'MOCK',
-                'createdAt': timestamp
-            }
-        )
-
-        # Get updated balance
-        wallet_resp = wallet_table.get_item(Key={'walletId': user_id})
-        new_balance = wallet_resp.get('Item', {}).get('balance', Decimal('0'))
+                'depositedAmount': float(amount),
+                'replayed': True
+            })
 
         return response(200, {
             'message': 'Deposit successful',
             'transactionId': transaction_id,
-            'depositedAmount': float(amount),
-            'newBalance': float(new_balance)
+            'depositedAmount': float(amount)
         })
 
     except Exception as e:
@@ -90,13 +95,86 @@ def handler(event, context):
         return response(500, {'error': str(e)})
 
 
+def get_idempotency_key(event: dict, body: dict):
+    """Client idempotency key from the Idempotency-Key header or the body."""
+    headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    key = headers.get('idempotency-key') or body.get('idempotencyKey')
+    return str(key) if key is not None else None
+
+
+def deposit_transaction_id(user_id: str, idempotency_key=None) -> str:
+    """Ledger row ID for a deposit: stable per (user, key), random without a key."""
+    if idempotency_key is None:
+        return str(uuid.uuid4())
+    return str(uuid.uuid5(DEPOSIT_NAMESPACE, f"{user_id}#{idempotency_key}"))
+
+
+def deposit(user_id: str, amount: Decimal, transaction_id: str):
+    """
+    Credit the wallet (upsert) and record the deposit in one transaction.
+
+    Raises:
+        ClientError: TransactionCanceledException if the ledger row exists
+                     (see ledger_row_exists), or other failures
+    """
+    timestamp = str(int(time.time()))
+    client = boto3.client('dynamodb', region_name=config.AWS_REGION)
+    client.transact_write_items(
+        TransactItems=[
+            {
+                'Update': {
+                    'TableName': config.WALLETS_TABLE,
+                    'Key': {'walletId': {'S': user_id}},
+                    'UpdateExpression': 'ADD balance :amount, version :one SET updatedAt = :ts',
+                    'ExpressionAttributeValues': {
+                        ':amount': {'N': str(amount)},
+                        ':one': {'N': '1'},
+                        ':ts': {'S': timestamp}
+                    }
+                }
+            },
+            # Record transaction (once per idempotency key)
+            {
+                'Put': {
+                    'TableName': config.TRANSACTIONS_TABLE,
+                    'Item': {
+                        'transactionId': {'S': transaction_id},
+                        'type': {'S': 'DEPOSIT'},
+                        'amount': {'N': str(amount)},
+                        'to': {'S': user_id},
+                        'toUserId': {'S': user_id},  # Ledger history index
+                        'status': {'S': 'COMPLETED'},
+                        'paymentMethod': {'S': 'MOCK'},
+                        'createdAt': {'S': timestamp}
+                    },
+                    'ConditionExpression': 'attribute_not_exists(transactionId)'
+                }
+            }
+        ]
+    )
+
+
+def ledger_row_exists(error: ClientError) -> bool:
+    """Whether a cancelled deposit failed because its ledger row already exists."""
+    reasons = error.response.get('CancellationReasons') or []
+    return len(reasons) > LEDGER_ITEM_INDEX and reasons[LEDGER_ITEM_INDEX].get('Code') == 'ConditionalCheckFailed'
+
+
+def deposit_record(transaction_id: str) -> dict:
+    """The ledger row of an earlier deposit with the same key."""
+    return dynamodb.Table(config.TRANSACTIONS_TABLE).get_item(
+        Key={'transactionId': transaction_id},
+        ConsistentRead=True
+    ).get('Item', {})
+
+
 def response(status_code: int, body: dict):
     """Generate API Gateway response."""
     return {
         'statusCode': status_code,
         'headers': {
             'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+            'Access-Control-Allow-Headers': 'Content-Type,Authorization,Idempotency-Key',
             'Content-Type': 'application/json'
         },
         'body': json.dumps(body, default=str)
@@ -1,42 +1,83 @@
-import json
+import time
 import boto3
-from decimal import Decimal
 from shared.config import config
+from shared.auth import is_admin
+from shared.counters import PLATFORM_WALLET_ID, platform_wallet
 from shared.utils import format_response
 
 dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
 
+# Recently read wallets, per container: walletId -> (read_at, wallet)
+_wallet_cache = {}
+
+# Bound on cached wallets (the oldest entry is dropped first)
+MAX_CACHED_WALLETS = 1000
+
+
 def handler(event, context):
     """
     Handler to get current user's wallet balance.
     GET /requester/wallet OR GET /worker/wallet
+    Admins may pass ?walletId=PLATFORM_WALLET for the platform's fee balance.
+
+    Balances are cached for WALLET_CACHE_SECONDS. Every wallet write bumps
+    the wallet's version; after a write, passing ?minVersion=N (one above
+    the last version read) bypasses a cached balance older than that write,
+    so a client always sees its own writes.
     """
     try:
         # Get userId from Cognito authorizer claims
         claims = event['requestContext']['authorizer']['claims']
         user_id = claims['sub']
 
-        wallets_table = dynamodb.Table(config.WALLETS_TABLE)
+        query_params = event.get('queryStringParameters') or {}
+        if query_params.get('walletId') == PLATFORM_WALLET_ID and is_admin(event):
+            # Summed over the counter's shards (cached for a few seconds)
+            return format_response(200, {
+                "walletId": PLATFORM_WALLET_ID,
+                "balance": platform_wallet.total(),
+                "currency": "USD"
+            })
 
-        response = wallets_table.get_item(Key={'walletId': user_id})
-        item = response.get('Item')
+        try:
+            min_version = int(query_params.get('minVersion', 0))
+        except ValueError:
+            return format_response(400, {"message": "Invalid minVersion"})
 
-        balance = 0
-        if item:
-            # Decimal to float or string for JSON serialization?
-            # format_response should handle Decimal if it uses a custom encoder,
-            # but standard json.dumps fails with Decimal.
-            # The provided code uses 'balance = item.get('balance', 0)'.
-            # Usually DynamoDB returns Decimal.
-            # I should verify if format_response handles Decimal.
-            balance = item.get('balance', 0)
+        wallet = read_wallet(user_id, min_version)
 
         return format_response(200, {
             "walletId": user_id,
-            "balance": balance,
+            "balance": wallet['balance'],
+            "version": wallet['version'],
             "currency": "USD"
         })
 
     except Exception as e:
         print(f"Error getting wallet: {str(e)}")
         return format_response(500, {"message": "Internal Server Error"})
+
+
+def read_wallet(user_id, min_version=0):
+    """
+    Balance and version of a wallet, from the cache when it is fresh and at
+    least `min_version`; otherwise from the table (strongly consistent when
+    a version is required, so a just-committed write is seen).
+    """
+    now = time.monotonic()
+    cached = _wallet_cache.get(user_id)
+    if cached and now - cached[0] <= config.WALLET_CACHE_SECONDS and cached[1]['version'] >= min_version:
+        return cached[1]
+
+    item = dynamodb.Table(config.WALLETS_TABLE).get_item(
+        Key={'walletId': user_id},
+        ProjectionExpression='balance, version',
+        ConsistentRead=min_version > 0
+    ).get('Item', {})
+    wallet = {'balance': item.get('balance', 0), 'version': int(item.get('version', 0))}
+
+    _wallet_cache.pop(user_id, None)
+    if len(_wallet_cache) >= MAX_CACHED_WALLETS:
+        _wallet_cache.pop(next(iter(_wallet_cache)))
+    _wallet_cache[user_id] = (now, wallet)
+    return wallet
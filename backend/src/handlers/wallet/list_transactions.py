@@ -0,0 +1,173 @@
+"""
+List Transactions Handler.
+Wallet history: the ledger rows the user paid or received, newest first,
+one page at a time.
+
+Rows are indexed by payer (FromUserIndex: fromUserId + createdAt) and by
+payee (ToUserIndex: toUserId + createdAt). Both indexes are read in
+parallel with the date range in the key condition, and the results are
+merged by createdAt. The cursor holds each index's position, like the
+requester task listing.
+"""
+import heapq
+import boto3
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Key, Attr
+from shared.config import config
+from shared.logging import logger, log_event
+from shared.utils import format_response, encode_cursor, decode_cursor
+
+dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
+
+# Ledger index per side of a transaction: direction -> (index name, user attribute)
+LEDGER_INDEXES = {
+    'out': ('FromUserIndex', 'fromUserId'),
+    'in': ('ToUserIndex', 'toUserId'),
+}
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def handler(event, context):
+    """
+    GET /wallet/transactions?since=1700000000&until=1710000000&type=DEPOSIT&limit=50&cursor=...
+    since/until are epoch seconds (inclusive).
+
+    Returns:
+        { transactions, nextCursor } - each transaction has direction 'in' or 'out'
+    """
+    log_event(event)
+
+    try:
+        claims = event['requestContext']['authorizer']['claims']
+        user_id = claims['sub']
+    except (KeyError, TypeError):
+        return format_response(401, {'error': 'Unauthorized'})
+
+    query_params = event.get('queryStringParameters') or {}
+    try:
+        limit = min(max(int(query_params.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        since = _timestamp(query_params.get('since'))
+        until = _timestamp(query_params.get('until'))
+        cursor = decode_cursor(query_params.get('cursor'))
+    except ValueError:
+        return format_response(400, {'error': 'Invalid limit, since, until or cursor'})
+
+    # Sides absent from a cursor were exhausted on an earlier page
+    directions = [d for d in LEDGER_INDEXES if cursor is None or d in cursor]
+
+    try:
+        transactions, next_positions = list_user_transactions(
+            user_id, directions, limit, cursor or {},
+            since=since, until=until, transaction_type=query_params.get('type')
+        )
+        return format_response(200, {
+            'transactions': transactions,
+            'nextCursor': encode_cursor(next_positions) if next_positions else None
+        })
+
+    except Exception as e:
+        logger.error(f"Error listing transactions: {e}")
+        return format_response(500, {'error': 'Failed to list transactions'})
+
+
+def list_user_transactions(user_id, directions, limit, positions, since=None, until=None, transaction_type=None):
+    """
+    Read one page of a user's history, newest first.
+
+    Args:
+        user_id: Payer or payee
+        directions: Sides to read ('in', 'out')
+        limit: Page size
+        positions: Per-side ExclusiveStartKey from the previous page
+        since, until: Optional createdAt bounds (epoch-second strings)
+        transaction_type: Optional type filter (e.g. 'TASK_PAYMENT')
+
+    Returns:
+        tuple: (transactions, next_positions)
+    """
+    if not directions:
+        return [], {}
+
+    with ThreadPoolExecutor(max_workers=len(directions)) as executor:
+        results = dict(zip(directions, executor.map(
+            lambda d: _query_side(user_id, d, limit, positions.get(d), since, until, transaction_type),
+            directions
+        )))
+
+    merged = heapq.merge(
+        *[[(d, item) for item in items] for d, (items, _) in results.items()],
+        key=lambda entry: entry[1].get('createdAt', ''),
+        reverse=True
+    )
+    page = [entry for _, entry in zip(range(limit), merged)]
+
+    next_positions = {}
+    for direction, (items, has_more) in results.items():
+        taken = [item for d, item in page if d == direction]
+        if len(taken) < len(items):
+            # Resume after the last row this side contributed
+            next_positions[direction] = _index_key(direction, taken[-1]) if taken else positions.get(direction)
+        elif has_more:
+            next_positions[direction] = _index_key(direction, items[-1]) if items else positions.get(direction)
+
+    return [{**item, 'direction': d} for d, item in page], next_positions
+
+
+def _query_side(user_id, direction, limit, start_key, since, until, transaction_type):
+    """
+    Read up to `limit` rows from one ledger index, newest first.
+
+    Returns:
+        tuple: (items, has_more)
+    """
+    index_name, user_attribute = LEDGER_INDEXES[direction]
+    condition = Key(user_attribute).eq(user_id)
+    if since and until:
+        condition = condition & Key('createdAt').between(since, until)
+    elif since:
+        condition = condition & Key('createdAt').gte(since)
+    elif until:
+        condition = condition & Key('createdAt').lte(until)
+
+    params = {
+        'IndexName': index_name,
+        'KeyConditionExpression': condition,
+        'ScanIndexForward': False
+    }
+    if transaction_type:
+        params['FilterExpression'] = Attr('type').eq(transaction_type)
+    if start_key:
+        params['ExclusiveStartKey'] = start_key
+
+    table = dynamodb.Table(config.TRANSACTIONS_TABLE)
+    items = []
+    while True:
+        params['Limit'] = limit - len(items)
+        response = table.query(**params)
+        items.extend(response.get('Items', []))
+
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return items, False
+        if len(items) >= limit:
+            return items, True
+        params['ExclusiveStartKey'] = last_key
+
+
+def _index_key(direction, item):
+    """ExclusiveStartKey for a side's ledger index positioned at `item`."""
+    _, user_attribute = LEDGER_INDEXES[direction]
+    return {
+        'transactionId': item['transactionId'],
+        user_attribute: item[user_attribute],
+        'createdAt': item['createdAt']
+    }
+
+
+def _timestamp(value):
+    """Validate an epoch-seconds bound; createdAt is stored as that string."""
+    if value in (None, ''):
+        return None
+    return str(int(value))
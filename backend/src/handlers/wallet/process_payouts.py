@@ -0,0 +1,231 @@
+"""
+Process Payouts Handler.
+Runs every PAYOUT_BATCH_WINDOW_MINUTES (EventBridge).
+
+Collects the withdrawals that became PENDING since the last run (oldest
+first, via PayoutStatusIndex), groups them into batches of
+PAYOUT_BATCH_SIZE and pays each batch with one provider call. Status
+changes are bulk conditional transitions (shared.dynamo.transition_status):
+a batch's withdrawals are claimed PENDING -> PROCESSING together with its
+batch ID, then moved to COMPLETED together. A payout the provider reports
+FAILED is moved to FAILED and its amount credited back in one transaction,
+and the worker is sent a notice through the notification outbox.
+Any other result (still pending, unclaimed, or missing from the response)
+leaves the withdrawal PROCESSING, to be resent under its batch ID - and
+so settled from the provider's answer - by a later run.
+
+If the provider call itself fails, the batch stays PROCESSING and the
+next run resends it under the same batch ID, which the provider
+deduplicates, so an unanswered call can't lead to paying twice.
+"""
+import heapq
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from shared.config import config
+from shared.dynamo import transition_status
+from shared.logging import logger
+from shared.notifications import WITHDRAWAL_FAILED, notification, enqueue_notifications
+from shared.payouts import (
+    PAYOUT_STATUS_INDEX, PAYOUT_SHARD_ATTRIBUTE, PENDING, PROCESSING, COMPLETED, FAILED,
+    ITEM_SUCCESS, ITEM_FAILED, payout_shard_key, payout_batch_id, get_payouts_client
+)
+
+dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
+
+# Kept across warm invocations (the mock remembers batches it has paid)
+payouts = get_payouts_client()
+
+# Namespace for reversal ledger IDs derived from the withdrawal
+REVERSAL_NAMESPACE = uuid.UUID('4a8e2d61-7b3c-5f19-8e0d-c25b7f9a3146')
+
+
+def handler(event, context):
+    """
+    Returns:
+        { batches, paid, failed }
+    """
+    totals = {'batches': 0, 'paid': 0, 'failed': 0}
+
+    # Batches an earlier run claimed but didn't settle: resend as they were
+    stuck = defaultdict(list)
+    for withdrawal in read_withdrawals(PROCESSING):
+        stuck[withdrawal.get('payoutBatchId')].append(withdrawal)
+    for batch_id, withdrawals in stuck.items():
+        _add(totals, send_batch(batch_id or payout_batch_id([w['transactionId'] for w in withdrawals]), withdrawals))
+
+    pending = read_withdrawals(PENDING, limit=config.PAYOUT_MAX_PER_RUN)
+    for start in range(0, len(pending), config.PAYOUT_BATCH_SIZE):
+        chunk = pending[start:start + config.PAYOUT_BATCH_SIZE]
+        batch_id = payout_batch_id([w['transactionId'] for w in chunk])
+        claimed = transition_status(
+            config.TRANSACTIONS_TABLE,
+            [{'transactionId': w['transactionId']} for w in chunk],
+            PENDING,
+            PROCESSING,
+            attributes=lambda key: {
+                'payoutBatchId': batch_id,
+                PAYOUT_SHARD_ATTRIBUTE: payout_shard_key(PROCESSING, key['transactionId'])
+            }
+        ).transitioned
+        if claimed:
+            _add(totals, send_batch(batch_id, claimed))
+
+    logger.info(f"Payout run: {totals}")
+    return totals
+
+
+def _add(totals, outcome):
+    paid, failed = outcome
+    totals['batches'] += 1
+    totals['paid'] += paid
+    totals['failed'] += failed
+
+
+def read_withdrawals(status, limit=None):
+    """
+    Withdrawals in a payout status, oldest first, read from every shard of
+    PayoutStatusIndex in parallel.
+    """
+    table = dynamodb.Table(config.TRANSACTIONS_TABLE)
+
+    def read_shard(shard):
+        params = {
+            'IndexName': PAYOUT_STATUS_INDEX,
+            'KeyConditionExpression': Key(PAYOUT_SHARD_ATTRIBUTE).eq(f"{status}#shard{shard}")
+        }
+        items = []
+        while True:
+            if limit:
+                params['Limit'] = limit - len(items)
+            response = table.query(**params)
+            items.extend(response.get('Items', []))
+            if not response.get('LastEvaluatedKey') or (limit and len(items) >= limit):
+                return items
+            params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    shards = range(config.PAYOUT_SHARD_COUNT)
+    with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+        results = list(executor.map(read_shard, shards))
+
+    items = list(heapq.merge(*results, key=lambda item: item.get('createdAt', '')))
+    return items[:limit] if limit else items
+
+
+def send_batch(batch_id, withdrawals):
+    """
+    Pay a batch with one provider call and settle the outcome.
+
+    Returns:
+        tuple: (paid, failed) counts; withdrawals without a final result,
+               or the whole batch if the call failed, are left PROCESSING
+               for the next run
+    """
+    items = [
+        {'transactionId': w['transactionId'], 'amount': str(w['amount']), 'receiver': w.get('paypalEmail')}
+        for w in withdrawals
+    ]
+    try:
+        results = payouts.create_batch_payout(batch_id, items)
+    except Exception as e:
+        logger.error(f"Payout batch {batch_id} ({len(items)} payouts) not sent, will resend: {e}")
+        return 0, 0
+
+    succeeded = [w for w in withdrawals if results.get(w['transactionId']) == ITEM_SUCCESS]
+    failed = [w for w in withdrawals if results.get(w['transactionId']) == ITEM_FAILED]
+    unsettled = len(withdrawals) - len(succeeded) - len(failed)
+    if unsettled:
+        logger.info(f"Payout batch {batch_id}: {unsettled} payouts not settled yet, left PROCESSING")
+
+    completed_at = str(int(time.time()))
+    transition_status(
+        config.TRANSACTIONS_TABLE,
+        [{'transactionId': w['transactionId']} for w in succeeded],
+        PROCESSING,
+        COMPLETED,
+        attributes=lambda key: {
+            'completedAt': completed_at,
+            PAYOUT_SHARD_ATTRIBUTE: payout_shard_key(COMPLETED, key['transactionId'])
+        }
+    )
+    for withdrawal in failed:
+        reverse_withdrawal(withdrawal, ITEM_FAILED)
+
+    return len(succeeded), len(failed)
+
+
+def reverse_withdrawal(withdrawal, reason):
+    """
+    Mark a withdrawal FAILED and credit its amount back, in one transaction,
+    then queue a notice to the worker. The reversal's ledger ID is derived
+    from the withdrawal, so it can't be credited (or announced) twice.
+    """
+    transaction_id = withdrawal['transactionId']
+    user_id = withdrawal.get('fromUserId') or withdrawal['from']
+    amount = str(withdrawal['amount'])
+    timestamp = str(int(time.time()))
+
+    client = boto3.client('dynamodb', region_name=config.AWS_REGION)
+    try:
+        client.transact_write_items(
+            TransactItems=[
+                {
+                    'Update': {
+                        'TableName': config.TRANSACTIONS_TABLE,
+                        'Key': {'transactionId': {'S': transaction_id}},
+                        'UpdateExpression': 'SET #status = :failed, payoutShard = :shard, payoutError = :error',
+                        'ConditionExpression': '#status = :processing',
+                        'ExpressionAttributeNames': {'#status': 'status'},
+                        'ExpressionAttributeValues': {
+                            ':failed': {'S': FAILED},
+                            ':processing': {'S': PROCESSING},
+                            ':shard': {'S': payout_shard_key(FAILED, transaction_id)},
+                            ':error': {'S': str(reason)[:200]}
+                        }
+                    }
+                },
+                {
+                    'Update': {
+                        'TableName': config.WALLETS_TABLE,
+                        'Key': {'walletId': {'S': user_id}},
+                        'UpdateExpression': 'ADD balance :amount, version :one SET updatedAt = :ts',
+                        'ExpressionAttributeValues': {
+                            ':amount': {'N': amount},
+                            ':one': {'N': '1'},
+                            ':ts': {'S': timestamp}
+                        }
+                    }
+                },
+                {
+                    'Put': {
+                        'TableName': config.TRANSACTIONS_TABLE,
+                        'Item': {
+                            'transactionId': {'S': str(uuid.uuid5(REVERSAL_NAMESPACE, transaction_id))},
+                            'type': {'S': 'WITHDRAWAL_REVERSAL'},
+                            'amount': {'N': amount},
+                            'to': {'S': user_id},
+                            'toUserId': {'S': user_id},
+                            'referenceId': {'S': transaction_id},
+                            'status': {'S': COMPLETED},
+                            'createdAt': {'S': timestamp}
+                        },
+                        'ConditionExpression': 'attribute_not_exists(transactionId)'
+                    }
+                }
+            ]
+        )
+        logger.warning(f"Payout {transaction_id} failed ({reason}), {amount} returned to {user_id}")
+        enqueue_notifications([notification(WITHDRAWAL_FAILED, user_id, {
+            'amount': amount,
+            'paypalEmail': withdrawal.get('paypalEmail'),
+            'transactionId': transaction_id
+        }, email=withdrawal.get('paypalEmail'))])
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+        # Already settled by an overlapping run
+        logger.info(f"Withdrawal {transaction_id} no longer PROCESSING, not reversed")
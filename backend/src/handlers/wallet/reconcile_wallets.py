@@ -0,0 +1,196 @@
+"""
+Reconcile Wallets Handler.
+Runs daily (EventBridge), or on demand with { "userIds": [...] }.
+
+Checks each wallet's balance against the sum of its owner's ledger
+snapshots (maintained by snapshot_ledger), which is O(days) reads per
+user instead of a scan of the ledger. A user without an OPENING snapshot
+gets one with whatever the snapshots don't explain (history from before
+snapshots existed), so only later drift is reported.
+
+Snapshots trail the ledger by the stream delay, so a mismatch is checked
+again after RECONCILE_SETTLE_SECONDS and flagged only if it persists: a
+'DRIFT' item is written next to the user's snapshots and logged. The
+same goes for the OPENING amount: unless the snapshots explain the whole
+balance, it is only recorded if the re-check finds the same amount
+unexplained; otherwise it waits for the next run.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Optional
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from shared.config import config
+from shared.counters import PLATFORM_WALLET_ID
+from shared.logging import logger
+
+dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
+
+# Wallets are checked in pool threads, through the (thread-safe) client
+client = dynamodb.meta.client
+
+DAY_PREFIX = 'DAY#'
+OPENING_PERIOD = 'OPENING'
+DRIFT_PERIOD = 'DRIFT'
+
+# Wallets checked at once
+RECONCILE_WORKERS = 16
+
+
+def handler(event, context):
+    """
+    Returns:
+        { checked, drifted } - drifted lists { userId, balance, expected, drift }
+    """
+    event = event or {}
+    wallets = read_wallets(event.get('userIds'))
+
+    with ThreadPoolExecutor(max_workers=RECONCILE_WORKERS) as executor:
+        results = list(executor.map(lambda w: check_wallet(*w, open_with=Decimal('0')), wallets.items()))
+    suspects = [r for r in results if r['drift']]
+
+    drifted = []
+    if suspects:
+        # Give the snapshot stream time to catch up, then check again
+        time.sleep(config.RECONCILE_SETTLE_SECONDS)
+        unexplained = {r['userId']: r['drift'] for r in suspects if r['unopened']}
+        rechecked = read_wallets([r['userId'] for r in suspects])
+        with ThreadPoolExecutor(max_workers=RECONCILE_WORKERS) as executor:
+            rechecks = list(executor.map(
+                lambda w: check_wallet(*w, open_with=unexplained.get(w[0])), rechecked.items()
+            ))
+        drifted = [r for r in rechecks if r['drift'] and not r['unopened']]
+        for result in drifted:
+            flag_drift(result)
+
+    logger.info(f"Reconciled {len(results)} wallets, {len(drifted)} drifted")
+    return {
+        'checked': len(results),
+        'drifted': [{k: str(v) for k, v in r.items() if k != 'unopened'} for r in drifted]
+    }
+
+
+def read_wallets(user_ids=None):
+    """
+    Balances to check: the given users' wallets (consistent reads), or
+    every user wallet (scan). Platform fee shards are not user wallets.
+
+    Returns:
+        dict: walletId -> balance
+    """
+    table = dynamodb.Table(config.WALLETS_TABLE)
+    if user_ids is not None:
+        balances = {}
+        for user_id in user_ids:
+            item = table.get_item(
+                Key={'walletId': user_id}, ProjectionExpression='walletId, balance', ConsistentRead=True
+            ).get('Item')
+            if item:
+                balances[user_id] = Decimal(str(item.get('balance', 0)))
+        return balances
+
+    balances = {}
+    params = {'ProjectionExpression': 'walletId, balance'}
+    while True:
+        response = table.scan(**params)
+        for item in response.get('Items', []):
+            if not item['walletId'].startswith(PLATFORM_WALLET_ID):
+                balances[item['walletId']] = Decimal(str(item.get('balance', 0)))
+        if not response.get('LastEvaluatedKey'):
+            return balances
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def check_wallet(user_id: str, balance: Decimal, open_with: Optional[Decimal] = None) -> dict:
+    """
+    Compare a balance with the user's snapshots.
+
+    Args:
+        user_id: Wallet owner
+        balance: Current balance
+        open_with: For a user without an OPENING snapshot, the amount an
+                   earlier check left unexplained; the OPENING is recorded
+                   only if this check finds the same amount
+
+    Returns:
+        dict: { userId, balance, expected, drift, unopened } - unopened if
+              the user still has no OPENING (drift is then the unexplained
+              amount)
+    """
+    periods = read_snapshots(user_id)
+    expected = sum((net for period, net in periods.items() if period != DRIFT_PERIOD), Decimal('0'))
+    unopened = OPENING_PERIOD not in periods
+
+    if unopened and open_with is not None and balance - expected == open_with:
+        # History before snapshots is taken as the opening balance
+        if record_opening(user_id, open_with):
+            expected += open_with
+            unopened = False
+
+    return {
+        'userId': user_id, 'balance': balance, 'expected': expected,
+        'drift': balance - expected, 'unopened': unopened
+    }
+
+
+def read_snapshots(user_id: str) -> dict:
+    """
+    A user's snapshot nets by period (a few hundred items at most per year).
+    Periods sort APPLIED#... < DAY#... < DRIFT < OPENING, so the range from
+    DAY# to OPENING skips snapshot_ledger's per-transaction markers.
+    """
+    params = {
+        'TableName': config.LEDGER_SNAPSHOTS_TABLE,
+        'KeyConditionExpression': Key('userId').eq(user_id) & Key('period').between(DAY_PREFIX, OPENING_PERIOD),
+        'ProjectionExpression': '#period, net',
+        'ExpressionAttributeNames': {'#period': 'period'},
+        'ConsistentRead': True
+    }
+    periods = {}
+    while True:
+        response = client.query(**params)
+        for item in response.get('Items', []):
+            periods[item['period']] = Decimal(str(item.get('net', 0)))
+        if not response.get('LastEvaluatedKey'):
+            return periods
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def record_opening(user_id: str, opening: Decimal) -> bool:
+    """Write a user's OPENING snapshot unless another run already did."""
+    try:
+        client.put_item(
+            TableName=config.LEDGER_SNAPSHOTS_TABLE,
+            Item={
+                'userId': user_id,
+                'period': OPENING_PERIOD,
+                'net': opening,
+                'createdAt': datetime.now(timezone.utc).isoformat()
+            },
+            ConditionExpression='attribute_not_exists(#period)',
+            ExpressionAttributeNames={'#period': 'period'}
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+
+
+def flag_drift(result: dict):
+    """Record a persistent mismatch for review."""
+    logger.error(
+        f"Wallet {result['userId']} drifted: balance {result['balance']}, "
+        f"ledger {result['expected']} ({result['drift']:+})"
+    )
+    dynamodb.Table(config.LEDGER_SNAPSHOTS_TABLE).put_item(Item={
+        'userId': result['userId'],
+        'period': DRIFT_PERIOD,
+        'balance': result['balance'],
+        'expected': result['expected'],
+        'drift': result['drift'],
+        'detectedAt': datetime.now(timezone.utc).isoformat()
+    })
@@ -0,0 +1,136 @@
+"""
+Snapshot Ledger Handler.
+Triggered by the Transactions table stream (new ledger rows).
+
+Keeps one aggregate per user per day in the LedgerSnapshots table
+(userId + period 'DAY#YYYY-MM-DD'): credits, debits, net and entry count.
+Every ledger row moves `amount` from fromUserId to toUserId, so summing a
+user's snapshots gives what their wallet balance should be; the
+reconciliation job compares the two without reading the ledger.
+
+Each row is applied at most once: the day's aggregate is updated in one
+transaction with a conditional put of an 'APPLIED#<transactionId>' marker
+next to the user's snapshots, so a retried stream batch doesn't count a
+row twice. Markers expire (TTL) once the stream can no longer replay
+their row, so no item grows with the number of transactions.
+"""
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+import boto3
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+from shared.config import config
+from shared.logging import logger
+
+dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
+deserializer = TypeDeserializer()
+
+DAY_PREFIX = 'DAY#'
+APPLIED_PREFIX = 'APPLIED#'
+
+# Markers outlive the stream's 24-hour retention (and its retries)
+APPLIED_TTL_SECONDS = 7 * 24 * 3600
+
+
+def handler(event, context):
+    """
+    Handler for Transactions stream records.
+    Stops at the first record that can't be applied and reports it, so the
+    stream retries from there (earlier records are already applied).
+    """
+    applied = 0
+    for record in event.get('Records', []):
+        if record.get('eventName') != 'INSERT':
+            continue
+        try:
+            applied += apply_record(record)
+        except Exception as e:
+            logger.error(f"Snapshot update failed at {record['dynamodb']['SequenceNumber']}: {e}")
+            return {'batchItemFailures': [{'itemIdentifier': record['dynamodb']['SequenceNumber']}]}
+
+    logger.info(f"Applied {applied} ledger entries to snapshots")
+    return {'batchItemFailures': []}
+
+
+def apply_record(record) -> int:
+    """
+    Apply one ledger row to its parties' snapshots.
+
+    Returns:
+        Number of snapshot entries written
+    """
+    image = {k: deserializer.deserialize(v) for k, v in record['dynamodb']['NewImage'].items()}
+    day = snapshot_day(image.get('createdAt'))
+    applied = 0
+    for user_id, amount in ledger_entries(image):
+        applied += apply_entry(user_id, day, amount, image['transactionId'])
+    return applied
+
+
+def ledger_entries(row):
+    """
+    Balance changes of a ledger row: (user_id, signed amount) per user party.
+    The platform fee wallet has no user attribute and is left out.
+    """
+    amount = Decimal(str(row.get('amount', 0)))
+    entries = []
+    if row.get('fromUserId'):
+        entries.append((row['fromUserId'], -amount))
+    if row.get('toUserId'):
+        entries.append((row['toUserId'], amount))
+    return entries
+
+
+def snapshot_day(created_at) -> str:
+    """UTC day of a ledger row (createdAt is epoch seconds)."""
+    timestamp = int(created_at) if created_at else int(datetime.now(timezone.utc).timestamp())
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+def apply_entry(user_id: str, day: str, amount: Decimal, transaction_id: str) -> int:
+    """
+    Add one balance change to a user's day snapshot, once per transaction.
+
+    Returns:
+        1 if applied, 0 if the transaction was already counted
+    """
+    credit, debit = (amount, Decimal('0')) if amount >= 0 else (Decimal('0'), -amount)
+    try:
+        dynamodb.meta.client.transact_write_items(
+            TransactItems=[
+                {
+                    'Put': {
+                        'TableName': config.LEDGER_SNAPSHOTS_TABLE,
+                        'Item': {
+                            'userId': user_id,
+                            'period': f'{APPLIED_PREFIX}{transaction_id}',
+                            'expiresAt': int(time.time()) + APPLIED_TTL_SECONDS
+                        },
+                        'ConditionExpression': 'attribute_not_exists(#period)',
+                        'ExpressionAttributeNames': {'#period': 'period'}
+                    }
+                },
+                {
+                    'Update': {
+                        'TableName': config.LEDGER_SNAPSHOTS_TABLE,
+                        'Key': {'userId': user_id, 'period': f'{DAY_PREFIX}{day}'},
+                        'UpdateExpression': 'ADD net :amount, credits :credit, debits :debit, entries :one',
+                        'ExpressionAttributeValues': {
+                            ':amount': amount,
+                            ':credit': credit,
+                            ':debit': debit,
+                            ':one': 1
+                        }
+                    }
+                }
+            ]
+        )
+        return 1
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+        reasons = e.response.get('CancellationReasons') or []
+        if not reasons or reasons[0].get('Code') != 'ConditionalCheckFailed':
+            raise
+        return 0
@@ -1,5 +1,5 @@
 """
-Withdraw Funds Handler - Mock PayPal withdrawal.
+Withdraw Funds Handler.
 POST /wallet/withdraw
 """
 import json
@@ -10,13 +10,18 @@ import re
 from decimal import Decimal
 from botocore.exceptions import ClientError
 from shared.config import config
+from shared.notifications import WITHDRAWAL, notification, enqueue_notifications
+from shared.payouts import PENDING, PAYOUT_SHARD_ATTRIBUTE, payout_shard_key
+from shared.rate_limit import backoff_delay
 
 # Withdrawal configuration
 MINIMUM_WITHDRAWAL = Decimal('10.00')  # Minimum $10 to withdraw
 MAXIMUM_WITHDRAWAL = Decimal('5000.00')  # Maximum $5000 per withdrawal
 
+# Attempts at a withdrawal that lost a transaction conflict
+WITHDRAW_ATTEMPTS = 3
+
 dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
-ses = boto3.client('ses', region_name=config.AWS_REGION)
 
 
 def handler(event, context):
@@ -24,7 +29,9 @@ def handler(event, context):
     POST /wallet/withdraw
     Body: { "amount": 50.00, "paypalEmail": "worker@email.com" }
     
-    Mock withdrawal - in production this would integrate with PayPal payouts.
+    The withdrawal is recorded PENDING; process_payouts pays it out in a batch.
+    The new balance is read with GET /wallet (pass ?minVersion= one above
+    the last version read to skip a cached balance from before this write).
     """
     try:
         # Get userId from Cognito
@@ -58,24 +65,63 @@ def handler(event, context):
             return response(400, {'error': f'Maximum withdrawal is ${MAXIMUM_WITHDRAWAL}'})
 
         # Execute withdrawal with atomic transaction
-        timestamp = str(int(time.time()))
         transaction_id = str(uuid.uuid4())
+        if not withdraw(user_id, amount, paypal_email, transaction_id):
+            return response(400, {'error': 'Insufficient balance'})
+
+        # Queue the request email (sent asynchronously)
+        send_withdrawal_notification(user_id, amount, paypal_email, transaction_id)
+
+        return response(200, {
+            'message': 'Withdrawal initiated successfully',
+            'transactionId': transaction_id,
+            'withdrawalAmount': float(amount),
+            'paypalEmail': paypal_email,
+            'estimatedArrival': '1-3 business days (mock)'
+        })
+
+    except Exception as e:
+        print(f"Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return response(500, {'error': str(e)})
 
-        client = boto3.client('dynamodb', region_name=config.AWS_REGION)
 
+def withdraw(user_id: str, amount: Decimal, paypal_email: str, transaction_id: str):
+    """
+    Debit the wallet and record the withdrawal in one transaction.
+
+    The debit is relative (balance - amount, conditioned on balance >= amount)
+    and bumps the version with ADD, so it commutes with settlements credited
+    meanwhile instead of conflicting with them. Only a transaction conflict
+    (another transaction on the wallet in flight) is retried, with backoff.
+    A transaction can't return the new balance, and the wallet isn't read
+    back for it.
+
+    Returns:
+        True if the withdrawal was recorded, False if the balance is insufficient
+
+    Raises:
+        ClientError: Other failures, or conflicts persisted
+    """
+    client = boto3.client('dynamodb', region_name=config.AWS_REGION)
+    timestamp = {'S': str(int(time.time()))}
+
+    for attempt in range(1, WITHDRAW_ATTEMPTS + 1):
         try:
             client.transact_write_items(
                 TransactItems=[
-                    # Deduct from wallet (with balance check)
+                    # Deduct from wallet
                     {
                         'Update': {
                             'TableName': config.WALLETS_TABLE,
                             'Key': {'walletId': {'S': user_id}},
-                            'UpdateExpression': 'SET balance = balance - :amount, updatedAt = :ts',
+                            'UpdateExpression': 'SET balance = balance - :amount, updatedAt = :ts ADD version :one',
                             'ConditionExpression': 'balance >= :amount',
                             'ExpressionAttributeValues': {
                                 ':amount': {'N': str(amount)},
-                                ':ts': {'S': timestamp}
+                                ':one': {'N': '1'},
+                                ':ts': timestamp
                             }
                         }
                     },
@@ -88,41 +134,27 @@ def handler(event, context):
                                 'type': {'S': 'WITHDRAWAL'},
                                 'amount': {'N': str(amount)},
                                 'from': {'S': user_id},
+                                'fromUserId': {'S': user_id},  # Ledger history index
                                 'paypalEmail': {'S': paypal_email},
-                                'status': {'S': 'PENDING'},  # Would be COMPLETED after actual payout
-                                'createdAt': {'S': timestamp}
+                                'status': {'S': PENDING},  # Paid out in a batch by process_payouts
+                                PAYOUT_SHARD_ATTRIBUTE: {'S': payout_shard_key(PENDING, transaction_id)},
+                                'createdAt': timestamp
                             }
                         }
                     }
                 ]
             )
+            return True
         except ClientError as e:
-            if e.response['Error']['Code'] == 'TransactionCanceledException':
-                return response(400, {'error': 'Insufficient balance'})
-            raise
-
-        # Get updated balance
-        wallet_table = dynamodb.Table(config.WALLETS_TABLE)
-        wallet_resp = wallet_table.get_item(Key={'walletId': user_id})
-        new_balance = wallet_resp.get('Item', {}).get('balance', Decimal('0'))
-
-        # Send notification email (mocked)
-        send_withdrawal_notification(user_id, amount, paypal_email, transaction_id)
-
-        return response(200, {
-            'message': 'Withdrawal initiated successfully',
-            'transactionId': transaction_id,
-            'withdrawalAmount': float(amount),
-            'paypalEmail': paypal_email,
-            'newBalance': float(new_balance),
-            'estimatedArrival': '1-3 business days (mock)'
-        })
-
-    except Exception as e:
-        print(f"Error: {e}")
-        import traceback
-        traceback.print_exc()
-        return response(500, {'error': str(e)})
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            reasons = e.response.get('CancellationReasons') or []
+            if reasons and reasons[0].get('Code') == 'ConditionalCheckFailed':
+                return False
+            if attempt == WITHDRAW_ATTEMPTS:
+                raise
+            print(f"Withdrawal from {user_id} conflicted (attempt {attempt}), retrying")
+            time.sleep(backoff_delay(attempt, base=0.05, cap=0.5))
 
 
 def is_valid_email(email: str) -> bool:
@@ -132,30 +164,12 @@ def is_valid_email(email: str) -> bool:
 
 
 def send_withdrawal_notification(user_id: str, amount: Decimal, paypal_email: str, txn_id: str):
-    """Send withdrawal confirmation email."""
-    try:
-        ses.send_email(
-            Source='noreply@crowdsourcing.com',
-            Destination={'ToAddresses': [paypal_email]},
-            Message={
-                'Subject': {'Data': 'Withdrawal Confirmed 💸'},
-                'Body': {
-                    'Text': {
-                        'Data': (
-                            f'Your withdrawal request has been processed.\n\n'
-                            f'Amount: ${amount}\n'
-                            f'PayPal Email: {paypal_email}\n'
-                            f'Transaction ID: {txn_id}\n\n'
-                            f'Estimated arrival: 1-3 business days\n\n'
-                            f'Thank you for using our platform!'
-                        )
-                    }
-                }
-            }
-        )
-        print(f"Withdrawal notification sent to {paypal_email}")
-    except Exception as e:
-        print(f"SES Error (non-critical): {e}")
+    """Queue the withdrawal request email (the payout itself follows in a batch)."""
+    enqueue_notifications([notification(WITHDRAWAL, user_id, {
+        'amount': amount,
+        'paypalEmail': paypal_email,
+        'transactionId': txn_id
+    }, email=paypal_email)])
 
 
 def response(status_code: int, body: dict):
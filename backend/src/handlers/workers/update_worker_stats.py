@@ -1,7 +1,17 @@
 """
 Update Worker Stats Handler.
-Triggered by DynamoDB Streams on SubmissionsTable.
-Updates worker gamification metrics when submissions are approved/rejected.
+Triggered by DynamoDB Streams on SubmissionsTable and TransactionsTable.
+Updates worker gamification metrics when submissions are approved/rejected,
+and worker earnings when a payment is recorded.
+
+New Pending submissions are also relayed to QC here (shared.submission_relay)
+so the Submissions stream keeps a single Lambda reader besides its other
+consumer. Records that could not be relayed are reported back to the stream:
+the batch is retried from the earliest one, so stats are only applied to the
+records before it.
+
+Earnings come from the TASK_PAYMENT ledger row written by process_payment
+(the amount actually paid, after the platform fee), so no task is read here.
 """
 import json
 import boto3
@@ -10,23 +20,36 @@ from datetime import datetime, timezone
 from shared.config import config
 from shared.models import SubmissionStatus, WorkerLevel
 from shared.gamification import calculate_level
+from shared.submission_relay import relay
+
+# Ledger row type carrying a worker's payment
+PAYMENT_TRANSACTION_TYPE = 'TASK_PAYMENT'
 
 dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
 
 
 def handler(event, context):
     """
-    Handler triggered by DynamoDB Stream on Submissions Table.
-    Listens for MODIFY events where status changes to 'Approved' or 'Rejected'.
+    Handler triggered by DynamoDB Streams.
+    Submissions: INSERT events of Pending submissions (relayed to QC), and
+    MODIFY events where status changes to 'Approved' or 'Rejected'.
+    Transactions: INSERT events of worker payment rows.
     """
     print("Received event:", json.dumps(event))
 
     if 'Records' not in event:
         return {'message': 'No records to process'}
 
+    records = event['Records']
+    failed = relay(records)
+    if failed:
+        # The stream resumes from the earliest failure; later records wait for the retry
+        first = min(failed, key=int)
+        records = [r for r in records if int(r['dynamodb']['SequenceNumber']) < int(first)]
+
     processed = 0
-    for record in event['Records']:
-        if record['eventName'] == 'MODIFY':
+    for record in records:
+        if record['eventName'] in ('MODIFY', 'INSERT'):
             try:
                 if process_record(record):
                     processed += 1
@@ -35,7 +58,10 @@ def handler(event, context):
                 import traceback
                 traceback.print_exc()
 
-    return {'message': f'Processed {processed} records'}
+    return {
+        'message': f'Processed {processed} records',
+        'batchItemFailures': [{'itemIdentifier': first}] if failed else []
+    }
 
 
 def process_record(record) -> bool:
@@ -43,6 +69,10 @@ def process_record(record) -> bool:
     Process a single DynamoDB Stream record.
     Returns True if stats were updated, False otherwise.
     """
+    if record['eventName'] == 'INSERT':
+        # Submission inserts are handled by the relay
+        return process_payment_record(record)
+
     new_image = record['dynamodb']['NewImage']
     old_image = record['dynamodb']['OldImage']
 
@@ -61,20 +91,51 @@ def process_record(record) -> bool:
         print("No workerId found in record")
         return False
 
-    task_id = new_image.get('taskId', {}).get('S')
-
     if new_status == SubmissionStatus.APPROVED:
-        update_worker_stats(worker_id, is_approved=True, task_id=task_id)
+        update_worker_stats(worker_id, is_approved=True)
         return True
     elif new_status == SubmissionStatus.REJECTED:
-        update_worker_stats(worker_id, is_approved=False, task_id=task_id)
+        update_worker_stats(worker_id, is_approved=False)
         return True
     
     return False
 
 
+def process_payment_record(record) -> bool:
+    """
+    Add a payment ledger row's amount to the worker's earnings.
+    Returns True if earnings were updated.
+    """
+    new_image = record['dynamodb'].get('NewImage', {})
+    if new_image.get('type', {}).get('S') != PAYMENT_TRANSACTION_TYPE:
+        return False
+
+    worker_id = new_image.get('to', {}).get('S')
+    amount = new_image.get('amount', {}).get('N')
+    if not worker_id or amount is None:
+        print("Payment record without worker or amount")
+        return False
+
+    add_earnings(worker_id, Decimal(amount))
+    return True
+
+
+def add_earnings(worker_id: str, amount: Decimal):
+    """Atomically add a paid amount to a worker's earnings."""
+    workers_table = dynamodb.Table(config.WORKERS_TABLE)
+    workers_table.update_item(
+        Key={'workerId': worker_id},
+        UpdateExpression='ADD earnings :amount SET updatedAt = :ts',
+        ExpressionAttributeValues={
+            ':amount': amount,
+            ':ts': datetime.now(timezone.utc).isoformat()
+        }
+    )
+    print(f"Worker {worker_id} earned {amount}")
+
 
-def update_worker_stats(worker_id: str, is_approved: bool, task_id: str = None):
+
+def update_worker_stats(worker_id: str, is_approved: bool):
     """
     Update worker statistics and recalculate level.
     Uses atomic operations to prevent race conditions.
@@ -82,31 +143,17 @@ def update_worker_stats(worker_id: str, is_approved: bool, task_id: str = None):
     Args:
         worker_id: The worker's ID
         is_approved: True if submission was approved, False if rejected
-        task_id: The task ID (optional, used for fetching reward)
     """
     workers_table = dynamodb.Table(config.WORKERS_TABLE)
     timestamp = datetime.now(timezone.utc).isoformat()
 
     try:
-        # Fetch task to get reward if approved
-        reward_amount = Decimal('0')
-        if is_approved and task_id:
-            try:
-                tasks_table = dynamodb.Table(config.TASKS_TABLE)
-                task_resp = tasks_table.get_item(Key={'taskId': task_id})
-                task_item = task_resp.get('Item', {})
-                # Match the wallet logic: 80% to worker
-                full_reward = Decimal(str(task_item.get('reward', '0')))
-                reward_amount = full_reward * Decimal('0.8')
-            except Exception as e:
-                print(f"Error fetching task {task_id}: {e}")
-
         # Use UpdateItem with ADD to atomically increment
+        # (earnings are added when the payment is recorded)
         if is_approved:
-             update_expr = 'ADD tasksSubmitted :one, tasksApproved :one, earnings :reward SET updatedAt = :ts'
+             update_expr = 'ADD tasksSubmitted :one, tasksApproved :one SET updatedAt = :ts'
              attrs = {
                 ':one': 1,
-                ':reward': reward_amount,
                 ':ts': timestamp
             }
         else:
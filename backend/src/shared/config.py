@@ -13,29 +13,80 @@ class Config:
     
     # DynamoDB Tables
     TASKS_TABLE = os.environ.get('TASKS_TABLE', '')
+    STATUS_SHARD_COUNT = int(os.environ.get('STATUS_SHARD_COUNT', '8'))  # StatusShardIndex partitions per status
+    STATUS_SHARD_READS = os.environ.get('STATUS_SHARD_READS', 'false') == 'true'  # Read StatusShardIndex (after its backfill)
+    REQUESTER_STATUS_READS = os.environ.get('REQUESTER_STATUS_READS', 'false') == 'true'  # Dashboard reads RequesterStatusIndex/counters (after their backfill)
     SUBMISSIONS_TABLE = os.environ.get('SUBMISSIONS_TABLE', '')
     WALLETS_TABLE = os.environ.get('WALLETS_TABLE', '')
     TRANSACTIONS_TABLE = os.environ.get('TRANSACTIONS_TABLE', '')
+    LEDGER_SNAPSHOTS_TABLE = os.environ.get('LEDGER_SNAPSHOTS_TABLE', '')  # Per-user daily ledger aggregates
     DISPUTES_TABLE = os.environ.get('DISPUTES_TABLE', '')
     ASSIGNMENTS_TABLE = os.environ.get('ASSIGNMENTS_TABLE', '')
     WORKERS_TABLE = os.environ.get('WORKERS_TABLE', '')
+    REQUESTERS_TABLE = os.environ.get('REQUESTERS_TABLE', '')  # Requester profiles (and per-status task counters)
+    BATCHES_TABLE = os.environ.get('BATCHES_TABLE', '')  # Batch records (manifest ingestion progress)
+    BATCH_WRITE_WORKERS = int(os.environ.get('BATCH_WRITE_WORKERS', '8'))  # Parallel BatchWriteItem chunks
+    BATCH_WRITE_WCU_BUDGET = float(os.environ.get('BATCH_WRITE_WCU_BUDGET', '0'))  # WCU/s per bulk write, 0 = unlimited
     
     # SQS Queues
     SUBMISSION_QUEUE_URL = os.environ.get('SUBMISSION_QUEUE_URL', '')
     AVAILABLE_TASKS_QUEUE_URL = os.environ.get('AVAILABLE_TASKS_QUEUE_URL', '')
+    READY_QUEUE_URLS = os.environ.get('READY_QUEUE_URLS', '')  # JSON: {"<level>[#<type>]": url}
+    INGESTION_QUEUE_URL = os.environ.get('INGESTION_QUEUE_URL', '')  # Manifest ingestion jobs
+    TRANSCRIPTION_QUEUE_URL = os.environ.get('TRANSCRIPTION_QUEUE_URL', '')  # Transcribe job requests
+    VALIDATION_QUEUE_URL = os.environ.get('VALIDATION_QUEUE_URL', '')  # FIFO: QC work relayed from the Submissions stream
+    NOTIFICATION_QUEUE_URL = os.environ.get('NOTIFICATION_QUEUE_URL', '')  # Notification intents (email outbox)
     
     # Step Functions
     DISPUTE_STATE_MACHINE_ARN = os.environ.get('DISPUTE_STATE_MACHINE_ARN', '')
     
     # S3 Buckets
     MEDIA_BUCKET = os.environ.get('MEDIA_BUCKET', '')
+    PRESIGN_SAFETY_MARGIN = int(os.environ.get('PRESIGN_SAFETY_MARGIN', '300'))  # Seconds before expiry to re-sign
+    
+    # Media access mode: 'presigned' (S3 GET URLs), 'cloudfront-url' or 'cloudfront-cookie'
+    MEDIA_URL_MODE = os.environ.get('MEDIA_URL_MODE', 'presigned')
+    MEDIA_CDN_DOMAIN = os.environ.get('MEDIA_CDN_DOMAIN', '')  # e.g. media.example.com
+    MEDIA_COOKIE_DOMAIN = os.environ.get('MEDIA_COOKIE_DOMAIN', '')  # Parent domain of the API and CDN, e.g. .example.com
+    CORS_ALLOWED_ORIGINS = os.environ.get('CORS_ALLOWED_ORIGINS', '')  # Comma-separated origins allowed credentialed requests
+    MEDIA_URL_WINDOW = int(os.environ.get('MEDIA_URL_WINDOW', '3600'))  # Signed expiry window in seconds
+    CLOUDFRONT_KEY_PAIR_ID = os.environ.get('CLOUDFRONT_KEY_PAIR_ID', '')
+    CLOUDFRONT_PRIVATE_KEY_SECRET = os.environ.get('CLOUDFRONT_PRIVATE_KEY_SECRET', '')  # Secrets Manager id (PEM)
+    
+    # Bulk ingestion (S3 manifests)
+    INGEST_WINDOW_SIZE = int(os.environ.get('INGEST_WINDOW_SIZE', '500'))  # Manifest rows per progress update
     
     # AI Services Configuration
     SAGEMAKER_ENDPOINT_NAME = os.environ.get('SAGEMAKER_ENDPOINT_NAME', '')
     REKOGNITION_MIN_CONFIDENCE = float(os.environ.get('REKOGNITION_MIN_CONFIDENCE', '90'))
     TRANSCRIBE_LANGUAGE = os.environ.get('TRANSCRIBE_LANGUAGE', 'es-ES')
+    TRANSCRIBE_START_RATE = float(os.environ.get('TRANSCRIBE_START_RATE', '2'))  # Job starts/sec per dispatcher
+    TRANSCRIBE_START_BURST = float(os.environ.get('TRANSCRIBE_START_BURST', '5'))  # Token bucket capacity
+    TRANSCRIBE_BACKOFF_BASE = int(os.environ.get('TRANSCRIBE_BACKOFF_BASE', '30'))  # Seconds, doubled per throttled receive
+    TRANSCRIBE_BACKOFF_MAX = int(os.environ.get('TRANSCRIBE_BACKOFF_MAX', '900'))  # Cap on requeue delay
+    TRANSCRIPTION_REQUEUE_MINUTES = int(os.environ.get('TRANSCRIPTION_REQUEUE_MINUTES', '30'))  # QUEUED this long = request lost, resend
+    SES_SEND_RATE = float(os.environ.get('SES_SEND_RATE', '10'))  # Emails/sec per notification sender
     TEXT_SIMILARITY_THRESHOLD = float(os.environ.get('TEXT_SIMILARITY_THRESHOLD', '0.85'))
     
+    # Task Matching ("give me next task") Configuration
+    MATCH_CANDIDATE_LIMIT = int(os.environ.get('MATCH_CANDIDATE_LIMIT', '100'))  # Published tasks read per match
+    MATCH_MAX_ATTEMPTS = int(os.environ.get('MATCH_MAX_ATTEMPTS', '5'))  # Lock attempts before giving up
+    DISPATCH_MODE = os.environ.get('DISPATCH_MODE', 'index')  # 'index' (StatusIndex) or 'queue' (ready queues)
+    MAX_LEASE_RENEWALS = int(os.environ.get('MAX_LEASE_RENEWALS', '12'))  # Heartbeats allowed per assignment
+    
+    # Payments
+    PAYMENT_SETTLEMENT_MODE = os.environ.get('PAYMENT_SETTLEMENT_MODE', 'batch')  # 'batch' (netted per stream batch) or 'single'
+    WALLET_CACHE_SECONDS = float(os.environ.get('WALLET_CACHE_SECONDS', '5'))  # Balance cache TTL in get_wallet
+    RECONCILE_SETTLE_SECONDS = int(os.environ.get('RECONCILE_SETTLE_SECONDS', '30'))  # Wait before re-checking a mismatch
+    PLATFORM_WALLET_SHARDS = int(os.environ.get('PLATFORM_WALLET_SHARDS', '10'))  # Items the platform fee balance is spread over
+
+    # Withdrawal payouts
+    PAYOUT_PROVIDER = os.environ.get('PAYOUT_PROVIDER', 'mock')  # Batch payouts client (only 'mock' so far)
+    PAYOUT_BATCH_SIZE = int(os.environ.get('PAYOUT_BATCH_SIZE', '100'))  # Withdrawals per provider call
+    PAYOUT_BATCH_WINDOW_MINUTES = int(os.environ.get('PAYOUT_BATCH_WINDOW_MINUTES', '15'))  # Batcher schedule
+    PAYOUT_MAX_PER_RUN = int(os.environ.get('PAYOUT_MAX_PER_RUN', '1000'))  # Pending withdrawals taken per run
+    PAYOUT_SHARD_COUNT = int(os.environ.get('PAYOUT_SHARD_COUNT', '4'))  # PayoutStatusIndex partitions per status
+    
     # Consensus (Majority Voting) Configuration
     CONSENSUS_QUORUM = int(os.environ.get('CONSENSUS_QUORUM', '3'))  # Submissions required for voting
 
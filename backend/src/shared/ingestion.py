@@ -0,0 +1,351 @@
+"""
+Bulk task ingestion from S3 manifests.
+
+A manifest is either JSONL (one task object per line) or CSV (one task per
+row: a header line, a JSON 'payload' column, and any other unknown columns
+copied into the payload). It is streamed from S3 line by line, never held
+in memory, and tasks are written with parallel BatchWriteItem chunks.
+
+Task IDs are derived from the batch ID and the row's byte offset, so a
+window that is re-processed (SQS redelivery, continuation) overwrites the
+same items instead of creating duplicates. Progress is recorded on the
+batch record in BATCHES_TABLE.
+"""
+import csv
+import json
+import time
+import uuid
+import boto3
+from decimal import Decimal
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from botocore.exceptions import ClientError
+from .config import config
+from .logging import logger
+from .models import TaskStatus, BatchStatus, TaskType, TranscriptionStatus
+from .dynamo import batch_write_items
+from .sqs import send_message, send_message_batch
+from .status_index import status_fields
+
+dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
+s3 = boto3.client('s3', region_name=config.AWS_REGION)
+
+MANIFEST_FORMAT_JSONL = 'jsonl'
+MANIFEST_FORMAT_CSV = 'csv'
+
+# Manifests are read from the media bucket under the requester's own prefix
+MANIFEST_PREFIX = 'manifests/'
+
+# Columns with a meaning of their own; anything else in a CSV row is payload
+TASK_FIELDS = ('type', 'payload', 'isGold', 'goldAnswer', 'requiredLevel', 'requiredCertification', 'requiredSubmissions')
+
+
+def build_task_item(task_input: Dict[str, Any], requester_id: str, batch_id: str, task_id: str, timestamp: str) -> Dict[str, Any]:
+    """
+    Build a Created task item from one task definition.
+
+    Args:
+        task_input: Task definition (type, payload, isGold, goldAnswer, ...)
+        requester_id: Owner of the batch
+        batch_id: Batch the task belongs to
+        task_id: ID for the new task
+        timestamp: createdAt value
+
+    Returns:
+        The DynamoDB item
+
+    Raises:
+        ValueError: if requiredSubmissions is not a positive integer
+    """
+    payload = task_input.get('payload', {})
+
+    # Logic: if goldAnswer is present and truthy, it is gold. Or if isGold is explicitly true.
+    is_gold = task_input.get('isGold', False)
+    gold_answer = task_input.get('goldAnswer')
+
+    if gold_answer:
+        is_gold = True
+
+    # Independent submissions collected before QC: gold tasks are checked
+    # against their answer, the rest go to a consensus vote
+    required = 1 if is_gold else required_submissions(task_input)
+
+    item = {
+        'taskId': task_id,
+        'requesterId': requester_id,
+        'batchId': batch_id,
+        **status_fields(TaskStatus.CREATED, task_id),
+        'type': task_input.get('type', 'generic'),
+        'payload': payload,
+        'createdAt': timestamp,
+        'isGold': is_gold,
+        'requiredLevel': task_input.get('requiredLevel', 'Novice'),  # Gamification: skill level required
+        # Redundancy: up to requiredSubmissions workers hold the task at once
+        'requiredSubmissions': required,
+        'openSlots': required,
+        'activeAssignments': 0,
+        'submissionCount': 0
+    }
+
+    # Skill-based routing: only workers holding this certification can claim it
+    if task_input.get('requiredCertification'):
+        item['requiredCertification'] = task_input['requiredCertification']
+
+    # Only add goldAnswer if it exists (not None)
+    if is_gold and gold_answer is not None:
+        item['goldAnswer'] = gold_answer
+
+    return item
+
+
+def required_submissions(task_input: Dict[str, Any]) -> int:
+    """
+    A task's requiredSubmissions (CONSENSUS_QUORUM if not given).
+
+    Raises:
+        ValueError: if the value is not a positive integer
+    """
+    value = task_input.get('requiredSubmissions')
+    if value is None or value == '':
+        return config.CONSENSUS_QUORUM
+    try:
+        required = int(str(value).strip())
+    except ValueError:
+        required = 0
+    if isinstance(value, bool) or required < 1:
+        raise ValueError('requiredSubmissions must be a positive integer')
+    return required
+
+
+def get_audio_key(item: Dict[str, Any]) -> Optional[str]:
+    """S3 key of the audio to transcribe, or None if the task needs no transcription."""
+    if item.get('type') != TaskType.AUDIO_TRANSCRIPTION or item.get('isGold'):
+        return None
+    payload = item.get('payload') or {}
+    return payload.get('audioS3Key') or payload.get('audio_key') or payload.get('audioKey')
+
+
+def mark_transcription_queued(item: Dict[str, Any]) -> None:
+    """
+    Mark an audio task as waiting for dispatch_transcriptions. The queued
+    time indexes it in TranscriptionQueueIndex, where requeue_transcriptions
+    finds requests that never reached (or never left) the queue.
+    """
+    item['transcriptionStatus'] = TranscriptionStatus.QUEUED
+    item['transcriptionQueuedAt'] = str(int(time.time()))
+
+
+def manifest_format(key: str, declared: Optional[str] = None) -> str:
+    """Manifest format from an explicit value or the key's extension (default JSONL)."""
+    if declared:
+        return declared.lower()
+    return MANIFEST_FORMAT_CSV if key.lower().endswith('.csv') else MANIFEST_FORMAT_JSONL
+
+
+def manifest_prefix(requester_id: str) -> str:
+    """Key prefix a requester's manifests must be uploaded under."""
+    return f"{MANIFEST_PREFIX}{requester_id}/"
+
+
+def row_task_id(batch_id: str, offset: int) -> str:
+    """Deterministic task ID for the manifest row starting at `offset`."""
+    return str(uuid.uuid5(uuid.UUID(batch_id), str(offset)))
+
+
+def _parse_csv_row(fieldnames: List[str], line: str) -> Dict[str, Any]:
+    """Turn one CSV row into a task definition."""
+    values = next(csv.reader([line]))
+    row = dict(zip(fieldnames, values))
+
+    payload = json.loads(row['payload'], parse_float=Decimal) if row.get('payload') else {}
+    payload.update({k: v for k, v in row.items() if k not in TASK_FIELDS and v != ''})
+
+    task_input = {k: row[k] for k in TASK_FIELDS if row.get(k) and k != 'payload'}
+    task_input['payload'] = payload
+    if 'isGold' in task_input:
+        task_input['isGold'] = task_input['isGold'].strip().lower() in ('true', '1', 'yes')
+    if 'requiredSubmissions' in task_input:
+        task_input['requiredSubmissions'] = int(task_input['requiredSubmissions'])
+    return task_input
+
+
+def read_csv_header(bucket: str, key: str) -> Tuple[List[str], int]:
+    """
+    Read a CSV manifest's header line.
+
+    Returns:
+        tuple: (fieldnames, byte offset of the first data row)
+    """
+    body = s3.get_object(Bucket=bucket, Key=key)['Body']
+    try:
+        header = next(body.iter_lines(keepends=True), b'')
+    finally:
+        body.close()
+    fieldnames = [name.strip() for name in next(csv.reader([header.decode('utf-8-sig')]), [])]
+    return fieldnames, len(header)
+
+
+def iter_manifest(
+    bucket: str,
+    key: str,
+    fmt: str,
+    offset: int = 0,
+    fieldnames: Optional[List[str]] = None
+) -> Iterator[Tuple[int, Optional[Dict[str, Any]], int]]:
+    """
+    Stream task definitions from a manifest, starting at a byte offset.
+
+    Args:
+        bucket: Bucket holding the manifest
+        key: Manifest object key
+        fmt: MANIFEST_FORMAT_JSONL or MANIFEST_FORMAT_CSV
+        offset: Byte offset to start from (start of a row)
+        fieldnames: CSV header (see read_csv_header)
+
+    Yields:
+        tuple: (row_offset, task_input or None if the row is invalid, next_offset);
+               nothing if the offset is at the end of the object (a header-only
+               CSV, or a continuation whose window ended there)
+    """
+    params = {'Bucket': bucket, 'Key': key}
+    if offset:
+        params['Range'] = f'bytes={offset}-'
+    try:
+        body = s3.get_object(**params)['Body']
+    except ClientError as e:
+        # S3 refuses a range starting at or past the object's size
+        if offset and e.response['Error']['Code'] == 'InvalidRange':
+            return
+        raise
+
+    try:
+        for raw in body.iter_lines(keepends=True):
+            row_offset, offset = offset, offset + len(raw)
+            line = raw.decode('utf-8-sig').strip()
+            if not line:
+                continue
+            try:
+                if fmt == MANIFEST_FORMAT_CSV:
+                    task_input = _parse_csv_row(fieldnames, line)
+                else:
+                    # DynamoDB rejects floats: keep numbers exact as Decimal
+                    task_input = json.loads(line, parse_float=Decimal)
+                if not isinstance(task_input, dict):
+                    raise ValueError('row is not an object')
+            except (ValueError, KeyError, StopIteration) as e:
+                logger.warning(f"Invalid manifest row at byte {row_offset} of {key}: {e}")
+                task_input = None
+            yield row_offset, task_input, offset
+    finally:
+        body.close()
+
+
+def write_tasks_parallel(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Write tasks in parallel 25-item BatchWriteItem chunks.
+
+    Returns:
+        Items that could not be written
+    """
+    return batch_write_items(config.TASKS_TABLE, items, key_names=['taskId']).failed
+
+
+def queue_transcriptions(items: List[Dict[str, Any]]) -> int:
+    """
+    Send Transcribe job requests for audio tasks to TRANSCRIPTION_QUEUE_URL.
+
+    Returns:
+        Number of requests queued
+    """
+    requests = [
+        {'taskId': item['taskId'], 'bucket': config.MEDIA_BUCKET, 'key': get_audio_key(item)}
+        for item in items if get_audio_key(item)
+    ]
+    if not requests or not config.TRANSCRIPTION_QUEUE_URL or not config.MEDIA_BUCKET:
+        return 0
+    return len(requests) if send_message_batch(config.TRANSCRIPTION_QUEUE_URL, requests) else 0
+
+
+def create_batch_record(batch_id: str, requester_id: str, bucket: str, key: str, fmt: str) -> Dict[str, Any]:
+    """Create the batch record that tracks ingestion progress."""
+    record = {
+        'batchId': batch_id,
+        'requesterId': requester_id,
+        'status': BatchStatus.INGESTING,
+        'manifestBucket': bucket,
+        'manifestS3Key': key,
+        'manifestFormat': fmt,
+        'manifestOffset': 0,
+        'rowsRead': 0,
+        'tasksWritten': 0,
+        'tasksFailed': 0,
+        'transcriptionsQueued': 0,
+        'createdAt': str(int(time.time()))
+    }
+    dynamodb.Table(config.BATCHES_TABLE).put_item(Item=record)
+    return record
+
+
+def get_batch(batch_id: str) -> Optional[Dict[str, Any]]:
+    """Get a batch record (strongly consistent: used to resume ingestion)."""
+    response = dynamodb.Table(config.BATCHES_TABLE).get_item(Key={'batchId': batch_id}, ConsistentRead=True)
+    return response.get('Item')
+
+
+def record_progress(
+    batch_id: str,
+    prev_offset: int,
+    new_offset: int,
+    rows: int,
+    written: int,
+    failed: int,
+    queued: int,
+    status: Optional[str] = None
+) -> bool:
+    """
+    Add a window's counts to the batch record and advance its offset.
+
+    Conditioned on the record still being at `prev_offset`, so a window
+    processed twice is only counted once.
+
+    Returns:
+        True if recorded, False if this window was already recorded
+    """
+    update = ('SET manifestOffset = :new_offset, updatedAt = :now '
+              'ADD rowsRead :rows, tasksWritten :written, tasksFailed :failed, transcriptionsQueued :queued')
+    values = {
+        ':prev_offset': prev_offset,
+        ':new_offset': new_offset,
+        ':now': str(int(time.time())),
+        ':rows': rows,
+        ':written': written,
+        ':failed': failed,
+        ':queued': queued
+    }
+    names = None
+    if status:
+        update = update.replace('updatedAt = :now', 'updatedAt = :now, #status = :status')
+        values[':status'] = status
+        names = {'#status': 'status'}
+
+    params = {
+        'Key': {'batchId': batch_id},
+        'UpdateExpression': update,
+        'ConditionExpression': 'manifestOffset = :prev_offset',
+        'ExpressionAttributeValues': values
+    }
+    if names:
+        params['ExpressionAttributeNames'] = names
+
+    try:
+        dynamodb.Table(config.BATCHES_TABLE).update_item(**params)
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            logger.info(f"Batch {batch_id}: window at offset {prev_offset} already recorded")
+            return False
+        raise
+
+
+def start_ingestion(job: Dict[str, Any]) -> bool:
+    """Queue a manifest ingestion job (initial or continuation)."""
+    return send_message(config.INGESTION_QUEUE_URL, job)
@@ -0,0 +1,145 @@
+"""
+Notification outbox.
+
+Handlers that move money don't send email themselves: they enqueue a
+notification intent ({kind, userId, email, data}) on the notification
+queue and carry on. send_notifications drains the queue in batches,
+coalesces a user's intents of the same kind into one email (e.g. all the
+payments of a batching window become "you earned $X across N tasks"),
+renders it from the templates below and sends it at a paced rate, so SES
+latency, errors and quotas never reach the payment path.
+"""
+import json
+import boto3
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+from .config import config
+from .logging import logger
+
+sqs = boto3.client('sqs', region_name=config.AWS_REGION)
+
+# SendMessageBatch limit
+SEND_BATCH_SIZE = 10
+
+# Notification kinds
+PAYMENT = 'PAYMENT'
+WITHDRAWAL = 'WITHDRAWAL'
+WITHDRAWAL_FAILED = 'WITHDRAWAL_FAILED'
+
+# Kinds whose intents for one user are merged into a single email
+COALESCED_KINDS = {PAYMENT}
+
+# Worker emails aren't stored yet: payment notices go to this mocked address
+DEFAULT_RECIPIENT = 'worker@example.com'
+
+
+def notification(kind: str, user_id: str, data: Dict[str, Any], email: Optional[str] = None) -> Dict[str, Any]:
+    """Build a notification intent."""
+    return {'kind': kind, 'userId': user_id, 'email': email or DEFAULT_RECIPIENT, 'data': data}
+
+
+def enqueue_notifications(intents: List[Dict[str, Any]]) -> int:
+    """
+    Queue notification intents for the sender.
+
+    Never raises: a notification that can't be queued is logged and
+    dropped, it must not fail the operation it reports on.
+
+    Returns:
+        Number of intents queued
+    """
+    queued = 0
+    for start in range(0, len(intents), SEND_BATCH_SIZE):
+        chunk = intents[start:start + SEND_BATCH_SIZE]
+        entries = [
+            {'Id': str(index), 'MessageBody': json.dumps(intent, default=str)}
+            for index, intent in enumerate(chunk)
+        ]
+        try:
+            response = sqs.send_message_batch(QueueUrl=config.NOTIFICATION_QUEUE_URL, Entries=entries)
+        except Exception as e:
+            logger.error(f"Failed to queue {len(chunk)} notifications: {e}")
+            continue
+        failed = response.get('Failed', [])
+        for failure in failed:
+            logger.error(f"Notification not queued: {failure.get('Message')}")
+        queued += len(chunk) - len(failed)
+    return queued
+
+
+def coalesce(intents: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[List[str], str, str, List[Dict[str, Any]]]]:
+    """
+    Group intents into emails.
+
+    Args:
+        intents: (message_id, intent) pairs
+
+    Returns:
+        List of (message_ids, kind, email, data_list), one per email to send
+    """
+    groups = defaultdict(list)
+    for message_id, intent in intents:
+        kind = intent.get('kind')
+        if kind in COALESCED_KINDS:
+            key = (kind, intent.get('userId'), intent.get('email'))
+        else:
+            key = (kind, intent.get('userId'), intent.get('email'), message_id)
+        groups[key].append((message_id, intent))
+
+    return [
+        ([message_id for message_id, _ in members], key[0], key[2], [intent.get('data', {}) for _, intent in members])
+        for key, members in groups.items()
+    ]
+
+
+def render(kind: str, data_list: List[Dict[str, Any]]) -> Tuple[str, str]:
+    """
+    Subject and text body for one email.
+
+    Raises:
+        ValueError: For an unknown kind
+    """
+    if kind == PAYMENT:
+        return _render_payments(data_list)
+    if kind == WITHDRAWAL:
+        return _render_withdrawal(data_list[0])
+    if kind == WITHDRAWAL_FAILED:
+        return _render_withdrawal_failed(data_list[0])
+    raise ValueError(f"Unknown notification kind: {kind}")
+
+
+def _render_payments(data_list: List[Dict[str, Any]]) -> Tuple[str, str]:
+    amount = sum((Decimal(str(d.get('amount', 0))) for d in data_list), Decimal('0'))
+    fee = sum((Decimal(str(d.get('fee', 0))) for d in data_list), Decimal('0'))
+
+    if len(data_list) == 1:
+        text = f'Great news! You have received ${amount} for completing task {data_list[0].get("taskId")}.\n\n'
+    else:
+        text = f'Great news! You have earned ${amount} across {len(data_list)} tasks.\n\n'
+    text += (
+        f'Note: A platform fee of ${fee} (20%) was deducted from the original reward.\n\n'
+        f'Thank you for using our platform!'
+    )
+    return 'Payment Received! 💰', text
+
+
+def _render_withdrawal(data: Dict[str, Any]) -> Tuple[str, str]:
+    return 'Withdrawal Requested 💸', (
+        f'Your withdrawal request has been received and is pending payout.\n\n'
+        f'Amount: ${data.get("amount")}\n'
+        f'PayPal Email: {data.get("paypalEmail")}\n'
+        f'Transaction ID: {data.get("transactionId")}\n\n'
+        f'Estimated arrival: 1-3 business days\n\n'
+        f'Thank you for using our platform!'
+    )
+
+
+def _render_withdrawal_failed(data: Dict[str, Any]) -> Tuple[str, str]:
+    return 'Withdrawal Failed', (
+        f'We could not pay out your withdrawal, and the amount has been returned to your wallet.\n\n'
+        f'Amount: ${data.get("amount")}\n'
+        f'PayPal Email: {data.get("paypalEmail")}\n'
+        f'Transaction ID: {data.get("transactionId")}\n\n'
+        f'Please check your PayPal email and request the withdrawal again.'
+    )
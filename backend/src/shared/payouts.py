@@ -0,0 +1,93 @@
+"""
+Withdrawal payouts.
+
+Withdrawal ledger rows move through payout statuses
+PENDING -> PROCESSING -> COMPLETED (or FAILED, with the amount credited
+back). Each row carries `payoutShard` = '<status>#shard<N>' (N from the
+transactionId), indexed by PayoutStatusIndex with createdAt, so the payout
+batcher reads one status across a few GSI partitions instead of scanning
+the ledger, like the task status index.
+
+Payouts are sent through a PayoutsClient. Only a mock stand-in for PayPal
+Payouts exists; it follows the same contract (one call per batch,
+idempotent on sender_batch_id, a status per item).
+"""
+import abc
+import uuid
+from typing import Any, Dict, List
+from .config import config
+from .logging import logger
+from .status_index import shard_for_task
+
+PAYOUT_STATUS_INDEX = 'PayoutStatusIndex'
+PAYOUT_SHARD_ATTRIBUTE = 'payoutShard'
+
+# Withdrawal (ledger row) statuses
+PENDING = 'PENDING'
+PROCESSING = 'PROCESSING'
+COMPLETED = 'COMPLETED'
+FAILED = 'FAILED'
+
+# Per-item results reported by the payouts provider (others, e.g. PENDING
+# or UNCLAIMED, mean the payout is not settled yet)
+ITEM_SUCCESS = 'SUCCESS'
+ITEM_FAILED = 'FAILED'
+
+# Namespace for payout batch IDs derived from their withdrawals
+PAYOUT_BATCH_NAMESPACE = uuid.UUID('9d3f6b2e-1c7a-5f80-b4e2-6a5d8c0f1e37')
+
+
+def payout_shard_key(status: str, transaction_id: str) -> str:
+    """GSI partition key for a withdrawal in a payout status, e.g. 'PENDING#shard2'."""
+    return f"{status}#shard{shard_for_task(transaction_id, config.PAYOUT_SHARD_COUNT)}"
+
+
+def payout_batch_id(transaction_ids: List[str]) -> str:
+    """Stable sender_batch_id for a set of withdrawals (resending it can't pay twice)."""
+    return str(uuid.uuid5(PAYOUT_BATCH_NAMESPACE, ','.join(sorted(transaction_ids))))
+
+
+class PayoutsClient(abc.ABC):
+    """Interface of a batch payouts provider."""
+
+    @abc.abstractmethod
+    def create_batch_payout(self, sender_batch_id: str, items: List[Dict[str, Any]]) -> Dict[str, str]:
+        """
+        Pay a batch of receivers in one call.
+
+        Args:
+            sender_batch_id: Idempotency key of the batch
+            items: { transactionId, amount, receiver } per payout
+
+        Returns:
+            dict: transactionId -> item status (ITEM_SUCCESS, ITEM_FAILED,
+                  or a provider status for a payout still in progress)
+        """
+
+
+class MockPayPalPayouts(PayoutsClient):
+    """
+    In-memory PayPal Payouts stand-in: every payout succeeds, and a batch ID
+    seen before returns its first result.
+    """
+
+    def __init__(self):
+        self.batches: Dict[str, Dict[str, str]] = {}
+
+    def create_batch_payout(self, sender_batch_id, items):
+        if sender_batch_id not in self.batches:
+            logger.info(f"[mock PayPal] batch {sender_batch_id}: {len(items)} payouts")
+            self.batches[sender_batch_id] = {item['transactionId']: ITEM_SUCCESS for item in items}
+        return self.batches[sender_batch_id]
+
+
+def get_payouts_client() -> PayoutsClient:
+    """
+    Payouts provider selected by PAYOUT_PROVIDER.
+
+    Raises:
+        ValueError: For a provider with no client
+    """
+    if config.PAYOUT_PROVIDER == 'mock':
+        return MockPayPalPayouts()
+    raise ValueError(f"Unsupported payout provider: {config.PAYOUT_PROVIDER}")
@@ -0,0 +1,102 @@
+"""
+Client-side rate limiting for calls to throttled AWS APIs.
+
+TokenBucket paces calls within one Lambda container (kept across warm
+invocations as a module-level instance); the number of concurrent
+containers is capped separately (e.g. SQS event source maxConcurrency),
+so the fleet-wide rate is rate x concurrency.
+"""
+import random
+import threading
+import time
+from typing import Callable, Optional
+from botocore.exceptions import ClientError
+
+# Error codes AWS services use to signal throttling or quota exhaustion
+THROTTLING_ERROR_CODES = {
+    'ThrottlingException',
+    'Throttling',
+    'TooManyRequestsException',
+    'LimitExceededException',
+    'RequestLimitExceeded',
+    'ProvisionedThroughputExceededException',
+    'SlowDown',
+}
+
+
+class TokenBucket:
+    """
+    Token bucket: `rate` tokens per second, bursts up to `capacity`.
+
+    Args:
+        rate: Tokens added per second
+        capacity: Maximum stored tokens (defaults to max(1, rate))
+        clock: Monotonic time source (injectable for tests)
+        sleep: Sleep function (injectable for tests)
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take tokens if available right now."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def wait_time(self, tokens: float = 1) -> float:
+        """Seconds until `tokens` would be available."""
+        with self._lock:
+            self._refill()
+            return max(0.0, (tokens - self._tokens) / self.rate)
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for tokens.
+
+        Returns:
+            True once acquired, False if that would take longer than `timeout`
+        """
+        deadline = None if timeout is None else self._clock() + timeout
+        while not self.try_acquire(tokens):
+            wait = self.wait_time(tokens)
+            if deadline is not None and self._clock() + wait > deadline:
+                return False
+            self._sleep(wait)
+        return True
+
+    def drain(self) -> None:
+        """Drop all stored tokens (e.g. after the service reports throttling)."""
+        with self._lock:
+            self._refill()
+            self._tokens = 0.0
+
+
+def is_throttling_error(error: Exception) -> bool:
+    """Whether an exception is an AWS throttling/quota error."""
+    return isinstance(error, ClientError) and error.response.get('Error', {}).get('Code') in THROTTLING_ERROR_CODES
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter for retry `attempt` (1-based)."""
+    return random.uniform(0, min(cap, base * (2 ** max(0, attempt - 1))))
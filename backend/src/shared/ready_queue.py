@@ -0,0 +1,237 @@
+"""
+Sharded ready queues for queue-backed task dispatch.
+
+Published tasks are pushed onto per-level (optionally per-level/per-type)
+SQS queues. Claiming a task receives a message with a visibility timeout
+equal to the assignment lease: while the worker holds the lease the
+message stays invisible, and if the lease lapses the message reappears so
+the task can be offered again. Claims never touch the StatusIndex.
+
+Shards are configured with READY_QUEUE_URLS, a JSON object mapping
+'<level>#<type>' or '<level>' to a queue URL. AVAILABLE_TASKS_QUEUE_URL is
+the catch-all shard.
+
+Messages a worker can't use (level or certification mismatch, or a task
+with slots left after a claim) are released back to the queue, which
+counts as a receive; the ready queues therefore have no redrive policy,
+and stale messages are deleted when their task is found finished.
+"""
+import json
+import random
+import time
+import boto3
+from typing import List, Dict, Any, Optional, Set, Tuple
+from .config import config
+from .logging import logger
+from .models import TaskStatus, WorkerLevel
+from .gamification import LEVEL_HIERARCHY, can_access_task
+from .assignments import try_lock_task, lease_seconds_for, ASSIGNMENT_TTL_SECONDS
+from .sqs import send_message_batch
+
+sqs = boto3.client('sqs', region_name=config.AWS_REGION)
+
+# Catch-all shard key (maps to AVAILABLE_TASKS_QUEUE_URL)
+DEFAULT_SHARD = '*'
+
+# Delay before re-offering a task whose lock failed but may free up soon
+RETRY_VISIBILITY_SECONDS = 60
+
+# SQS caps visibility timeouts at 12 hours
+MAX_VISIBILITY_SECONDS = 12 * 60 * 60
+
+
+def get_shard_urls() -> Dict[str, str]:
+    """Parse READY_QUEUE_URLS and add the catch-all shard."""
+    shards = {}
+    if config.READY_QUEUE_URLS:
+        try:
+            shards.update(json.loads(config.READY_QUEUE_URLS))
+        except json.JSONDecodeError as e:
+            logger.error(f"Invalid READY_QUEUE_URLS: {e}")
+    if config.AVAILABLE_TASKS_QUEUE_URL:
+        shards.setdefault(DEFAULT_SHARD, config.AVAILABLE_TASKS_QUEUE_URL)
+    return shards
+
+
+def queue_for_task(task: Dict[str, Any], shards: Dict[str, str] = None) -> Optional[str]:
+    """Pick the most specific shard for a task: level#type, then level, then catch-all."""
+    shards = shards if shards is not None else get_shard_urls()
+    level = task.get('requiredLevel') or WorkerLevel.NOVICE
+    for shard_key in (f"{level}#{task.get('type')}", level, DEFAULT_SHARD):
+        if shard_key in shards:
+            return shards[shard_key]
+    return None
+
+
+def accessible_queues(worker_level: str, shards: Dict[str, str] = None) -> List[str]:
+    """
+    Queue URLs holding tasks the worker's level can access.
+
+    Shards at the worker's own level come first (best use of their skills);
+    each tier is shuffled so workers spread their receives across shards.
+    """
+    shards = shards if shards is not None else get_shard_urls()
+    worker_rank = LEVEL_HIERARCHY.get(worker_level, 0)
+
+    by_rank: Dict[int, List[str]] = {}
+    for shard_key, url in shards.items():
+        level = shard_key.split('#', 1)[0]
+        rank = -1 if shard_key == DEFAULT_SHARD else LEVEL_HIERARCHY.get(level, 0)
+        if rank <= worker_rank:
+            by_rank.setdefault(rank, []).append(url)
+
+    ordered = []
+    for rank in sorted(by_rank, reverse=True):
+        urls = list(dict.fromkeys(by_rank[rank]))
+        random.shuffle(urls)
+        ordered.extend(u for u in urls if u not in ordered)
+    return ordered
+
+
+def enqueue_ready_tasks(tasks: List[Dict[str, Any]]) -> bool:
+    """
+    Push Published tasks onto their ready-queue shards.
+
+    Returns:
+        True if every task was enqueued, False otherwise
+    """
+    shards = get_shard_urls()
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for task in tasks:
+        url = queue_for_task(task, shards)
+        if not url:
+            logger.warning(f"No ready queue configured for task {task.get('taskId')}")
+            continue
+        message = {
+            'taskId': task['taskId'],
+            'type': task.get('type'),
+            'requiredLevel': task.get('requiredLevel'),
+            'batchId': task.get('batchId')
+        }
+        if task.get('requiredCertification'):
+            message['requiredCertification'] = task['requiredCertification']
+        if task.get('openSlots') is not None:
+            message['openSlots'] = int(task['openSlots'])
+        grouped.setdefault(url, []).append(message)
+
+    success = True
+    for url, messages in grouped.items():
+        success = send_message_batch(url, messages) and success
+    return success and sum(len(m) for m in grouped.values()) == len(tasks)
+
+
+def _set_visibility(queue_url: str, receipt_handle: str, seconds: int) -> None:
+    """Change a message's visibility, ignoring stale receipt handles."""
+    try:
+        sqs.change_message_visibility(
+            QueueUrl=queue_url,
+            ReceiptHandle=receipt_handle,
+            VisibilityTimeout=max(0, min(int(seconds), MAX_VISIBILITY_SECONDS))
+        )
+    except Exception as e:
+        logger.warning(f"Could not change message visibility: {e}")
+
+
+def delete_ready_message(queue_url: str, receipt_handle: str) -> None:
+    """Remove a task's ready message once the task no longer needs dispatching."""
+    try:
+        sqs.delete_message(QueueUrl=queue_url, ReceiptHandle=receipt_handle)
+    except Exception as e:
+        logger.warning(f"Could not delete ready message: {e}")
+
+
+def extend_ready_message(queue_url: str, receipt_handle: str, expires_at: int) -> None:
+    """Keep a claimed task's message hidden until its (renewed) lease ends."""
+    _set_visibility(queue_url, receipt_handle, expires_at - time.time())
+
+
+def _settle_lost_message(queue_url: str, receipt_handle: str, current_task: Optional[Dict[str, Any]]) -> None:
+    """
+    Decide what happens to a message whose task could not be locked.
+
+    - Task gone or already past assignment: the message is stale, delete it
+    - Task assigned to someone else: hide it until that lease may lapse
+    - Otherwise (e.g. momentarily unavailable): re-offer soon
+    """
+    status = (current_task or {}).get('status')
+    if status in (None, TaskStatus.REVIEW, TaskStatus.SUBMITTED, TaskStatus.COMPLETED, TaskStatus.EXPIRED):
+        delete_ready_message(queue_url, receipt_handle)
+    elif status == TaskStatus.ASSIGNED:
+        lease_end = int(current_task.get('leaseExpiresAt', 0))
+        _set_visibility(queue_url, receipt_handle, max(lease_end - time.time(), 0) + RETRY_VISIBILITY_SECONDS)
+    else:
+        _set_visibility(queue_url, receipt_handle, RETRY_VISIBILITY_SECONDS)
+
+
+def claim_from_ready_queue(
+    worker_id: str,
+    worker_level: str,
+    certifications: Set[str],
+    max_attempts: int = None,
+    lease_seconds: Optional[int] = None
+) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Claim the next task by popping messages from the worker's accessible shards.
+
+    Received messages are hidden for the lease duration (by default the
+    lease for the task's type); messages that are not used are released
+    immediately so other workers can take them.
+
+    Returns:
+        tuple: (task_message, assignment), or None if nothing could be claimed
+    """
+    attempts_left = max_attempts or config.MATCH_MAX_ATTEMPTS
+
+    for queue_url in accessible_queues(worker_level):
+        if attempts_left <= 0:
+            break
+
+        response = sqs.receive_message(
+            QueueUrl=queue_url,
+            MaxNumberOfMessages=min(10, attempts_left),
+            VisibilityTimeout=lease_seconds or ASSIGNMENT_TTL_SECONDS,
+            WaitTimeSeconds=0
+        )
+        messages = response.get('Messages', [])
+        claimed = None
+
+        for message in messages:
+            receipt_handle = message['ReceiptHandle']
+            task = json.loads(message['Body'])
+
+            # Eligibility from the message itself: the catch-all shard can
+            # hold tasks above the worker's level
+            required_cert = task.get('requiredCertification')
+            eligible = (
+                can_access_task(worker_level, task.get('requiredLevel') or WorkerLevel.NOVICE)
+                and not (required_cert and required_cert not in certifications)
+            )
+            if claimed or attempts_left <= 0 or not eligible:
+                _set_visibility(queue_url, receipt_handle, 0)
+                continue
+
+            attempts_left -= 1
+            task_lease = lease_seconds or lease_seconds_for(task.get('type'))
+            open_slots = int(task.get('openSlots') or 1)
+            assignment, current_task = try_lock_task(
+                task['taskId'],
+                worker_id,
+                task_lease,
+                extra_attributes={'readyQueueUrl': queue_url, 'readyReceiptHandle': receipt_handle},
+                open_slots=open_slots
+            )
+            if assignment:
+                claimed = (task, assignment)
+                if open_slots > 1:
+                    # Other workers can still take a slot: offer it again now
+                    _set_visibility(queue_url, receipt_handle, 0)
+                elif task_lease != (lease_seconds or ASSIGNMENT_TTL_SECONDS):
+                    extend_ready_message(queue_url, receipt_handle, assignment['expiresAt'])
+            else:
+                _settle_lost_message(queue_url, receipt_handle, current_task)
+
+        if claimed:
+            logger.info(f"Worker {worker_id} claimed task {claimed[0]['taskId']} from ready queue")
+            return claimed
+
+    return None
@@ -1,10 +1,18 @@
 """
 S3 utility functions for media operations.
-Generates presigned URLs for private bucket access.
+Generates presigned URLs for private bucket access, or CloudFront signed
+URLs/cookies with a deterministic expiry window when MEDIA_URL_MODE asks
+for CDN delivery.
 """
+import base64
+import json
+import time
 import boto3
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Tuple
 from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError
+from botocore.signers import CloudFrontSigner
 from .config import config
 from .logging import logger
 
@@ -15,6 +23,81 @@ s3_client = boto3.client(
     config=BotoConfig(signature_version='s3v4')
 )
 
+# Presign cache: (bucket, key, expiration) -> (url, expires_at).
+# Lives for the life of the Lambda container, so repeated feed loads reuse
+# the same signed URL until it gets close to expiring.
+PRESIGN_CACHE_MAX_ENTRIES = 4096
+_presign_cache: Dict[Tuple[str, str, int], Tuple[str, float]] = {}
+
+
+def _resolve_s3_key(s3_key: str, bucket: str) -> Optional[str]:
+    """
+    Normalize a key or bucket URL into a bare S3 key.
+    
+    Returns:
+        The S3 key, or None if it points outside our bucket
+    """
+    # If it's already a full URL (http/https), extract the key or return as-is
+    if s3_key.startswith('http://') or s3_key.startswith('https://'):
+        # Check if it's our bucket URL and extract key
+        bucket_url = f"https://{bucket}.s3.amazonaws.com/"
+        if s3_key.startswith(bucket_url):
+            return s3_key[len(bucket_url):]
+        # It's an external URL
+        return None
+    return s3_key
+
+
+def _safety_margin(expiration: int) -> int:
+    """Seconds before expiry at which a cached URL stops being handed out."""
+    return min(config.PRESIGN_SAFETY_MARGIN, expiration // 2)
+
+
+def _get_cached_url(cache_key: Tuple[str, str, int], now: float) -> Optional[str]:
+    """Return a cached URL that is still valid beyond the safety margin."""
+    entry = _presign_cache.get(cache_key)
+    if not entry:
+        return None
+    url, expires_at = entry
+    if now < expires_at - _safety_margin(cache_key[2]):
+        return url
+    del _presign_cache[cache_key]
+    return None
+
+
+def _store_cached_url(cache_key: Tuple[str, str, int], url: str, expires_at: float) -> None:
+    """Store a signed URL, evicting expired (then oldest) entries when full."""
+    if len(_presign_cache) >= PRESIGN_CACHE_MAX_ENTRIES:
+        now = time.time()
+        for key in [k for k, (_, exp) in _presign_cache.items() if exp <= now]:
+            del _presign_cache[key]
+        while len(_presign_cache) >= PRESIGN_CACHE_MAX_ENTRIES:
+            # Dicts keep insertion order, so the first key is the oldest
+            del _presign_cache[next(iter(_presign_cache))]
+    _presign_cache[cache_key] = (url, expires_at)
+
+
+def _sign_get_object(bucket: str, s3_key: str, expiration: int) -> str:
+    """Sign a GET for one object, reusing a cached URL when possible."""
+    cache_key = (bucket, s3_key, expiration)
+    now = time.time()
+    
+    cached = _get_cached_url(cache_key, now)
+    if cached:
+        return cached
+    
+    url = s3_client.generate_presigned_url(
+        'get_object',
+        Params={
+            'Bucket': bucket,
+            'Key': s3_key
+        },
+        ExpiresIn=expiration
+    )
+    _store_cached_url(cache_key, url, now + expiration)
+    logger.debug(f"Generated presigned URL for {s3_key}")
+    return url
+
 
 def generate_presigned_url(
     s3_key: str,
@@ -23,6 +106,7 @@ def generate_presigned_url(
 ) -> str:
     """
     Generate a presigned URL for S3 object download.
+    Signed URLs are cached per container and reused until shortly before expiry.
     
     Args:
         s3_key: The S3 object key (e.g., 'media/uuid.jpg')
@@ -40,27 +124,13 @@ def generate_presigned_url(
         logger.warning("No MEDIA_BUCKET configured, returning original key")
         return s3_key
     
-    # If it's already a full URL (http/https), extract the key or return as-is
-    if s3_key.startswith('http://') or s3_key.startswith('https://'):
-        # Check if it's our bucket URL and extract key
-        bucket_url = f"https://{bucket}.s3.amazonaws.com/"
-        if s3_key.startswith(bucket_url):
-            s3_key = s3_key[len(bucket_url):]
-        else:
-            # It's an external URL, return as-is
-            return s3_key
+    key = _resolve_s3_key(s3_key, bucket)
+    if key is None:
+        # It's an external URL, return as-is
+        return s3_key
     
     try:
-        url = s3_client.generate_presigned_url(
-            'get_object',
-            Params={
-                'Bucket': bucket,
-                'Key': s3_key
-            },
-            ExpiresIn=expiration
-        )
-        logger.info(f"Generated presigned URL for {s3_key}")
-        return url
+        return _sign_get_object(bucket, key, expiration)
         
     except ClientError as e:
         logger.error(f"Error generating presigned URL for {s3_key}: {e}")
@@ -70,6 +140,51 @@ def generate_presigned_url(
         return s3_key
 
 
+def generate_presigned_urls(
+    s3_keys: Iterable[str],
+    expiration: int = 3600,
+    bucket_name: str = None
+) -> Dict[str, str]:
+    """
+    Generate presigned URLs for a page of media keys in one pass.
+    Each distinct key is signed at most once; repeats and cached keys are free.
+    
+    Args:
+        s3_keys: S3 keys or bucket URLs (duplicates and empty values allowed)
+        expiration: URL expiration time in seconds (default 1 hour)
+        bucket_name: Optional bucket name, defaults to config.MEDIA_BUCKET
+        
+    Returns:
+        Dict mapping each input key to its presigned URL (or the input on failure)
+    """
+    distinct_keys = {k for k in s3_keys if k}
+    if not distinct_keys:
+        return {}
+    
+    bucket = bucket_name or config.MEDIA_BUCKET
+    if not bucket:
+        logger.warning("No MEDIA_BUCKET configured, returning original keys")
+        return {k: k for k in distinct_keys}
+    
+    urls = {}
+    failed = 0
+    for original in distinct_keys:
+        key = _resolve_s3_key(original, bucket)
+        if key is None:
+            urls[original] = original
+            continue
+        try:
+            urls[original] = _sign_get_object(bucket, key, expiration)
+        except Exception as e:
+            logger.debug(f"Error generating presigned URL for {key}: {e}")
+            urls[original] = original
+            failed += 1
+    
+    if failed:
+        logger.error(f"Failed to presign {failed}/{len(distinct_keys)} media keys")
+    return urls
+
+
 def is_media_key(url_or_key: str) -> bool:
     """
     Check if a URL or key points to media in our S3 bucket.
@@ -93,3 +208,194 @@ def is_media_key(url_or_key: str) -> bool:
         return True
     
     return False
+
+
+# =============================================================================
+# CloudFront (CDN) media URLs
+# =============================================================================
+
+MEDIA_MODE_PRESIGNED = 'presigned'
+MEDIA_MODE_CLOUDFRONT_URL = 'cloudfront-url'
+MEDIA_MODE_CLOUDFRONT_COOKIE = 'cloudfront-cookie'
+
+# Seconds before a failed private key load is attempted again
+SIGNER_RETRY_SECONDS = 60
+
+_cloudfront_signer = None
+_cloudfront_signer_failed_at = None
+
+
+def get_cloudfront_signer() -> Optional[CloudFrontSigner]:
+    """
+    Get or create the CloudFront signer.
+    
+    Requires the 'cryptography' package and a PEM private key stored in
+    Secrets Manager. Returns None if CDN signing is not configured, or if
+    loading the key failed within the last SIGNER_RETRY_SECONDS (so a
+    missing secret doesn't cost a Secrets Manager call per request).
+    """
+    global _cloudfront_signer, _cloudfront_signer_failed_at
+    if _cloudfront_signer is not None:
+        return _cloudfront_signer
+    if _cloudfront_signer_failed_at is not None and time.time() - _cloudfront_signer_failed_at < SIGNER_RETRY_SECONDS:
+        return None
+    
+    if not (config.MEDIA_CDN_DOMAIN and config.CLOUDFRONT_KEY_PAIR_ID and config.CLOUDFRONT_PRIVATE_KEY_SECRET):
+        return None
+    
+    try:
+        from cryptography.hazmat.primitives import hashes, serialization
+        from cryptography.hazmat.primitives.asymmetric import padding
+    except ImportError:
+        logger.warning("cryptography not installed, CloudFront signing disabled")
+        return None
+    
+    try:
+        secrets = boto3.client('secretsmanager', region_name=config.AWS_REGION)
+        pem = secrets.get_secret_value(SecretId=config.CLOUDFRONT_PRIVATE_KEY_SECRET)['SecretString']
+        private_key = serialization.load_pem_private_key(pem.encode('utf-8'), password=None)
+    except Exception as e:
+        logger.error(f"Could not load CloudFront private key: {e}")
+        _cloudfront_signer_failed_at = time.time()
+        return None
+    
+    def rsa_signer(message: bytes) -> bytes:
+        # CloudFront only accepts SHA1 RSA signatures
+        return private_key.sign(message, padding.PKCS1v15(), hashes.SHA1())
+    
+    _cloudfront_signer = CloudFrontSigner(config.CLOUDFRONT_KEY_PAIR_ID, rsa_signer)
+    _cloudfront_signer_failed_at = None
+    return _cloudfront_signer
+
+
+def media_window_expiry(window: int = None, now: float = None) -> int:
+    """
+    Deterministic expiry for CDN signatures.
+    
+    Everything signed in the same window gets the same expiry (the end of the
+    next window), so the signed URL for a given object is byte-identical for
+    every request in that window and stays valid for at least one full window.
+    """
+    window = window or config.MEDIA_URL_WINDOW
+    now = time.time() if now is None else now
+    return (int(now) // window + 2) * window
+
+
+def _cdn_url(s3_key: str) -> str:
+    """Unsigned CloudFront URL for an object in the media bucket."""
+    return f"https://{config.MEDIA_CDN_DOMAIN}/{s3_key.lstrip('/')}"
+
+
+def _cloudfront_b64(data: bytes) -> str:
+    """CloudFront's URL-safe base64 variant."""
+    return base64.b64encode(data).decode('utf-8').replace('+', '-').replace('=', '_').replace('/', '~')
+
+
+def generate_cdn_url(s3_key: str, window: int = None) -> Optional[str]:
+    """
+    Generate a CloudFront signed URL (canned policy) for a media object.
+    
+    Args:
+        s3_key: The S3 object key (e.g., 'media/uuid.jpg')
+        window: Expiry window in seconds, defaults to config.MEDIA_URL_WINDOW
+        
+    Returns:
+        Signed CDN URL, or None if CDN signing is not configured
+    """
+    signer = get_cloudfront_signer()
+    if not signer:
+        return None
+    
+    expires_at = media_window_expiry(window)
+    cache_key = (config.MEDIA_CDN_DOMAIN, s3_key, expires_at)
+    cached = _presign_cache.get(cache_key)
+    if cached:
+        return cached[0]
+    
+    url = signer.generate_presigned_url(
+        _cdn_url(s3_key),
+        date_less_than=datetime.fromtimestamp(expires_at, tz=timezone.utc)
+    )
+    _store_cached_url(cache_key, url, expires_at)
+    return url
+
+
+def generate_signed_cookies(path_prefix: str = 'media/*', window: int = None) -> Optional[Dict[str, str]]:
+    """
+    Generate CloudFront signed cookies scoped to a path prefix.
+    
+    One set of cookies grants access to every object under the prefix, so
+    media URLs can stay plain (and identical across page loads).
+    
+    Args:
+        path_prefix: Resource path under the CDN domain, wildcards allowed
+        window: Expiry window in seconds, defaults to config.MEDIA_URL_WINDOW
+        
+    Returns:
+        Dict of cookie name -> value (plus 'Expires' epoch), or None if not configured
+    """
+    signer = get_cloudfront_signer()
+    if not signer:
+        return None
+    
+    expires_at = media_window_expiry(window)
+    policy = json.dumps({
+        'Statement': [{
+            'Resource': _cdn_url(path_prefix),
+            'Condition': {'DateLessThan': {'AWS:EpochTime': expires_at}}
+        }]
+    }, separators=(',', ':'))
+    signature = signer.rsa_signer(policy.encode('utf-8'))
+    
+    return {
+        'CloudFront-Policy': _cloudfront_b64(policy.encode('utf-8')),
+        'CloudFront-Signature': _cloudfront_b64(signature),
+        'CloudFront-Key-Pair-Id': config.CLOUDFRONT_KEY_PAIR_ID,
+        'Expires': expires_at
+    }
+
+
+def signed_cookie_headers(cookies: Dict[str, str]) -> list:
+    """
+    Format signed cookies as Set-Cookie header values for API Gateway.
+
+    The cookies are set on MEDIA_COOKIE_DOMAIN, the parent domain shared by
+    the API and MEDIA_CDN_DOMAIN: browsers reject a cookie for a domain the
+    response didn't come from, so the CDN domain itself can't be used.
+    """
+    expires = datetime.fromtimestamp(cookies['Expires'], tz=timezone.utc)
+    expires_str = expires.strftime('%a, %d %b %Y %H:%M:%S GMT')
+    return [
+        f"{name}={value}; Domain={config.MEDIA_COOKIE_DOMAIN}; Path=/; Expires={expires_str}; Secure; HttpOnly; SameSite=None"
+        for name, value in cookies.items() if name != 'Expires'
+    ]
+
+
+def generate_media_urls(s3_keys: Iterable[str]) -> Dict[str, str]:
+    """
+    Generate media URLs for a page of keys using the configured MEDIA_URL_MODE.
+    
+    - presigned: individually signed S3 GET URLs (cached, see generate_presigned_urls)
+    - cloudfront-url: CloudFront signed URLs with a deterministic expiry window
+    - cloudfront-cookie: plain CloudFront URLs; access comes from signed cookies
+    
+    Falls back to presigned S3 URLs when CDN signing is not configured, and
+    cookie mode to signed CDN URLs when MEDIA_COOKIE_DOMAIN is not set.
+    """
+    mode = config.MEDIA_URL_MODE
+    if mode == MEDIA_MODE_CLOUDFRONT_COOKIE and not config.MEDIA_COOKIE_DOMAIN:
+        mode = MEDIA_MODE_CLOUDFRONT_URL
+    if mode == MEDIA_MODE_PRESIGNED or not get_cloudfront_signer():
+        return generate_presigned_urls(s3_keys)
+    
+    bucket = config.MEDIA_BUCKET
+    urls = {}
+    for original in {k for k in s3_keys if k}:
+        key = _resolve_s3_key(original, bucket)
+        if key is None:
+            urls[original] = original
+        elif mode == MEDIA_MODE_CLOUDFRONT_COOKIE:
+            urls[original] = _cdn_url(key)
+        else:
+            urls[original] = generate_cdn_url(key) or original
+    return urls
@@ -0,0 +1,232 @@
+"""
+Write-sharded task status index.
+
+StatusIndex keys every task on its plain `status`, so all Published tasks
+share one GSI partition. Tasks also carry `statusShard` = '<status>#shard<N>',
+where N is derived from the taskId, spreading each status over
+STATUS_SHARD_COUNT partitions of StatusShardIndex. Readers scatter one query
+per shard in parallel and merge the results by createdAt.
+
+Tasks written before sharding have no statusShard, so reads use the plain
+StatusIndex until STATUS_SHARD_READS is turned on (after the
+backfill_status_shards migration has run).
+"""
+import hashlib
+import heapq
+import boto3
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+from boto3.dynamodb.conditions import Key
+from .config import config
+from .logging import logger
+from .dynamo import transition_status, TransitionResult
+
+dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
+
+STATUS_INDEX = 'StatusIndex'
+STATUS_SHARD_INDEX = 'StatusShardIndex'
+STATUS_SHARD_ATTRIBUTE = 'statusShard'
+
+
+def shard_for_task(task_id: str, shard_count: int = None) -> int:
+    """Stable shard number for a task (same shard across every status change)."""
+    shard_count = shard_count or config.STATUS_SHARD_COUNT
+    digest = hashlib.md5(task_id.encode('utf-8')).hexdigest()
+    return int(digest[:8], 16) % shard_count
+
+
+def status_shard_key(status: str, task_id: str) -> str:
+    """GSI partition key for a task in a given status, e.g. 'Published#shard3'."""
+    return f"{status}#shard{shard_for_task(task_id)}"
+
+
+def status_fields(status: str, task_id: str) -> Dict[str, str]:
+    """Attributes to write whenever a task's status is set via PutItem."""
+    return {'status': status, STATUS_SHARD_ATTRIBUTE: status_shard_key(status, task_id)}
+
+
+def _partitions(status: str) -> List[str]:
+    """
+    Index partitions holding a status: its shards, or the single StatusIndex
+    partition until STATUS_SHARD_READS is on (tasks written before sharding
+    have no statusShard until backfill_status_shards has run).
+    """
+    if not config.STATUS_SHARD_READS:
+        return [status]
+    return [f"{status}#shard{n}" for n in range(config.STATUS_SHARD_COUNT)]
+
+
+def _partition_index(partition: str) -> Tuple[str, str]:
+    """(index name, key attribute) of a partition from _partitions."""
+    if '#shard' in partition:
+        return STATUS_SHARD_INDEX, STATUS_SHARD_ATTRIBUTE
+    return STATUS_INDEX, 'status'
+
+
+def _query_partition(
+    partition: str,
+    limit: Optional[int],
+    filter_expression: Optional[Any],
+    scan_forward: bool,
+    start_key: Optional[Dict[str, Any]] = None
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Read one partition, following pagination until `limit` items (or the end).
+
+    Returns:
+        tuple: (items, has_more)
+    """
+    index_name, attribute = _partition_index(partition)
+    table = dynamodb.Table(config.TASKS_TABLE)
+    params = {
+        'IndexName': index_name,
+        'KeyConditionExpression': Key(attribute).eq(partition),
+        'ScanIndexForward': scan_forward
+    }
+    if filter_expression is not None:
+        params['FilterExpression'] = filter_expression
+    if start_key:
+        params['ExclusiveStartKey'] = start_key
+
+    items = []
+    while True:
+        if limit:
+            params['Limit'] = limit - len(items)
+        response = table.query(**params)
+        items.extend(response.get('Items', []))
+
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return items, False
+        if limit and len(items) >= limit:
+            return items, True
+        params['ExclusiveStartKey'] = last_key
+
+
+def _query_shard(
+    status_shard: str,
+    limit: Optional[int],
+    filter_expression: Optional[Any],
+    scan_forward: bool
+) -> List[Dict[str, Any]]:
+    """Read one shard (or plain status partition) up to `limit` items."""
+    return _query_partition(status_shard, limit, filter_expression, scan_forward)[0]
+
+
+def _index_key(partition: str, item: Dict[str, Any]) -> Dict[str, Any]:
+    """ExclusiveStartKey for a partition's index positioned at `item`."""
+    _, attribute = _partition_index(partition)
+    return {'taskId': item['taskId'], attribute: partition, 'createdAt': item['createdAt']}
+
+
+def query_status(
+    status: str,
+    limit: Optional[int] = None,
+    filter_expression: Optional[Any] = None,
+    scan_forward: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Scatter-gather query of all tasks in a status, merged by createdAt.
+
+    Args:
+        status: TaskStatus value to read
+        limit: Max items to return (each shard reads at most this many)
+        filter_expression: Optional filter applied within each shard
+        scan_forward: True for oldest first, False for newest first
+
+    Returns:
+        Items across every shard, ordered by createdAt
+    """
+    partitions = _partitions(status)
+
+    with ThreadPoolExecutor(max_workers=min(len(partitions), 16)) as executor:
+        results = list(executor.map(
+            lambda key: _query_shard(key, limit, filter_expression, scan_forward),
+            partitions
+        ))
+
+    merged = heapq.merge(
+        *results,
+        key=lambda item: item.get('createdAt', ''),
+        reverse=not scan_forward
+    )
+    items = list(merged)
+    logger.debug(f"Read {len(items)} {status} tasks across {len(partitions)} partitions")
+    return items[:limit] if limit else items
+
+
+def query_status_page(
+    status: str,
+    limit: int,
+    positions: Optional[Dict[str, Any]] = None,
+    filter_expression: Optional[Any] = None,
+    scan_forward: bool = True
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    One page of the tasks in a status, merged by createdAt across shards.
+
+    Each shard reads at most `limit` items from its position; the returned
+    positions resume each shard after the last item it contributed to the
+    page. Shards missing from `positions` were exhausted on an earlier page
+    (None means a first page).
+
+    Returns:
+        tuple: (items, next_positions) - next_positions is empty on the last page
+    """
+    partitions = _partitions(status) if positions is None else list(positions)
+    positions = positions or {}
+    if not partitions:
+        return [], {}
+
+    with ThreadPoolExecutor(max_workers=min(len(partitions), 16)) as executor:
+        results = dict(zip(partitions, executor.map(
+            lambda key: _query_partition(key, limit, filter_expression, scan_forward, positions.get(key)),
+            partitions
+        )))
+
+    merged = heapq.merge(
+        *[[(key, item) for item in items] for key, (items, _) in results.items()],
+        key=lambda entry: entry[1].get('createdAt', ''),
+        reverse=not scan_forward
+    )
+    page = [entry for _, entry in zip(range(limit), merged)]
+
+    next_positions = {}
+    for key, (items, has_more) in results.items():
+        taken = [item for k, item in page if k == key]
+        if len(taken) < len(items):
+            next_positions[key] = _index_key(key, taken[-1]) if taken else positions.get(key)
+        elif has_more:
+            next_positions[key] = _index_key(key, items[-1])
+
+    return [item for _, item in page], next_positions
+
+
+def transition_tasks(
+    task_ids: List[str],
+    from_status: str,
+    to_status: str,
+    attributes: Optional[Dict[str, Any]] = None
+) -> TransitionResult:
+    """
+    Conditionally move tasks between statuses, keeping statusShard in step.
+
+    Args:
+        task_ids: Tasks to move
+        from_status: Status each task must currently have
+        to_status: New status
+        attributes: Extra attributes to SET on every task (e.g. publishedAt)
+
+    Returns:
+        TransitionResult (transitioned items carry all their attributes)
+    """
+    return transition_status(
+        config.TASKS_TABLE,
+        [{'taskId': task_id} for task_id in task_ids],
+        from_status,
+        to_status,
+        attributes=lambda key: {
+            **(attributes or {}),
+            STATUS_SHARD_ATTRIBUTE: status_shard_key(to_status, key['taskId'])
+        }
+    )
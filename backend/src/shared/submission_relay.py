@@ -0,0 +1,112 @@
+"""
+Submission outbox relay.
+
+The submission row written by submit_work is the outbox: each inserted
+Pending submission becomes a QC message on the FIFO validation queue. The
+queue deduplicates on submissionId, so a stream batch retried after a
+partial send can't enqueue the same submission twice, and messages are
+grouped by taskId so a task's submissions reach QC in order.
+
+The relay runs inside update_worker_stats, the Submissions stream's
+existing consumer, rather than as a reader of its own: a DynamoDB stream
+serves at most two readers per shard.
+"""
+import json
+import boto3
+from boto3.dynamodb.types import TypeDeserializer
+from .config import config
+from .logging import logger
+from .models import SubmissionStatus
+
+sqs = boto3.client('sqs', region_name=config.AWS_REGION)
+deserializer = TypeDeserializer()
+
+# SendMessageBatch limit
+SEND_BATCH_SIZE = 10
+
+
+def relay(records):
+    """
+    Enqueue the new Pending submissions among a batch of stream records.
+
+    Returns:
+        Sequence numbers of the records that could not be enqueued
+    """
+    pending = []
+    for record in records:
+        message = submission_message(record)
+        if message:
+            pending.append((record['dynamodb']['SequenceNumber'], message))
+
+    failed = []
+    for start in range(0, len(pending), SEND_BATCH_SIZE):
+        failed.extend(send_batch(pending[start:start + SEND_BATCH_SIZE]))
+
+    if failed:
+        logger.warning(f"{len(failed)} of {len(pending)} submissions not relayed to QC")
+    elif pending:
+        logger.info(f"Relayed {len(pending)} submissions to QC")
+    return failed
+
+
+def submission_message(record):
+    """
+    Build the QC message for an inserted Pending submission.
+
+    Returns:
+        Message dict, or None if the record is not a new Pending submission
+    """
+    if record.get('eventName') != 'INSERT':
+        return None
+
+    image = {k: deserializer.deserialize(v) for k, v in record['dynamodb']['NewImage'].items()}
+    if 'submissionId' not in image or image.get('status') != SubmissionStatus.PENDING:
+        return None
+
+    return {
+        'submissionId': image['submissionId'],
+        'taskId': image['taskId'],
+        'workerId': image.get('workerId', 'unknown'),
+        'assignmentId': image.get('assignmentId'),
+        'answer': decode_answer(image.get('answer', ''))
+    }
+
+
+def decode_answer(stored):
+    """submit_work stores structured answers as JSON; hand QC the original value."""
+    try:
+        parsed = json.loads(stored)
+    except (TypeError, ValueError):
+        return stored
+    return parsed if isinstance(parsed, (dict, list, str)) else stored
+
+
+def send_batch(batch):
+    """
+    Send up to SEND_BATCH_SIZE messages.
+
+    Returns:
+        Sequence numbers of the records that were not enqueued
+    """
+    entries = [
+        {
+            'Id': str(index),
+            'MessageBody': json.dumps(message),
+            'MessageGroupId': message['taskId'],
+            'MessageDeduplicationId': message['submissionId']
+        }
+        for index, (_, message) in enumerate(batch)
+    ]
+
+    try:
+        response = sqs.send_message_batch(QueueUrl=config.VALIDATION_QUEUE_URL, Entries=entries)
+    except Exception as e:
+        logger.error(f"Failed to relay {len(batch)} submissions: {e}")
+        return [sequence for sequence, _ in batch]
+
+    failed = []
+    for failure in response.get('Failed', []):
+        sequence, message = batch[int(failure['Id'])]
+        logger.error(f"Submission {message['submissionId']} not relayed: {failure.get('Message')}")
+        failed.append(sequence)
+    return failed
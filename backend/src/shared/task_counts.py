@@ -0,0 +1,113 @@
+"""
+Per-requester task status index and counters.
+
+Tasks carry `statusCreatedAt` = '<status>#<createdAt>', the sort key of
+RequesterStatusIndex, so one status of a requester's tasks is a single
+begins_with query, newest first. Each requester's Requesters item holds
+one counter per status ('count<status>', e.g. countPublished) for the
+dashboard totals.
+
+Both are kept up to date from the Tasks stream (track_task_status) rather
+than by every status change, since few of those know the task's requester
+or createdAt. A task also records the status it is counted under
+(`countedStatus`); moving it to the current status and adjusting the two
+counters happen in one transaction conditioned on both, so a stream record
+that is replayed, or overtaken by a later status change, changes nothing.
+"""
+from typing import Any, Dict, List
+import boto3
+from botocore.exceptions import ClientError
+from .config import config
+
+dynamodb = boto3.resource('dynamodb', region_name=config.AWS_REGION)
+
+REQUESTER_STATUS_INDEX = 'RequesterStatusIndex'
+STATUS_DATE_ATTRIBUTE = 'statusCreatedAt'
+COUNTED_STATUS_ATTRIBUTE = 'countedStatus'
+
+
+def status_date_key(status: str, created_at: str) -> str:
+    """RequesterStatusIndex sort key, e.g. 'Published#2025-01-01T00:00:00+00:00'."""
+    return f"{status}#{created_at}"
+
+
+def count_attribute(status: str) -> str:
+    """Requesters item attribute counting a status, e.g. 'countPublished'."""
+    return f"count{status}"
+
+
+def record_status(task: Dict[str, Any]) -> bool:
+    """
+    Index and count a task under its current status.
+
+    Args:
+        task: The task as last written (needs taskId, requesterId, status, createdAt)
+
+    Returns:
+        True if the task moved to a new status bucket; False if it was
+        already counted under its status or has changed since `task`
+    """
+    status = task.get('status')
+    counted = task.get(COUNTED_STATUS_ATTRIBUTE)
+    if not status or status == counted or not task.get('requesterId') or not task.get('createdAt'):
+        return False
+
+    values = {':status': status, ':key': status_date_key(status, task['createdAt']), ':one': 1}
+    if counted:
+        condition = '#status = :status AND countedStatus = :counted'
+        values[':counted'] = counted
+        counter_update = 'ADD #new_count :one, #old_count :minus_one'
+        counter_names = {'#new_count': count_attribute(status), '#old_count': count_attribute(counted)}
+        counter_values = {':one': 1, ':minus_one': -1}
+    else:
+        condition = '#status = :status AND attribute_not_exists(countedStatus)'
+        counter_update = 'ADD #new_count :one'
+        counter_names = {'#new_count': count_attribute(status)}
+        counter_values = {':one': 1}
+
+    try:
+        dynamodb.meta.client.transact_write_items(
+            TransactItems=[
+                {
+                    'Update': {
+                        'TableName': config.TASKS_TABLE,
+                        'Key': {'taskId': task['taskId']},
+                        'UpdateExpression': 'SET statusCreatedAt = :key, countedStatus = :status',
+                        'ConditionExpression': condition,
+                        'ExpressionAttributeNames': {'#status': 'status'},
+                        'ExpressionAttributeValues': values
+                    }
+                },
+                {
+                    'Update': {
+                        'TableName': config.REQUESTERS_TABLE,
+                        'Key': {'requesterId': task['requesterId']},
+                        'UpdateExpression': counter_update,
+                        'ExpressionAttributeNames': counter_names,
+                        'ExpressionAttributeValues': counter_values
+                    }
+                }
+            ]
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+        reasons = e.response.get('CancellationReasons') or []
+        if not reasons or reasons[0].get('Code') != 'ConditionalCheckFailed':
+            raise
+        return False
+
+
+def read_counts(requester_id: str, statuses: List[str]) -> Dict[str, int]:
+    """A requester's task count in each status."""
+    names = {f'#c{i}': count_attribute(status) for i, status in enumerate(statuses)}
+    if not names:
+        return {}
+    response = dynamodb.Table(config.REQUESTERS_TABLE).get_item(
+        Key={'requesterId': requester_id},
+        ProjectionExpression=', '.join(names),
+        ExpressionAttributeNames=names
+    )
+    item = response.get('Item') or {}
+    return {status: int(item.get(count_attribute(status), 0)) for status in statuses}
@@ -1,11 +1,14 @@
 """
 Common utility functions for Lambda handlers.
 """
+import base64
+import binascii
 import json
 import re
 from decimal import Decimal
 from difflib import SequenceMatcher
 from typing import Any, Dict
+from .config import config
 
 
 class DecimalEncoder(json.JSONEncoder):
@@ -52,6 +55,27 @@ def format_response(
     }
 
 
+def credentialed_cors_headers(event: dict) -> dict:
+    """
+    CORS headers for a response that sets cookies.
+
+    Browsers only store cookies from a credentialed response, which must
+    name the caller's origin instead of '*'. The request's Origin is echoed
+    if it is one of CORS_ALLOWED_ORIGINS; other callers get the wildcard
+    headers (and no cookies stored).
+    """
+    headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    origin = headers.get('origin')
+    allowed = {o.strip() for o in config.CORS_ALLOWED_ORIGINS.split(',') if o.strip()}
+    if origin and origin in allowed:
+        return {
+            'Access-Control-Allow-Origin': origin,
+            'Access-Control-Allow-Credentials': 'true',
+            'Vary': 'Origin'
+        }
+    return {'Access-Control-Allow-Origin': '*'}
+
+
 def parse_body(event: dict) -> dict:
     """
     Safely parse JSON body from API Gateway event.
@@ -88,6 +112,32 @@ def get_query_param(event: dict, param_name: str, default: str = None) -> str:
         return default
 
 
+def encode_cursor(positions: Dict[str, Any]) -> str:
+    """Opaque pagination cursor for a dict of query positions."""
+    return base64.urlsafe_b64encode(json.dumps(positions, cls=DecimalEncoder).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Any:
+    """
+    Inverse of encode_cursor.
+
+    Returns:
+        The positions dict, or None if no cursor was given
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if not cursor:
+        return None
+    try:
+        positions = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (binascii.Error, UnicodeError, json.JSONDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+    if not isinstance(positions, dict):
+        raise ValueError('Invalid cursor')
+    return positions
+
+
 def normalize_text(text: str) -> str:
     """
     Normalize text for comparison.
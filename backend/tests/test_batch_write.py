@@ -0,0 +1,90 @@
+"""
+Tests for the bulk write helpers in shared.dynamo.
+"""
+import pytest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+class TestBatchWriteItems:
+    """Tests for batch_write_items."""
+
+    def test_unprocessed_items_are_retried(self):
+        """Items returned as UnprocessedItems are resubmitted until written."""
+        from shared import dynamo
+
+        items = [{'taskId': str(i)} for i in range(30)]
+        calls = []
+
+        def batch_write_item(RequestItems):
+            requests = RequestItems['tasks']
+            calls.append(len(requests))
+            # First call for the 25-item chunk leaves 5 unprocessed
+            if len(requests) == 25:
+                return {'UnprocessedItems': {'tasks': requests[:5]}}
+            return {'UnprocessedItems': {}}
+
+        with patch.object(dynamo.client, 'batch_write_item', side_effect=batch_write_item), \
+                patch.object(dynamo.time, 'sleep'):
+            result = dynamo.batch_write_items('tasks', items, key_names=['taskId'])
+
+        assert result
+        assert result.written == 30
+        assert sorted(calls) == [5, 5, 25]
+
+    def test_duplicate_keys_and_failures_reported(self):
+        """Repeated keys are collapsed; items that never get written are listed."""
+        from shared import dynamo
+
+        items = [{'taskId': 'a', 'v': 1}, {'taskId': 'b'}, {'taskId': 'a', 'v': 2}]
+
+        def batch_write_item(RequestItems):
+            requests = RequestItems['tasks']
+            assert len(requests) == 2
+            return {'UnprocessedItems': {'tasks': [r for r in requests if r['PutRequest']['Item']['taskId'] == 'b']}}
+
+        with patch.object(dynamo.client, 'batch_write_item', side_effect=batch_write_item), \
+                patch.object(dynamo.time, 'sleep'):
+            result = dynamo.batch_write_items('tasks', items, key_names=['taskId'])
+
+        assert not result
+        assert result.duplicates == 1
+        assert result.written == 1
+        assert result.failed == [{'taskId': 'b'}]
+
+
+class TestTransitionStatus:
+    """Tests for conditional bulk status transitions."""
+
+    def test_only_matching_items_transition(self):
+        """Items not in the expected status are skipped, not overwritten."""
+        from botocore.exceptions import ClientError
+        from shared import dynamo
+
+        def update_item(Key, **kwargs):
+            if Key['taskId'] == 'already-published':
+                raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException', 'Message': ''}}, 'UpdateItem')
+            return {'Attributes': {'taskId': Key['taskId'], 'status': 'Published', 'type': 'x'}}
+
+        with patch.object(dynamo.client, 'update_item', side_effect=update_item) as update:
+            result = dynamo.transition_status(
+                'tasks',
+                [{'taskId': 't1'}, {'taskId': 'already-published'}],
+                'Created',
+                'Published',
+                attributes=lambda key: {'statusShard': f"Published#{key['taskId']}"}
+            )
+
+        assert [t['taskId'] for t in result.transitioned] == ['t1']
+        assert result.skipped == [{'taskId': 'already-published'}]
+        kwargs = update.call_args_list[0].kwargs
+        assert kwargs['TableName'] == 'tasks'
+        assert kwargs['ConditionExpression'] == '#status = :from_status'
+        assert 'statusShard' in kwargs['ExpressionAttributeNames'].values()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
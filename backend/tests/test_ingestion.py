@@ -0,0 +1,127 @@
+"""
+Tests for bulk task ingestion from S3 manifests.
+"""
+import io
+import pytest
+from decimal import Decimal
+from unittest.mock import patch
+from botocore.response import StreamingBody
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+def _object(data: bytes, offset: int = 0):
+    """Fake get_object response serving `data` from a byte offset."""
+    chunk = data[offset:]
+    return {'Body': StreamingBody(io.BytesIO(chunk), len(chunk))}
+
+
+class TestManifestReading:
+    """Tests for streaming manifest rows."""
+
+    def test_jsonl_rows_and_offsets(self):
+        """Each row carries its byte offset; invalid rows are reported, not fatal."""
+        from shared import ingestion
+
+        data = b'{"type": "sentiment-labeling", "payload": {"score": 0.5}}\nnot json\n{"type": "data-validation"}\n'
+
+        with patch.object(ingestion.s3, 'get_object', return_value=_object(data)):
+            rows = list(ingestion.iter_manifest('bucket', 'm.jsonl', ingestion.MANIFEST_FORMAT_JSONL))
+
+        assert [r[0] for r in rows] == [0, data.index(b'not'), data.index(b'{"type": "data')]
+        assert rows[0][1]['payload']['score'] == Decimal('0.5')
+        assert rows[1][1] is None
+        assert rows[-1][2] == len(data)
+
+    def test_resume_from_offset_uses_range(self):
+        """A continuation reads only the rest of the object."""
+        from shared import ingestion
+
+        data = b'{"type": "a"}\n{"type": "b"}\n'
+        offset = data.index(b'{"type": "b"}')
+
+        with patch.object(ingestion.s3, 'get_object', return_value=_object(data, offset)) as get_object:
+            rows = list(ingestion.iter_manifest('bucket', 'm.jsonl', 'jsonl', offset))
+
+        assert get_object.call_args.kwargs['Range'] == f'bytes={offset}-'
+        assert [(r[0], r[1]['type']) for r in rows] == [(offset, 'b')]
+
+    def test_csv_columns_map_to_task(self):
+        """Known columns become task fields, the rest go into the payload."""
+        from shared import ingestion
+
+        data = b'type,isGold,goldAnswer,imageUrl\nimage-classification,true,cat,s3://x/1.jpg\n'
+
+        with patch.object(ingestion.s3, 'get_object', side_effect=lambda **kw: _object(data, 0)):
+            fieldnames, start = ingestion.read_csv_header('bucket', 'm.csv')
+        with patch.object(ingestion.s3, 'get_object', return_value=_object(data, start)):
+            rows = list(ingestion.iter_manifest('bucket', 'm.csv', 'csv', start, fieldnames))
+
+        task = rows[0][1]
+        assert task['type'] == 'image-classification'
+        assert task['isGold'] is True
+        assert task['payload'] == {'imageUrl': 's3://x/1.jpg'}
+
+    def test_header_only_csv_completes_batch(self):
+        """A manifest with no rows after the header finishes instead of failing the range read."""
+        from botocore.exceptions import ClientError
+        from shared import ingestion
+        from handlers.tasks import ingest_manifest
+
+        data = b'type,payload\n'
+        invalid_range = ClientError({'Error': {'Code': 'InvalidRange', 'Message': 'not satisfiable'}}, 'GetObject')
+
+        def get_object(**params):
+            if 'Range' in params:
+                raise invalid_range
+            return _object(data)
+
+        job = {'batchId': 'b1', 'requesterId': 'r1', 'bucket': 'bucket', 'key': 'm.csv', 'format': 'csv', 'offset': 0}
+        with patch.object(ingestion.s3, 'get_object', side_effect=get_object), \
+                patch.object(ingest_manifest, 'get_batch', return_value={'status': 'Ingesting', 'manifestOffset': 0}), \
+                patch.object(ingest_manifest, 'write_tasks_parallel', return_value=[]), \
+                patch.object(ingest_manifest, 'queue_transcriptions', return_value=0), \
+                patch.object(ingest_manifest, 'record_progress', return_value=True) as record_progress:
+            ingest_manifest.ingest(job, None)
+
+        assert record_progress.call_args.kwargs['status'] == ingest_manifest.BatchStatus.CREATED
+        assert record_progress.call_args.args[1:3] == (len(data), len(data))
+
+    def test_row_task_ids_are_deterministic(self):
+        """Re-processing a row yields the same task ID (no duplicate tasks)."""
+        from shared.ingestion import row_task_id
+
+        batch_id = '6f1c1f1e-2d5b-4c84-9a47-1b1f7c1c0a11'
+        assert row_task_id(batch_id, 120) == row_task_id(batch_id, 120)
+        assert row_task_id(batch_id, 120) != row_task_id(batch_id, 121)
+
+    def test_manifest_must_be_under_requester_prefix(self):
+        """Another requester's manifest key is refused before anything is read."""
+        from handlers.tasks import create_task_batch
+
+        with patch.object(create_task_batch, 'create_batch_record') as create:
+            response = create_task_batch.start_manifest_batch({'manifestS3Key': 'manifests/other/m.jsonl'}, 'req-1')
+
+        assert response['statusCode'] == 403
+        create.assert_not_called()
+
+    def test_batch_readable_only_by_owner(self):
+        """A batch record is returned to its requester only; callers without an identity get 401."""
+        from handlers.tasks import get_batch
+
+        batch = {'batchId': 'b1', 'requesterId': 'req-1', 'manifestKey': 'manifests/req-1/m.jsonl'}
+
+        def event(sub=None):
+            claims = {'sub': sub} if sub else {}
+            return {'pathParameters': {'batchId': 'b1'}, 'requestContext': {'authorizer': {'claims': claims}}}
+
+        with patch.object(get_batch, 'get_batch', return_value=batch):
+            assert get_batch.handler(event('req-1'), None)['statusCode'] == 200
+            assert get_batch.handler(event('req-2'), None)['statusCode'] == 403
+            assert get_batch.handler(event(), None)['statusCode'] == 401
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,79 @@
+"""
+Tests for the notification outbox and its batched sender.
+"""
+import json
+import pytest
+from decimal import Decimal
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+def _record(message_id, intent):
+    """SQS record carrying a notification intent."""
+    return {'messageId': message_id, 'body': json.dumps(intent)}
+
+
+def _context(seconds_left=60):
+    context = MagicMock()
+    context.get_remaining_time_in_millis.return_value = seconds_left * 1000
+    return context
+
+
+class TestNotificationSender:
+    """Tests for coalescing, rendering and pacing notifications."""
+
+    def test_payments_coalesced_per_worker(self):
+        """A worker's payments in one batch become a single summary email."""
+        from shared.notifications import coalesce, render, notification, PAYMENT, WITHDRAWAL
+
+        intents = [
+            ('m1', notification(PAYMENT, 'w1', {'amount': '0.80', 'fee': '0.20', 'taskId': 't1'})),
+            ('m2', notification(PAYMENT, 'w1', {'amount': '1.60', 'fee': '0.40', 'taskId': 't2'})),
+            ('m3', notification(PAYMENT, 'w2', {'amount': '0.80', 'fee': '0.20', 'taskId': 't3'})),
+            ('m4', notification(WITHDRAWAL, 'w1', {'amount': '20'}, email='w1@example.com')),
+            ('m5', notification(WITHDRAWAL, 'w1', {'amount': '30'}, email='w1@example.com')),
+        ]
+        groups = coalesce(intents)
+
+        assert sorted(g[0] for g in groups) == [['m1', 'm2'], ['m3'], ['m4'], ['m5']]
+        w1_payments = next(g for g in groups if g[0] == ['m1', 'm2'])
+        _, text = render(w1_payments[1], w1_payments[3])
+        assert 'earned $2.40 across 2 tasks' in text
+        assert '$0.60' in text
+
+    def test_throttling_defers_rest_of_batch(self):
+        """Once SES throttles, the remaining messages go back to the queue."""
+        from botocore.exceptions import ClientError
+        from handlers.notifications import send_notifications
+        from shared.notifications import notification, WITHDRAWAL
+
+        throttled = ClientError({'Error': {'Code': 'Throttling', 'Message': 'rate'}}, 'SendEmail')
+        event = {'Records': [
+            _record(f'm{i}', notification(WITHDRAWAL, f'u{i}', {'amount': '10'}, email=f'u{i}@example.com'))
+            for i in range(3)
+        ]}
+
+        with patch.object(send_notifications.ses, 'send_email', side_effect=[{}, throttled]) as send, \
+                patch.object(send_notifications.send_bucket, 'acquire', return_value=True):
+            result = send_notifications.handler(event, _context())
+
+        assert send.call_count == 2
+        assert result == {'batchItemFailures': [{'itemIdentifier': 'm1'}, {'itemIdentifier': 'm2'}]}
+
+    def test_enqueue_never_raises(self):
+        """A queue outage is logged, not surfaced to the payment path."""
+        from shared import notifications
+
+        with patch.object(notifications.sqs, 'send_message_batch', side_effect=Exception('down')):
+            queued = notifications.enqueue_notifications(
+                [notifications.notification(notifications.PAYMENT, 'w1', {'amount': Decimal('0.80')})]
+            )
+
+        assert queued == 0
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
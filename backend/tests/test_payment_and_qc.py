@@ -55,6 +55,217 @@ class TestPaymentSplit:
             assert fee == expected_fee, f"For ${total}: expected fee ${expected_fee}, got ${fee}"
 
 
+class TestPricing:
+    """Tests for the shared task price and worker earnings from payments."""
+
+    def test_reward_read_from_payload(self):
+        """The price is payload.reward, with the old top-level field and a default as fallbacks."""
+        from shared.pricing import task_reward, DEFAULT_REWARD
+
+        assert task_reward({'payload': {'reward': Decimal('2.00')}, 'reward': 9}) == Decimal('2.00')
+        assert task_reward({'reward': '1.50'}) == Decimal('1.50')
+        assert task_reward({}) == DEFAULT_REWARD
+
+    def test_earnings_come_from_payment_rows(self):
+        """Worker earnings add the ledger amount actually paid; other rows are ignored."""
+        from handlers.workers import update_worker_stats
+
+        def insert(row_type, amount):
+            return {'eventName': 'INSERT', 'dynamodb': {'NewImage': {
+                'type': {'S': row_type}, 'to': {'S': 'w1'}, 'amount': {'N': amount}
+            }}}
+
+        with patch.object(update_worker_stats, 'add_earnings') as add_earnings:
+            assert update_worker_stats.process_record(insert('TASK_PAYMENT', '0.80'))
+            assert not update_worker_stats.process_record(insert('PLATFORM_FEE', '0.20'))
+
+        add_earnings.assert_called_once_with('w1', Decimal('0.80'))
+
+
+class TestBatchSettlement:
+    """Tests for netted settlement of a stream batch's approvals."""
+
+    @staticmethod
+    def _payment(submission_id, worker_id, total='1.00', requester_id='r1'):
+        from handlers.payments.process_payment import build_payment
+        return build_payment(submission_id, {'taskId': f't-{submission_id}', 'requesterId': requester_id,
+                                             'payload': {'reward': Decimal(total)}}, worker_id)
+
+    def test_balances_are_netted(self):
+        """One debit, one credit per worker and one fee credit, plus every ledger row."""
+        from handlers.payments.process_payment import settlement_items, PLATFORM_WALLET_ID
+
+        payments = [self._payment('s1', 'w1'), self._payment('s2', 'w1'), self._payment('s3', 'w2')]
+        items = settlement_items('r1', payments)
+
+        updates = [i['Update'] for i in items if 'Update' in i]
+        puts = [i['Put'] for i in items if 'Put' in i]
+        assert [u['Key']['walletId']['S'] for u in updates[:3]] == ['r1', 'w1', 'w2']
+        assert updates[3]['Key']['walletId']['S'].startswith(f'{PLATFORM_WALLET_ID}#shard')
+        assert updates[0]['ExpressionAttributeValues'][':amount']['N'] == '3.00'
+        assert updates[1]['ExpressionAttributeValues'][':amount']['N'] == '1.60'
+        assert updates[3]['ExpressionAttributeValues'][':amount']['N'] == '0.60'
+        assert len(puts) == 6
+
+    def test_chunks_fit_in_a_transaction(self):
+        """Large groups are split so no transaction exceeds 100 items."""
+        from handlers.payments.process_payment import settlement_chunks, settlement_items
+
+        payments = [self._payment(f's{i}', f'w{i}') for i in range(80)]
+        chunks = list(settlement_chunks(payments))
+
+        assert sum(len(c) for c in chunks) == 80
+        assert all(len(settlement_items('r1', c)) <= 100 for c in chunks)
+
+    def test_short_requester_falls_back_to_single_payments(self):
+        """If the netted debit fails the balance check, each payment is tried alone."""
+        from botocore.exceptions import ClientError
+        from handlers.payments import process_payment
+
+        short = ClientError(
+            {'Error': {'Code': 'TransactionCanceledException', 'Message': 'cancelled'},
+             'CancellationReasons': [{'Code': 'ConditionalCheckFailed'}]},
+            'TransactWriteItems'
+        )
+        client = MagicMock()
+        client.transact_write_items.side_effect = [short, {}, short]
+
+        payments = [self._payment('s1', 'w1'), self._payment('s2', 'w2')]
+        with patch.object(process_payment.boto3, 'client', return_value=client), \
+                patch.object(process_payment, 'notify_payments'), \
+                patch.object(process_payment, 'mark_payment_failed') as mark_failed:
+            paid = process_payment.settle_chunk('r1', payments)
+
+        assert paid == 1
+        mark_failed.assert_called_once_with('s2')
+
+    def test_other_single_payment_failures_propagate(self):
+        """A transient failure is re-raised after the rest are tried, so the batch is retried."""
+        from botocore.exceptions import ClientError
+        from handlers.payments import process_payment
+
+        short = ClientError(
+            {'Error': {'Code': 'TransactionCanceledException', 'Message': 'cancelled'},
+             'CancellationReasons': [{'Code': 'ConditionalCheckFailed'}]},
+            'TransactWriteItems'
+        )
+        throttled = ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'slow down'}}, 'TransactWriteItems')
+        client = MagicMock()
+        client.transact_write_items.side_effect = [short, throttled, {}]
+
+        payments = [self._payment('s1', 'w1'), self._payment('s2', 'w2')]
+        with patch.object(process_payment.boto3, 'client', return_value=client), \
+                patch.object(process_payment, 'notify_payments'), \
+                patch.object(process_payment, 'mark_payment_failed'):
+            with pytest.raises(ClientError):
+                process_payment.settle_chunk('r1', payments)
+
+        assert client.transact_write_items.call_count == 3
+
+    def test_ledger_ids_are_deterministic_and_conditional(self):
+        """Re-settling a submission writes the same ledger keys, guarded by attribute_not_exists."""
+        from handlers.payments.process_payment import settlement_items
+
+        first = [i['Put'] for i in settlement_items('r1', [self._payment('s1', 'w1')]) if 'Put' in i]
+        again = [i['Put'] for i in settlement_items('r1', [self._payment('s1', 'w1')]) if 'Put' in i]
+
+        assert [p['Item']['transactionId'] for p in first] == [p['Item']['transactionId'] for p in again]
+        assert all(p['ConditionExpression'] == 'attribute_not_exists(transactionId)' for p in first)
+
+    def test_paid_submissions_are_skipped(self):
+        """Approvals whose payment row exists (e.g. a retried batch) are not settled again."""
+        from handlers.payments import process_payment
+
+        task = {'taskId': 't1', 'requesterId': 'r1', 'payload': {'reward': Decimal('1.00')}}
+        paid_row = {'transactionId': process_payment.ledger_transaction_id('s1', 'TASK_PAYMENT')}
+
+        def batch_get(table_name, keys, projection=None):
+            return [task] if table_name == process_payment.config.TASKS_TABLE else [paid_row]
+
+        with patch.object(process_payment.config, 'TASKS_TABLE', 'Tasks'), \
+                patch.object(process_payment.config, 'TRANSACTIONS_TABLE', 'Transactions'), \
+                patch.object(process_payment, 'batch_get_items', side_effect=batch_get), \
+                patch.object(process_payment, 'settle_chunk', return_value=1) as settle:
+            paid = process_payment.settle_batch([('s1', 't1', 'w1'), ('s2', 't1', 'w2'), ('s2', 't1', 'w2')])
+
+        assert paid == 1
+        assert [p['submissionId'] for p in settle.call_args.args[1]] == ['s2']
+
+    def test_top_level_reward_is_read_for_settlement(self):
+        """Tasks priced by a top-level reward are settled at that price, not the default."""
+        from handlers.payments import process_payment
+
+        task = {'taskId': 't1', 'requesterId': 'r1', 'payload': {}, 'reward': Decimal('2.50')}
+
+        def batch_get(table_name, keys, projection=None):
+            if table_name != process_payment.config.TASKS_TABLE:
+                return []
+            return [{k: v for k, v in task.items() if k in projection}]
+
+        with patch.object(process_payment.config, 'TASKS_TABLE', 'Tasks'), \
+                patch.object(process_payment.config, 'TRANSACTIONS_TABLE', 'Transactions'), \
+                patch.object(process_payment, 'batch_get_items', side_effect=batch_get), \
+                patch.object(process_payment, 'settle_chunk', return_value=1) as settle:
+            process_payment.settle_batch([('s1', 't1', 'w1')])
+
+        assert settle.call_args.args[1][0]['total'] == Decimal('2.50')
+
+    def test_payment_raced_by_another_invocation_is_not_repaid(self):
+        """A ledger-row condition failure drops the payment instead of paying it twice."""
+        from botocore.exceptions import ClientError
+        from handlers.payments import process_payment
+
+        duplicate = ClientError(
+            {'Error': {'Code': 'TransactionCanceledException', 'Message': 'cancelled'},
+             'CancellationReasons': [{'Code': 'None'}, {'Code': 'None'}, {'Code': 'None'},
+                                     {'Code': 'ConditionalCheckFailed'}, {'Code': 'None'}]},
+            'TransactWriteItems'
+        )
+        client = MagicMock()
+        client.transact_write_items.side_effect = duplicate
+
+        with patch.object(process_payment.boto3, 'client', return_value=client), \
+                patch.object(process_payment, 'already_paid', return_value={'s1'}), \
+                patch.object(process_payment, 'notify_payments') as notify:
+            paid = process_payment.settle_chunk('r1', [self._payment('s1', 'w1')])
+
+        assert paid == 0
+        client.transact_write_items.assert_called_once()
+        notify.assert_not_called()
+
+
+class TestShardedCounter:
+    """Tests for the write-sharded platform wallet counter."""
+
+    def test_writes_spread_over_shards(self):
+        """Increments land on random shards, never on the unsharded item."""
+        from shared.counters import ShardedCounter
+
+        counter = ShardedCounter('Wallets', 'walletId', 'PLATFORM_WALLET', 4, attribute='balance')
+        keys = {counter.increment_item(Decimal('0.10'))['Update']['Key']['walletId']['S'] for _ in range(200)}
+
+        assert keys == {f'PLATFORM_WALLET#shard{n}' for n in range(4)}
+
+    def test_total_sums_shards_and_is_cached(self):
+        """A read sums every shard plus the legacy item, then serves from cache."""
+        from shared import counters
+
+        counter = counters.ShardedCounter('Wallets', 'walletId', 'PLATFORM_WALLET', 3, attribute='balance')
+        response = {'Responses': {'Wallets': [
+            {'balance': Decimal('5.00')}, {'balance': Decimal('0.20')}, {'balance': Decimal('0.40')}
+        ]}}
+
+        with patch.object(counters.dynamodb, 'batch_get_item', return_value=response) as batch_get:
+            assert counter.total() == Decimal('5.60')
+            assert counter.total() == Decimal('5.60')
+
+        batch_get.assert_called_once()
+        keys = batch_get.call_args.kwargs['RequestItems']['Wallets']['Keys']
+        assert [k['walletId'] for k in keys] == [
+            'PLATFORM_WALLET', 'PLATFORM_WALLET#shard0', 'PLATFORM_WALLET#shard1', 'PLATFORM_WALLET#shard2'
+        ]
+
+
 class TestFraudDetection:
     """Tests for fraud detection module."""
     
@@ -0,0 +1,136 @@
+"""
+Tests for S3 media URL helpers.
+"""
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+class TestPresignCache:
+    """Tests for presigned URL reuse in shared.s3_utils."""
+
+    def setup_method(self):
+        from shared import s3_utils
+        s3_utils._presign_cache.clear()
+
+    def test_cached_url_reused_within_window(self):
+        """Signing the same key twice only hits the signer once."""
+        from shared import s3_utils
+
+        with patch.object(s3_utils.s3_client, 'generate_presigned_url', return_value='https://signed/1') as signer:
+            first = s3_utils.generate_presigned_url('media/a.jpg', bucket_name='bucket')
+            second = s3_utils.generate_presigned_url('media/a.jpg', bucket_name='bucket')
+
+        assert first == second == 'https://signed/1'
+        assert signer.call_count == 1
+
+    def test_url_resigned_inside_safety_margin(self):
+        """A cached URL close to expiry is replaced with a fresh one."""
+        from shared import s3_utils
+
+        with patch.object(s3_utils.s3_client, 'generate_presigned_url', side_effect=['https://signed/1', 'https://signed/2']) as signer:
+            with patch('shared.s3_utils.time.time', return_value=1000.0):
+                s3_utils.generate_presigned_url('media/a.jpg', expiration=3600, bucket_name='bucket')
+            # 3600s expiry with a 300s margin: at +3400s the URL must be re-signed
+            with patch('shared.s3_utils.time.time', return_value=4400.0):
+                url = s3_utils.generate_presigned_url('media/a.jpg', expiration=3600, bucket_name='bucket')
+
+        assert url == 'https://signed/2'
+        assert signer.call_count == 2
+
+    def test_batch_signs_distinct_keys_once(self):
+        """Batch signing dedupes keys across a page of tasks."""
+        from shared import s3_utils
+
+        with patch.object(s3_utils.s3_client, 'generate_presigned_url', side_effect=lambda *a, **kw: f"https://signed/{kw['Params']['Key']}") as signer:
+            urls = s3_utils.generate_presigned_urls(
+                ['media/a.jpg', 'media/b.jpg', 'media/a.jpg', None],
+                bucket_name='bucket'
+            )
+
+        assert urls == {
+            'media/a.jpg': 'https://signed/media/a.jpg',
+            'media/b.jpg': 'https://signed/media/b.jpg',
+        }
+        assert signer.call_count == 2
+
+    def test_external_url_returned_as_is(self):
+        """URLs outside the media bucket are never signed."""
+        from shared import s3_utils
+
+        urls = s3_utils.generate_presigned_urls(['https://example.com/cat.jpg'], bucket_name='bucket')
+
+        assert urls == {'https://example.com/cat.jpg': 'https://example.com/cat.jpg'}
+
+
+class TestCdnMediaUrls:
+    """Tests for CloudFront media URL mode."""
+
+    def setup_method(self):
+        from shared import s3_utils
+        s3_utils._presign_cache.clear()
+
+    def test_window_expiry_is_deterministic(self):
+        """Requests within one window share an expiry at least a window away."""
+        from shared.s3_utils import media_window_expiry
+
+        first = media_window_expiry(window=3600, now=7200)
+        last = media_window_expiry(window=3600, now=10799)
+
+        assert first == last == 14400
+        assert last - 10799 >= 3600
+
+    def test_cdn_urls_stable_across_requests(self):
+        """The same key yields the same signed CDN URL within a window."""
+        from shared import s3_utils
+        from botocore.signers import CloudFrontSigner
+
+        signer = CloudFrontSigner('KEYID', lambda message: b'signature')
+        with patch('shared.s3_utils.get_cloudfront_signer', return_value=signer), \
+                patch('shared.s3_utils.config') as mock_config, \
+                patch('shared.s3_utils.time.time', return_value=7200.0):
+            mock_config.MEDIA_URL_MODE = 'cloudfront-url'
+            mock_config.MEDIA_CDN_DOMAIN = 'media.example.com'
+            mock_config.MEDIA_URL_WINDOW = 3600
+            mock_config.MEDIA_BUCKET = 'bucket'
+            first = s3_utils.generate_media_urls(['media/a.jpg'])
+            s3_utils._presign_cache.clear()
+            second = s3_utils.generate_media_urls(['media/a.jpg'])
+
+        assert first == second
+        assert first['media/a.jpg'].startswith('https://media.example.com/media/a.jpg?Expires=14400')
+
+    def test_falls_back_to_presigned_without_signer(self):
+        """Without CloudFront keys, media URLs are presigned S3 URLs."""
+        from shared import s3_utils
+
+        with patch('shared.s3_utils.get_cloudfront_signer', return_value=None), \
+                patch('shared.s3_utils.generate_presigned_urls', return_value={'media/a.jpg': 'https://s3/a'}) as presign:
+            urls = s3_utils.generate_media_urls(['media/a.jpg'])
+
+        presign.assert_called_once()
+        assert urls == {'media/a.jpg': 'https://s3/a'}
+
+    def test_cookies_set_on_shared_parent_domain(self):
+        """Cookies name the parent domain, and only allowed origins get credentialed CORS."""
+        from shared import s3_utils, utils
+
+        with patch('shared.s3_utils.config') as mock_config, patch('shared.utils.config') as utils_config:
+            mock_config.MEDIA_COOKIE_DOMAIN = '.example.com'
+            mock_config.MEDIA_CDN_DOMAIN = 'media.example.com'
+            utils_config.CORS_ALLOWED_ORIGINS = 'https://app.example.com'
+            headers = s3_utils.signed_cookie_headers({'CloudFront-Policy': 'p', 'Expires': 14400})
+            allowed = utils.credentialed_cors_headers({'headers': {'Origin': 'https://app.example.com'}})
+            other = utils.credentialed_cors_headers({'headers': {'origin': 'https://evil.test'}})
+
+        assert 'Domain=.example.com;' in headers[0]
+        assert allowed['Access-Control-Allow-Origin'] == 'https://app.example.com'
+        assert allowed['Access-Control-Allow-Credentials'] == 'true'
+        assert other == {'Access-Control-Allow-Origin': '*'}
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,114 @@
+"""
+Tests for relaying submissions from the Submissions stream to QC
+(through the stream's update_worker_stats consumer).
+"""
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+def _insert(sequence, submission_id, task_id='task-1', status='Pending', answer='"cat"'):
+    """Stream INSERT record for a submission."""
+    return {
+        'eventName': 'INSERT',
+        'dynamodb': {
+            'SequenceNumber': sequence,
+            'NewImage': {
+                'submissionId': {'S': submission_id},
+                'taskId': {'S': task_id},
+                'workerId': {'S': 'worker-1'},
+                'status': {'S': status},
+                'answer': {'S': answer},
+            }
+        }
+    }
+
+
+class TestSubmissionRelay:
+    """Tests for the stream-to-FIFO relay."""
+
+    def test_messages_deduplicated_by_submission(self):
+        """Each submission becomes one message, grouped by task."""
+        from handlers.workers import update_worker_stats
+        from shared import submission_relay
+
+        event = {'Records': [_insert('100', 'sub-1'), _insert('101', 'sub-2', task_id='task-2')]}
+
+        with patch.object(submission_relay.sqs, 'send_message_batch', return_value={'Successful': []}) as send:
+            result = update_worker_stats.handler(event, None)
+
+        entries = send.call_args.kwargs['Entries']
+        assert [(e['MessageDeduplicationId'], e['MessageGroupId']) for e in entries] == [
+            ('sub-1', 'task-1'), ('sub-2', 'task-2')
+        ]
+        assert result['batchItemFailures'] == []
+
+    def test_only_new_pending_submissions_relayed(self):
+        """Status updates and submissions not awaiting QC are ignored."""
+        from handlers.workers import update_worker_stats
+        from shared import submission_relay
+
+        modify = _insert('100', 'sub-1')
+        modify['eventName'] = 'MODIFY'
+        event = {'Records': [modify, _insert('101', 'sub-2', status='PENDING_QC')]}
+
+        with patch.object(submission_relay.sqs, 'send_message_batch') as send:
+            update_worker_stats.handler(event, None)
+
+        send.assert_not_called()
+
+    def test_partial_failure_retries_from_earliest(self):
+        """A failed entry makes the stream retry from that record."""
+        from handlers.workers import update_worker_stats
+        from shared import submission_relay
+
+        event = {'Records': [_insert(str(100 + i), f'sub-{i}') for i in range(12)]}
+        responses = [
+            {'Failed': [{'Id': '3', 'Message': 'throttled'}]},
+            {'Failed': [{'Id': '1', 'Message': 'throttled'}]},
+        ]
+
+        with patch.object(submission_relay.sqs, 'send_message_batch', side_effect=responses):
+            result = update_worker_stats.handler(event, None)
+
+        assert result['batchItemFailures'] == [{'itemIdentifier': '103'}]
+
+    def test_answers_decoded(self):
+        """JSON-encoded answers are handed to QC as their original value."""
+        from shared.submission_relay import decode_answer
+
+        assert decode_answer('"cat"') == 'cat'
+        assert decode_answer('{"x": 1}') == {'x': 1}
+        assert decode_answer('42') == '42'
+        assert decode_answer('plain text') == 'plain text'
+
+    def test_stats_wait_for_failed_relay(self):
+        """Status changes after an unrelayed submission are left for the retry."""
+        from handlers.workers import update_worker_stats
+        from shared import submission_relay
+
+        def _modify(sequence, worker_id):
+            return {
+                'eventName': 'MODIFY',
+                'dynamodb': {
+                    'SequenceNumber': sequence,
+                    'OldImage': {'status': {'S': 'Pending'}},
+                    'NewImage': {'status': {'S': 'Approved'}, 'workerId': {'S': worker_id}},
+                }
+            }
+
+        event = {'Records': [_modify('100', 'worker-a'), _insert('101', 'sub-1'), _modify('102', 'worker-b')]}
+
+        with patch.object(submission_relay.sqs, 'send_message_batch', side_effect=Exception('throttled')), \
+             patch.object(update_worker_stats, 'update_worker_stats') as update:
+            result = update_worker_stats.handler(event, None)
+
+        update.assert_called_once_with('worker-a', is_approved=True)
+        assert result['batchItemFailures'] == [{'itemIdentifier': '101'}]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
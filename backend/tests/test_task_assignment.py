@@ -0,0 +1,480 @@
+"""
+Tests for task matching and assignment.
+"""
+import json
+import pytest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+class TestTaskMatching:
+    """Tests for the "give me next task" matching engine."""
+
+    def test_level_and_certification_eligibility(self):
+        """Tasks above the worker's level or needing a missing certification are skipped."""
+        from shared.matching import is_eligible
+
+        assert is_eligible({'requiredLevel': 'Novice'}, 'Novice', set())
+        assert not is_eligible({'requiredLevel': 'Expert'}, 'Intermediate', set())
+        assert not is_eligible({'requiredCertification': 'audio-transcription'}, 'Expert', set())
+        assert is_eligible({'requiredCertification': 'audio-transcription'}, 'Novice', {'audio-transcription'})
+
+    def test_certified_task_types_ranked_first(self):
+        """Tasks matching the worker's certifications are tried before the rest."""
+        from shared.matching import rank_candidates
+
+        tasks = [
+            {'taskId': '1', 'type': 'data-validation'},
+            {'taskId': '2', 'type': 'audio-transcription'},
+            {'taskId': '3', 'type': 'image-classification'},
+        ]
+
+        ranked = rank_candidates(tasks, {'audio-transcription'})
+
+        assert ranked[0]['taskId'] == '2'
+        assert {t['taskId'] for t in ranked} == {'1', '2', '3'}
+
+    def test_lost_lock_retries_alternate(self):
+        """A lost race moves on to the next candidate instead of failing."""
+        from shared import matching
+
+        candidates = [{'taskId': 'a'}, {'taskId': 'b'}, {'taskId': 'c'}]
+        won = {'assignmentId': 'x', 'taskId': 'b'}
+
+        with patch.object(matching, 'get_worker_profile', return_value=('Novice', set())), \
+                patch.object(matching, 'find_candidate_tasks', return_value=candidates), \
+                patch.object(matching, 'rank_candidates', side_effect=lambda tasks, certs: tasks), \
+                patch.object(matching, 'lock_task', side_effect=[None, won]) as lock:
+            task, assignment = matching.claim_next_task('worker-1', max_attempts=3)
+
+        assert task['taskId'] == 'b'
+        assert assignment == won
+        assert lock.call_count == 2
+
+    def test_gives_up_after_max_attempts(self):
+        """Matching stops after max_attempts lost races."""
+        from shared import matching
+
+        candidates = [{'taskId': str(i)} for i in range(10)]
+
+        with patch.object(matching, 'get_worker_profile', return_value=('Novice', set())), \
+                patch.object(matching, 'find_candidate_tasks', return_value=candidates), \
+                patch.object(matching, 'lock_task', return_value=None) as lock:
+            result = matching.claim_next_task('worker-1', max_attempts=3)
+
+        assert result is None
+        assert lock.call_count == 3
+
+
+class TestReadyQueues:
+    """Tests for queue-backed dispatch shards."""
+
+    SHARDS = {
+        'Novice': 'q-novice',
+        'Expert': 'q-expert',
+        'Expert#audio-transcription': 'q-expert-audio',
+        '*': 'q-default',
+    }
+
+    def test_task_routed_to_most_specific_shard(self):
+        """Level#type beats level, which beats the catch-all shard."""
+        from shared.ready_queue import queue_for_task
+
+        assert queue_for_task({'requiredLevel': 'Expert', 'type': 'audio-transcription'}, self.SHARDS) == 'q-expert-audio'
+        assert queue_for_task({'requiredLevel': 'Expert', 'type': 'bounding-box'}, self.SHARDS) == 'q-expert'
+        assert queue_for_task({'requiredLevel': 'Intermediate'}, self.SHARDS) == 'q-default'
+
+    def test_worker_only_sees_accessible_shards(self):
+        """A Novice never receives from Expert shards; own level comes first."""
+        from shared.ready_queue import accessible_queues
+
+        assert accessible_queues('Novice', self.SHARDS) == ['q-novice', 'q-default']
+        expert_queues = accessible_queues('Expert', self.SHARDS)
+        assert set(expert_queues[:2]) == {'q-expert', 'q-expert-audio'}
+        assert expert_queues[-1] == 'q-default'
+
+    def test_lost_race_on_finished_task_deletes_message(self):
+        """A message for a task already in review is stale and removed."""
+        from shared import ready_queue
+
+        messages = [
+            {'ReceiptHandle': 'r1', 'Body': '{"taskId": "t1"}'},
+            {'ReceiptHandle': 'r2', 'Body': '{"taskId": "t2"}'},
+        ]
+        won = {'assignmentId': 'a2', 'taskId': 't2'}
+
+        with patch.object(ready_queue, 'accessible_queues', return_value=['q']), \
+                patch.object(ready_queue.sqs, 'receive_message', return_value={'Messages': messages}), \
+                patch.object(ready_queue.sqs, 'delete_message') as delete, \
+                patch.object(ready_queue, 'try_lock_task', side_effect=[(None, {'status': 'Review'}), (won, None)]):
+            task, assignment = ready_queue.claim_from_ready_queue('w1', 'Novice', set(), max_attempts=5)
+
+        assert task['taskId'] == 't2'
+        assert assignment == won
+        delete.assert_called_once_with(QueueUrl='q', ReceiptHandle='r1')
+
+
+    def test_ineligible_message_released_without_locking(self):
+        """A catch-all message above the worker's level is put back, not locked."""
+        from shared import ready_queue
+
+        messages = [
+            {'ReceiptHandle': 'r1', 'Body': '{"taskId": "t1", "requiredLevel": "Expert"}'},
+            {'ReceiptHandle': 'r2', 'Body': '{"taskId": "t2", "requiredLevel": "Novice"}'},
+        ]
+        won = {'assignmentId': 'a2', 'taskId': 't2'}
+
+        with patch.object(ready_queue, 'accessible_queues', return_value=['q']), \
+                patch.object(ready_queue.sqs, 'receive_message', return_value={'Messages': messages}), \
+                patch.object(ready_queue.sqs, 'change_message_visibility') as release, \
+                patch.object(ready_queue, 'try_lock_task', return_value=(won, None)) as lock:
+            task, _ = ready_queue.claim_from_ready_queue('w1', 'Novice', set(), max_attempts=5)
+
+        assert task['taskId'] == 't2'
+        lock.assert_called_once()
+        release.assert_called_once_with(QueueUrl='q', ReceiptHandle='r1', VisibilityTimeout=0)
+
+
+class TestStatusShards:
+    """Tests for the write-sharded status index."""
+
+    def test_shard_is_stable_across_statuses(self):
+        """A task keeps its shard number when its status changes."""
+        from shared.status_index import status_shard_key, shard_for_task
+
+        shard = shard_for_task('task-123', 8)
+        assert 0 <= shard < 8
+        with patch('shared.status_index.config') as mock_config:
+            mock_config.STATUS_SHARD_COUNT = 8
+            assert status_shard_key('Published', 'task-123') == f'Published#shard{shard}'
+            assert status_shard_key('Assigned', 'task-123') == f'Assigned#shard{shard}'
+
+    def test_scatter_gather_merges_by_created_at(self):
+        """Shard results are merged into one createdAt-ordered list."""
+        from shared import status_index
+
+        shard_items = {
+            'Published#shard0': [{'taskId': 'a', 'createdAt': '1'}, {'taskId': 'c', 'createdAt': '3'}],
+            'Published#shard1': [{'taskId': 'b', 'createdAt': '2'}, {'taskId': 'd', 'createdAt': '4'}],
+        }
+
+        with patch('shared.status_index.config') as mock_config, \
+                patch.object(status_index, '_query_shard', side_effect=lambda key, *args: shard_items[key]):
+            mock_config.STATUS_SHARD_COUNT = 2
+            items = status_index.query_status('Published', limit=3)
+
+        assert [i['taskId'] for i in items] == ['a', 'b', 'c']
+
+
+    def test_reads_plain_status_index_until_backfilled(self):
+        """Before STATUS_SHARD_READS, a status is one StatusIndex partition."""
+        from shared import status_index
+
+        with patch('shared.status_index.config') as mock_config:
+            mock_config.STATUS_SHARD_READS = False
+            mock_config.STATUS_SHARD_COUNT = 8
+            assert status_index._partitions('Published') == ['Published']
+            assert status_index._partition_index('Published') == ('StatusIndex', 'status')
+            mock_config.STATUS_SHARD_READS = True
+            assert len(status_index._partitions('Published')) == 8
+
+    def test_pages_resume_each_shard_after_its_last_item(self):
+        """A page takes the oldest items across shards; the cursor resumes each shard."""
+        from shared import status_index
+
+        shard_items = {
+            'Published#shard0': ([{'taskId': 'a', 'createdAt': '1'}, {'taskId': 'c', 'createdAt': '3'}], True),
+            'Published#shard1': ([{'taskId': 'b', 'createdAt': '2'}], False),
+        }
+
+        with patch('shared.status_index.config') as mock_config, \
+                patch.object(status_index, '_query_partition', side_effect=lambda key, *args: shard_items[key]):
+            mock_config.STATUS_SHARD_READS = True
+            mock_config.STATUS_SHARD_COUNT = 2
+            items, positions = status_index.query_status_page('Published', 2)
+
+        assert [i['taskId'] for i in items] == ['a', 'b']
+        assert positions == {
+            'Published#shard0': {'taskId': 'a', 'statusShard': 'Published#shard0', 'createdAt': '1'}
+        }
+
+class TestBatchClaims:
+    """Tests for multi-task leases."""
+
+    def test_partial_claim_drops_lost_tasks(self):
+        """Tasks failing their condition are dropped and the rest are claimed under one lease."""
+        from botocore.exceptions import ClientError
+        from shared import assignments
+
+        cancelled = ClientError(
+            {
+                'Error': {'Code': 'TransactionCanceledException', 'Message': 'cancelled'},
+                'CancellationReasons': [
+                    {'Code': 'None'},
+                    {'Code': 'ConditionalCheckFailed'},
+                    {'Code': 'None'},
+                    {'Code': 'None'},
+                ]
+            },
+            'TransactWriteItems'
+        )
+
+        with patch.object(assignments.dynamodb.meta.client, 'transact_write_items',
+                          side_effect=[cancelled, {}]) as transact:
+            lease, unavailable = assignments.claim_task_batch(['t1', 't2', 't3'], 'w1')
+
+        assert unavailable == ['t2']
+        assert lease['taskIds'] == ['t1', 't3']
+        assert lease['pendingTaskIds'] == {'t1', 't3'}
+        # Retry holds two task updates plus the lease record
+        assert len(transact.call_args_list[1].kwargs['TransactItems']) == 3
+
+    def test_claim_count_validated_and_clamped(self):
+        """A bad count is a 400; a large one is capped at MAX_BATCH_CLAIM."""
+        from handlers.tasks import assign_task
+        from shared.assignments import MAX_BATCH_CLAIM
+
+        def request(count):
+            return {
+                'requestContext': {'authorizer': {'claims': {'sub': 'w1'}}},
+                'body': json.dumps({'count': count})
+            }
+
+        assert assign_task.handler(request('lots'), None)['statusCode'] == 400
+        assert assign_task.handler(request(-2), None)['statusCode'] == 400
+        with patch.object(assign_task, 'claim_next_tasks', return_value=None) as claim:
+            assign_task.handler(request(10000), None)
+        claim.assert_called_once_with('w1', MAX_BATCH_CLAIM)
+
+
+class TestLeaseRenewal:
+    """Tests for per-type lease durations and heartbeats."""
+
+    def test_lease_duration_by_task_type(self):
+        """Audio transcription gets a longer lease than the default."""
+        from shared.assignments import lease_seconds_for, ASSIGNMENT_TTL_SECONDS
+
+        assert lease_seconds_for('audio-transcription') > ASSIGNMENT_TTL_SECONDS
+        assert lease_seconds_for('image-classification') == ASSIGNMENT_TTL_SECONDS
+        assert lease_seconds_for(None) == ASSIGNMENT_TTL_SECONDS
+
+    def test_refused_renewal_returns_current_assignment(self):
+        """An expired or exhausted lease is not extended and the caller sees why."""
+        from botocore.exceptions import ClientError
+        from shared import assignments
+
+        refused = ClientError(
+            {
+                'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'refused'},
+                'Item': {'assignmentId': {'S': 'a1'}, 'workerId': {'S': 'w1'}, 'status': {'S': 'Expired'}}
+            },
+            'UpdateItem'
+        )
+        table = MagicMock()
+        table.update_item.side_effect = refused
+
+        with patch.object(assignments.dynamodb, 'Table', return_value=table):
+            assignment, current = assignments.renew_assignment('a1', 'w1')
+
+        assert assignment is None
+        assert current['status'] == 'Expired'
+        kwargs = table.update_item.call_args.kwargs
+        assert 'expiresAt >= :now' in kwargs['ConditionExpression']
+
+
+class TestAssignmentExpiry:
+    """Tests for the expiry sweep giving slots back."""
+
+    def test_single_assignment_expired_with_its_task(self):
+        """The assignment and its task change in one transaction; a failed write leaves both for the next sweep."""
+        from botocore.exceptions import ClientError
+        from handlers.tasks import expire_assignments
+
+        client = MagicMock()
+        with patch.object(expire_assignments.boto3, 'client', return_value=client):
+            assert expire_assignments.expire_assignment({'assignmentId': 'a1', 'taskId': 't1', 'workerId': 'w1'}, 100) == 1
+
+        items = client.transact_write_items.call_args.kwargs['TransactItems']
+        assert [i['Update']['TableName'] for i in items] == [
+            expire_assignments.config.ASSIGNMENTS_TABLE, expire_assignments.config.TASKS_TABLE
+        ]
+        client.update_item.assert_not_called()
+
+        throttled = ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'slow down'}}, 'TransactWriteItems')
+        client.transact_write_items.side_effect = throttled
+        with patch.object(expire_assignments.boto3, 'client', return_value=client), pytest.raises(ClientError):
+            expire_assignments.expire_assignment({'assignmentId': 'a1', 'taskId': 't1', 'workerId': 'w1'}, 100)
+        client.update_item.assert_not_called()
+
+    def test_lease_expired_after_its_tasks_are_released(self):
+        """A lease stays Assigned (and is swept again) until every pending task is released."""
+        from botocore.exceptions import ClientError
+        from handlers.tasks import expire_assignments
+
+        client = MagicMock()
+        client.get_item.return_value = {'Item': {
+            'status': {'S': 'Assigned'}, 'expiresAt': {'N': '50'}, 'pendingTaskIds': {'SS': ['t1', 't2']}
+        }}
+        calls = []
+        client.transact_write_items.side_effect = lambda **kw: calls.append('release')
+        client.update_item.side_effect = lambda **kw: calls.append('expire')
+        lease = {'assignmentId': 'l1', 'type': 'Lease', 'workerId': 'w1'}
+
+        with patch.object(expire_assignments.boto3, 'client', return_value=client):
+            assert expire_assignments.expire_assignment(lease, 100) == 2
+        assert calls == ['release', 'expire']
+
+        calls.clear()
+        client.transact_write_items.side_effect = ClientError(
+            {'Error': {'Code': 'InternalServerError', 'Message': 'oops'}}, 'TransactWriteItems'
+        )
+        with patch.object(expire_assignments.boto3, 'client', return_value=client), pytest.raises(ClientError):
+            expire_assignments.expire_assignment(lease, 100)
+        assert calls == []
+
+
+class TestSubmitWork:
+    """Tests for validating submissions inside the submit transaction."""
+
+    @staticmethod
+    def _event(body):
+        import json
+        return {
+            'pathParameters': {'taskId': 't1'},
+            'requestContext': {'authorizer': {'claims': {'sub': 'w1'}}},
+            'body': json.dumps(body)
+        }
+
+    @staticmethod
+    def _cancelled(item=None):
+        from botocore.exceptions import ClientError
+        reason = {'Code': 'ConditionalCheckFailed'}
+        if item:
+            reason['Item'] = item
+        return ClientError(
+            {
+                'Error': {'Code': 'TransactionCanceledException', 'Message': 'cancelled'},
+                'CancellationReasons': [{'Code': 'None'}, reason, {'Code': 'None'}]
+            },
+            'TransactWriteItems'
+        )
+
+    def test_submit_is_one_call(self):
+        """No pre-read: the assignment checks ride on the transaction."""
+        from handlers.submissions import submit_work
+
+        with patch.object(submit_work.dynamodb.meta.client, 'transact_write_items', return_value={}) as transact:
+            response = submit_work.handler(self._event({'assignmentId': 'a1', 'answer': 'cat'}), None)
+
+        assert response['statusCode'] == 200
+        update = transact.call_args.kwargs['TransactItems'][1]['Update']
+        assert 'workerId = :worker_id' in update['ConditionExpression']
+        assert 'taskId = :task_id' in update['ConditionExpression']
+        assert 'expiresAt >= :now' in update['ConditionExpression']
+
+    def test_cancellation_reasons_mapped_to_responses(self):
+        """Missing, foreign and expired assignments get 404, 403 and 400."""
+        from handlers.submissions import submit_work
+
+        cases = [
+            (None, 404),
+            ({'assignmentId': {'S': 'a1'}, 'workerId': {'S': 'w2'}, 'taskId': {'S': 't1'}}, 403),
+            ({'assignmentId': {'S': 'a1'}, 'workerId': {'S': 'w1'}, 'taskId': {'S': 't1'},
+              'status': {'S': 'Assigned'}, 'expiresAt': {'N': '1'}}, 400),
+        ]
+        for item, status_code in cases:
+            with patch.object(submit_work.dynamodb.meta.client, 'transact_write_items',
+                              side_effect=self._cancelled(item)):
+                response = submit_work.handler(self._event({'assignmentId': 'a1', 'answer': 'cat'}), None)
+            assert response['statusCode'] == status_code
+
+    def test_lease_id_sent_as_assignment_id(self):
+        """A lease passed as assignmentId is retried against the lease."""
+        from handlers.submissions import submit_work
+
+        lease = {'assignmentId': {'S': 'l1'}, 'workerId': {'S': 'w1'}, 'type': {'S': 'Lease'}}
+        with patch.object(submit_work.dynamodb.meta.client, 'transact_write_items',
+                          side_effect=[self._cancelled(lease), {}]) as transact:
+            response = submit_work.handler(self._event({'assignmentId': 'l1', 'answer': 'cat'}), None)
+
+        assert response['statusCode'] == 200
+        retry = transact.call_args_list[1].kwargs['TransactItems'][1]['Update']
+        assert retry['UpdateExpression'] == 'DELETE pendingTaskIds :task_set'
+
+
+class TestRedundantTasks:
+    """Tests for tasks collecting several independent submissions."""
+
+    def test_stale_slot_guess_retried_with_last_slot(self):
+        """A claim expecting spare slots retries as the final claim when only one is left."""
+        from botocore.exceptions import ClientError
+        from shared import assignments
+
+        cancelled = ClientError(
+            {
+                'Error': {'Code': 'TransactionCanceledException', 'Message': 'cancelled'},
+                'CancellationReasons': [
+                    {'Code': 'ConditionalCheckFailed', 'Item': {
+                        'taskId': {'S': 't1'}, 'status': {'S': 'Published'},
+                        'openSlots': {'N': '1'}, 'workerIds': {'SS': ['w2', 'w3']}
+                    }},
+                    {'Code': 'None'}
+                ]
+            },
+            'TransactWriteItems'
+        )
+
+        with patch.object(assignments.dynamodb.meta.client, 'transact_write_items',
+                          side_effect=[cancelled, {}]) as transact:
+            assignment, _ = assignments.try_lock_task('t1', 'w1', open_slots=3)
+
+        assert assignment is not None
+        first, retry = [c.kwargs['TransactItems'][0]['Update'] for c in transact.call_args_list]
+        assert 'openSlots > :one' in first['ConditionExpression']
+        assert first['ExpressionAttributeValues'][':published_status'] == 'Published'
+        assert ':assigned_status' in retry['ExpressionAttributeValues']
+
+    def test_worker_cannot_take_two_slots(self):
+        """A task the worker already holds is reported as unavailable."""
+        from shared.assignments import slot_available
+
+        task = {'status': 'Published', 'openSlots': 2, 'workerIds': {'w1'}}
+        assert slot_available(task, 'w1') is None
+        assert slot_available(task, 'w2') is False
+        assert slot_available({'status': 'Published'}, 'w2') is True
+        assert slot_available({'status': 'Assigned', 'openSlots': 0}, 'w2') is None
+
+    def test_new_tasks_need_quorum_unless_gold(self):
+        """Consensus tasks open one slot per required vote; gold tasks need one."""
+        from shared.ingestion import build_task_item
+        from shared.config import config
+
+        regular = build_task_item({'type': 'sentiment-labeling'}, 'r1', 'b1', 't1', '0')
+        gold = build_task_item({'type': 'sentiment-labeling', 'goldAnswer': 'yes'}, 'r1', 'b1', 't2', '0')
+
+        assert regular['requiredSubmissions'] == regular['openSlots'] == config.CONSENSUS_QUORUM
+        assert gold['openSlots'] == 1
+
+    def test_required_submissions_must_be_positive_integer(self):
+        """Malformed or non-positive redundancy is refused rather than opening no slots."""
+        from shared.ingestion import build_task_item
+
+        assert build_task_item({'requiredSubmissions': '5'}, 'r1', 'b1', 't1', '0')['openSlots'] == 5
+        for value in (0, -2, 'three', '2.5', True):
+            with pytest.raises(ValueError):
+                build_task_item({'requiredSubmissions': value}, 'r1', 'b1', 't1', '0')
+
+    def test_legacy_task_slot_counter_starts_at_one(self):
+        """Claiming a task without openSlots leaves it at 0, not -1."""
+        from shared.assignments import task_slot_update
+
+        update = task_slot_update('t1', 'w1', 0, last_slot=True)['Update']
+        assert 'openSlots = if_not_exists(openSlots, :one) - :one' in update['UpdateExpression']
+        assert 'ADD openSlots' not in update['UpdateExpression']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
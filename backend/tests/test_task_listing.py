@@ -0,0 +1,132 @@
+"""
+Tests for the requester task dashboard listing.
+"""
+import pytest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+def _task(task_id, status, created_at):
+    return {'taskId': task_id, 'requesterId': 'r1', 'status': status, 'createdAt': created_at}
+
+
+class FakeTable:
+    """
+    Serves RequesterIdIndex queries (filtered by status) and
+    RequesterStatusIndex queries (begins_with '<status>#') from a fixed list.
+    """
+
+    def __init__(self, tasks):
+        self.tasks = sorted(tasks, key=lambda t: t['createdAt'], reverse=True)
+
+    def query(self, **params):
+        if 'FilterExpression' in params:
+            status = params['FilterExpression'].get_expression()['values'][1]
+        else:
+            prefix = params['KeyConditionExpression'].get_expression()['values'][1].get_expression()['values'][1]
+            status = prefix.rstrip('#')
+        rows = [t for t in self.tasks if t['status'] == status]
+        start = params.get('ExclusiveStartKey')
+        if start:
+            ids = [t['taskId'] for t in rows]
+            rows = rows[ids.index(start['taskId']) + 1:]
+        page = rows[:params['Limit']]
+        response = {'Items': page}
+        if len(rows) > len(page):
+            response['LastEvaluatedKey'] = {'taskId': page[-1]['taskId']}
+        return response
+
+
+class TestRequesterListing:
+    """Tests for multi-status pages and cursors."""
+
+    def test_pages_merge_statuses_without_gaps(self):
+        """Walking the cursor returns every task once, newest first."""
+        from handlers.tasks import list_tasks
+
+        tasks = [
+            _task('p1', 'Published', '005'), _task('p2', 'Published', '003'), _task('p3', 'Published', '001'),
+            _task('r1', 'Review', '004'), _task('r2', 'Review', '002'),
+        ]
+        table = FakeTable(tasks)
+
+        for status_reads in (False, True):
+            seen = []
+            positions = {}
+            statuses = ['Published', 'Review']
+            with patch.object(list_tasks, 'client', table), \
+                 patch.object(list_tasks.config, 'REQUESTER_STATUS_READS', status_reads):
+                while True:
+                    page, positions = list_tasks.list_requester_tasks('r1', statuses, 2, positions)
+                    seen.extend(t['taskId'] for t in page)
+                    if not positions:
+                        break
+                    statuses = list(positions)
+
+            assert seen == ['p1', 'r1', 'p2', 'r2', 'p3']
+
+    def test_cursor_round_trip_and_rejection(self):
+        """Cursors are opaque but reversible; garbage is rejected."""
+        from handlers.tasks.list_tasks import encode_cursor, decode_cursor
+
+        positions = {'Published': {'taskId': 't1', 'requesterId': 'r1', 'createdAt': '1'}, 'Review': None}
+        assert decode_cursor(encode_cursor(positions)) == positions
+        assert decode_cursor(None) is None
+        with pytest.raises(ValueError):
+            decode_cursor('not-a-cursor!')
+
+    def test_first_page_includes_counts(self):
+        """Counts come from the requester's status counters, on the first page."""
+        from handlers.tasks import list_tasks
+        from shared import task_counts
+
+        client = MagicMock()
+        client.query.return_value = {'Items': []}
+        requesters = MagicMock()
+        requesters.get_item.return_value = {'Item': {'requesterId': 'r1', 'countPublished': 7}}
+
+        with patch.object(list_tasks, 'client', client), \
+             patch.object(list_tasks.config, 'REQUESTER_STATUS_READS', True), \
+             patch.object(task_counts.dynamodb, 'Table', return_value=requesters):
+            response = list_tasks.handler({'queryStringParameters': {'status': 'Published,Review'}}, None)
+
+        import json
+        body = json.loads(response['body'])
+        assert response['statusCode'] == 200
+        assert body['counts'] == {'Published': 7, 'Review': 0}
+        assert body['nextCursor'] is None
+        client.query.assert_called()
+        assert all('Select' not in c.kwargs for c in client.query.call_args_list)
+
+    def test_status_change_moves_task_between_counters(self):
+        """A task is counted once per status; replays and stale records change nothing."""
+        from botocore.exceptions import ClientError
+        from shared import task_counts
+
+        task = {'taskId': 't1', 'requesterId': 'r1', 'status': 'Review', 'createdAt': '001',
+                'countedStatus': 'Published'}
+
+        with patch.object(task_counts.dynamodb.meta.client, 'transact_write_items') as transact:
+            assert task_counts.record_status(task) is True
+            assert task_counts.record_status({**task, 'countedStatus': 'Review'}) is False
+
+        task_update, counter_update = [i['Update'] for i in transact.call_args.kwargs['TransactItems']]
+        assert task_update['ExpressionAttributeValues'][':key'] == 'Review#001'
+        assert task_update['ExpressionAttributeValues'][':counted'] == 'Published'
+        assert counter_update['ExpressionAttributeNames'] == {'#new_count': 'countReview', '#old_count': 'countPublished'}
+        assert transact.call_count == 1
+
+        stale = ClientError(
+            {'Error': {'Code': 'TransactionCanceledException', 'Message': 'cancelled'},
+             'CancellationReasons': [{'Code': 'ConditionalCheckFailed'}, {'Code': 'None'}]},
+            'TransactWriteItems'
+        )
+        with patch.object(task_counts.dynamodb.meta.client, 'transact_write_items', side_effect=stale):
+            assert task_counts.record_status(task) is False
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,125 @@
+"""
+Tests for rate-limited Transcribe job dispatch.
+"""
+import json
+import pytest
+from unittest.mock import patch, MagicMock
+from botocore.exceptions import ClientError
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+class FakeClock:
+    """Manually advanced clock; sleeping advances it."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestTokenBucket:
+    """Tests for the token bucket."""
+
+    def test_burst_then_paced(self):
+        """Capacity allows a burst; after that tokens arrive at `rate`."""
+        from shared.rate_limit import TokenBucket
+
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=3, clock=clock, sleep=clock.sleep)
+
+        assert all(bucket.try_acquire() for _ in range(3))
+        assert not bucket.try_acquire()
+
+        assert bucket.acquire()
+        assert clock.now == pytest.approx(0.5)
+
+    def test_acquire_gives_up_past_timeout(self):
+        """acquire() doesn't wait longer than its timeout."""
+        from shared.rate_limit import TokenBucket
+
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1, capacity=1, clock=clock, sleep=clock.sleep)
+        bucket.try_acquire()
+
+        assert not bucket.acquire(timeout=0.5)
+        assert clock.now == 0.0
+
+
+class TestDispatchTranscriptions:
+    """Tests for the transcription dispatcher."""
+
+    def test_throttling_defers_rest_of_batch(self):
+        """Once Transcribe throttles, remaining messages are requeued without calling it."""
+        from handlers.tasks import dispatch_transcriptions as dispatcher
+
+        throttled = ClientError({'Error': {'Code': 'LimitExceededException', 'Message': 'quota'}}, 'StartTranscriptionJob')
+        records = [
+            {'messageId': f'm{i}', 'receiptHandle': f'r{i}', 'attributes': {'ApproximateReceiveCount': '1'},
+             'body': json.dumps({'taskId': f't{i}', 'bucket': 'b', 'key': f'a{i}.mp3'})}
+            for i in range(3)
+        ]
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = 30000
+
+        with patch.object(dispatcher, 'start_transcription_job', side_effect=throttled) as start, \
+                patch.object(dispatcher, 'start_bucket', MagicMock()), \
+                patch.object(dispatcher, 'set_transcription_status') as set_status, \
+                patch.object(dispatcher, 'requeue') as requeue, \
+                patch.object(dispatcher.time, 'sleep'):
+            result = dispatcher.handler({'Records': records}, context)
+
+        assert [f['itemIdentifier'] for f in result['batchItemFailures']] == ['m0', 'm1', 'm2']
+        # Only the first message reached Transcribe (with its in-invocation retries)
+        assert {c.kwargs['key'] for c in start.call_args_list} == {'a0.mp3'}
+        assert requeue.call_count == 3
+        set_status.assert_called_once_with('t0', 'THROTTLED')
+
+    def test_malformed_request_dropped_alone(self):
+        """A malformed message is dropped; the rest of the batch is dispatched and not redelivered."""
+        from handlers.tasks import dispatch_transcriptions as dispatcher
+
+        records = [
+            {'messageId': 'bad', 'receiptHandle': 'r0', 'body': 'not json'},
+            {'messageId': 'ok', 'receiptHandle': 'r1', 'attributes': {'ApproximateReceiveCount': '1'},
+             'body': json.dumps({'taskId': 't1', 'bucket': 'b', 'key': 'a1.mp3'})}
+        ]
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = 30000
+
+        with patch.object(dispatcher, 'dispatch') as dispatch, \
+                patch.object(dispatcher, 'start_bucket', MagicMock()):
+            result = dispatcher.handler({'Records': records}, context)
+
+        assert result == {'batchItemFailures': []}
+        dispatch.assert_called_once_with({'taskId': 't1', 'bucket': 'b', 'key': 'a1.mp3'})
+
+    def test_stuck_queued_tasks_are_resent_once(self):
+        """Tasks QUEUED past the cutoff are claimed and resent; ones claimed elsewhere are not."""
+        from handlers.tasks import requeue_transcriptions as requeue
+
+        stale = [
+            {'taskId': 't1', 'transcriptionQueuedAt': '100'},
+            {'taskId': 't2', 'transcriptionQueuedAt': '100'},
+        ]
+        conflict = ClientError({'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'x'}}, 'UpdateItem')
+        table = MagicMock()
+        table.update_item.side_effect = [{}, conflict]
+
+        with patch.object(requeue, 'read_stale_tasks', return_value=stale), \
+                patch.object(requeue.dynamodb, 'Table', return_value=table), \
+                patch.object(requeue, 'queue_transcriptions', return_value=1) as send:
+            result = requeue.handler({}, None)
+
+        send.assert_called_once_with([stale[0]])
+        assert result == {'stale': 2, 'requeued': 1}
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
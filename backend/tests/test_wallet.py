@@ -0,0 +1,384 @@
+"""
+Tests for wallet reads and writes.
+"""
+import json
+import pytest
+from decimal import Decimal
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+class TestWalletBalance:
+    """Tests for versioned wallet writes and the cached balance read."""
+
+    def test_withdrawal_debits_relatively_and_retries_conflicts(self):
+        """The debit commutes with credits; only conflicts are retried, insufficient funds are not."""
+        from botocore.exceptions import ClientError
+        from handlers.wallet import withdraw_funds
+
+        def cancelled(code):
+            return ClientError(
+                {'Error': {'Code': 'TransactionCanceledException', 'Message': 'cancelled'},
+                 'CancellationReasons': [{'Code': code}, {'Code': 'None'}]},
+                'TransactWriteItems'
+            )
+
+        table = MagicMock()
+        client = MagicMock()
+        client.transact_write_items.side_effect = [cancelled('TransactionConflict'), {}]
+
+        with patch.object(withdraw_funds.dynamodb, 'Table', return_value=table), \
+                patch.object(withdraw_funds.boto3, 'client', return_value=client), \
+                patch.object(withdraw_funds.time, 'sleep'):
+            assert withdraw_funds.withdraw('u1', Decimal('20'), 'u1@example.com', 'txn-1') is True
+
+        # No read-back after the write
+        table.get_item.assert_not_called()
+        update = client.transact_write_items.call_args.kwargs['TransactItems'][0]['Update']
+        assert update['ConditionExpression'] == 'balance >= :amount'
+        assert 'balance - :amount' in update['UpdateExpression'] and 'ADD version :one' in update['UpdateExpression']
+
+        client.transact_write_items.side_effect = [cancelled('ConditionalCheckFailed')]
+        with patch.object(withdraw_funds.dynamodb, 'Table', return_value=table), \
+                patch.object(withdraw_funds.boto3, 'client', return_value=client):
+            assert withdraw_funds.withdraw('u1', Decimal('500'), 'u1@example.com', 'txn-2') is False
+
+    def test_cached_balance_respects_min_version(self):
+        """A cached balance is reused until the client asks for a newer version."""
+        from handlers.wallet import get_wallet
+
+        table = MagicMock()
+        table.get_item.side_effect = [
+            {'Item': {'balance': Decimal('10'), 'version': Decimal('1')}},
+            {'Item': {'balance': Decimal('25'), 'version': Decimal('2')}},
+        ]
+        get_wallet._wallet_cache.clear()
+
+        with patch.object(get_wallet.dynamodb, 'Table', return_value=table):
+            assert get_wallet.read_wallet('u1')['balance'] == Decimal('10')
+            assert get_wallet.read_wallet('u1', min_version=1)['balance'] == Decimal('10')
+            assert get_wallet.read_wallet('u1', min_version=2)['balance'] == Decimal('25')
+
+        assert table.get_item.call_count == 2
+        assert table.get_item.call_args.kwargs['ConsistentRead'] is True
+
+
+class TestDeposit:
+    """Tests for single-transaction, idempotent deposits."""
+
+    @staticmethod
+    def _event(amount, key=None):
+        return {
+            'requestContext': {'authorizer': {'claims': {'sub': 'u1'}}},
+            'body': json.dumps({'amount': amount}),
+            'headers': {'Idempotency-Key': key} if key else {}
+        }
+
+    def test_retry_with_same_key_is_not_credited_twice(self):
+        """The replayed request hits the ledger row's condition and reports the original deposit."""
+        from botocore.exceptions import ClientError
+        from handlers.wallet import deposit_funds
+
+        exists = ClientError(
+            {'Error': {'Code': 'TransactionCanceledException', 'Message': 'cancelled'},
+             'CancellationReasons': [{'Code': 'None'}, {'Code': 'ConditionalCheckFailed'}]},
+            'TransactWriteItems'
+        )
+        client = MagicMock()
+        client.transact_write_items.side_effect = [{}, exists, exists]
+
+        with patch.object(deposit_funds.boto3, 'client', return_value=client), \
+                patch.object(deposit_funds, 'deposit_record', return_value={'amount': Decimal('25')}):
+            first = deposit_funds.handler(self._event(25, key='k-1'), None)
+            retry = deposit_funds.handler(self._event(25, key='k-1'), None)
+            mismatch = deposit_funds.handler(self._event(30, key='k-1'), None)
+
+        assert first['statusCode'] == 200 and retry['statusCode'] == 200
+        assert json.loads(first['body'])['transactionId'] == json.loads(retry['body'])['transactionId']
+        assert json.loads(retry['body'])['replayed'] is True
+        assert mismatch['statusCode'] == 409
+
+        items = client.transact_write_items.call_args_list[0].kwargs['TransactItems']
+        assert items[1]['Put']['ConditionExpression'] == 'attribute_not_exists(transactionId)'
+
+    def test_credit_commutes_with_concurrent_settlement(self):
+        """A settlement bumping the version mid-request doesn't fail the deposit: the credit is one relative write."""
+        from handlers.wallet import deposit_funds
+
+        wallet = {'balance': Decimal('10'), 'version': 4}
+
+        def transact(TransactItems):
+            # A batch settlement credits the wallet between the request and its write
+            wallet['balance'] += Decimal('5')
+            wallet['version'] += 1
+            update = TransactItems[0]['Update']
+            assert 'ConditionExpression' not in update
+            wallet['balance'] += Decimal(update['ExpressionAttributeValues'][':amount']['N'])
+            wallet['version'] += int(update['ExpressionAttributeValues'][':one']['N'])
+            return {}
+
+        client = MagicMock()
+        client.transact_write_items.side_effect = transact
+        table = MagicMock()
+
+        with patch.object(deposit_funds.boto3, 'client', return_value=client), \
+                patch.object(deposit_funds.dynamodb, 'Table', return_value=table):
+            result = deposit_funds.handler(self._event(25, key='k-2'), None)
+
+        assert result['statusCode'] == 200
+        assert 'newBalance' not in json.loads(result['body'])
+        assert wallet == {'balance': Decimal('40'), 'version': 6}
+        client.transact_write_items.assert_called_once()
+        table.get_item.assert_not_called()
+
+    def test_keys_are_scoped_per_user(self):
+        """Two users choosing the same key get different ledger rows."""
+        from handlers.wallet.deposit_funds import deposit_transaction_id
+
+        assert deposit_transaction_id('u1', 'k') == deposit_transaction_id('u1', 'k')
+        assert deposit_transaction_id('u1', 'k') != deposit_transaction_id('u2', 'k')
+
+
+class TestTransactionHistory:
+    """Tests for the per-user ledger history."""
+
+    def test_pages_merge_both_sides_newest_first(self):
+        """Paid and received rows interleave by createdAt; the cursor resumes each side."""
+        from handlers.wallet import list_transactions
+
+        rows = {
+            'FromUserIndex': [{'transactionId': f'o{t}', 'fromUserId': 'u1', 'createdAt': str(t)} for t in (90, 70, 50)],
+            'ToUserIndex': [{'transactionId': f'i{t}', 'toUserId': 'u1', 'createdAt': str(t)} for t in (80, 60)],
+        }
+
+        def query(**params):
+            items = rows[params['IndexName']]
+            start = params.get('ExclusiveStartKey')
+            if start:
+                items = items[[i['transactionId'] for i in items].index(start['transactionId']) + 1:]
+            page = items[:params['Limit']]
+            more = len(items) > len(page)
+            return {'Items': page, **({'LastEvaluatedKey': page[-1]} if more else {})}
+
+        table = MagicMock()
+        table.query.side_effect = query
+        with patch.object(list_transactions.dynamodb, 'Table', return_value=table):
+            first, positions = list_transactions.list_user_transactions('u1', ['out', 'in'], 3, {})
+            rest, final = list_transactions.list_user_transactions('u1', list(positions), 3, positions)
+
+        assert [t['transactionId'] for t in first] == ['o90', 'i80', 'o70']
+        assert [t['direction'] for t in first] == ['out', 'in', 'out']
+        assert [t['transactionId'] for t in rest] == ['i60', 'o50']
+        assert final == {}
+
+    def test_date_range_in_key_condition(self):
+        """since/until bound the index sort key rather than filtering after the read."""
+        from handlers.wallet import list_transactions
+
+        table = MagicMock()
+        table.query.return_value = {'Items': []}
+        with patch.object(list_transactions.dynamodb, 'Table', return_value=table):
+            list_transactions.list_user_transactions('u1', ['out'], 10, {}, since='100', until='200')
+
+        condition = table.query.call_args.kwargs['KeyConditionExpression']
+        assert condition.get_expression()['values'][1].expression_operator == 'BETWEEN'
+
+
+class TestLedgerReconciliation:
+    """Tests for daily ledger snapshots and the balance audit."""
+
+    def test_ledger_row_moves_amount_between_parties(self):
+        """A payment debits the payer's day and credits the payee's, each once."""
+        from botocore.exceptions import ClientError
+        from handlers.wallet import snapshot_ledger
+
+        record = {'eventName': 'INSERT', 'dynamodb': {'SequenceNumber': '1', 'NewImage': {
+            'transactionId': {'S': 'txn-1'}, 'amount': {'N': '0.80'},
+            'fromUserId': {'S': 'r1'}, 'toUserId': {'S': 'w1'}, 'createdAt': {'S': '1700000000'}
+        }}}
+        already = ClientError(
+            {'Error': {'Code': 'TransactionCanceledException', 'Message': 'cancelled'},
+             'CancellationReasons': [{'Code': 'ConditionalCheckFailed'}, {'Code': 'None'}]},
+            'TransactWriteItems'
+        )
+
+        with patch.object(snapshot_ledger.dynamodb.meta.client, 'transact_write_items',
+                          side_effect=[{}, already]) as transact:
+            applied = snapshot_ledger.apply_record(record)
+
+        assert applied == 1
+        calls = [c.kwargs['TransactItems'] for c in transact.call_args_list]
+        markers = [items[0]['Put']['Item'] for items in calls]
+        updates = [items[1]['Update'] for items in calls]
+        assert [(m['userId'], m['period']) for m in markers] == [('r1', 'APPLIED#txn-1'), ('w1', 'APPLIED#txn-1')]
+        assert all('expiresAt' in m for m in markers)
+        assert [u['Key'] for u in updates] == [
+            {'userId': 'r1', 'period': 'DAY#2023-11-14'}, {'userId': 'w1', 'period': 'DAY#2023-11-14'}
+        ]
+        assert updates[0]['ExpressionAttributeValues'][':amount'] == Decimal('-0.80')
+        assert updates[0]['ExpressionAttributeValues'][':debit'] == Decimal('0.80')
+
+    def test_balance_checked_against_snapshot_sum(self):
+        """Drift is the balance minus the opening balance and every day's net."""
+        from handlers.wallet import reconcile_wallets
+
+        snapshots = {'OPENING': Decimal('10'), 'DAY#2026-10-17': Decimal('5.50'), 'DAY#2026-10-18': Decimal('-2')}
+        with patch.object(reconcile_wallets, 'read_snapshots', return_value=snapshots):
+            assert reconcile_wallets.check_wallet('u1', Decimal('13.50'))['drift'] == 0
+            assert reconcile_wallets.check_wallet('u1', Decimal('14.00'))['drift'] == Decimal('0.50')
+
+    def test_first_check_records_opening_balance(self):
+        """History from before snapshots becomes the OPENING item once the re-check agrees."""
+        from handlers.wallet import reconcile_wallets
+
+        with patch.object(reconcile_wallets, 'read_snapshots', return_value={'DAY#2026-10-18': Decimal('3')}), \
+                patch.object(reconcile_wallets, 'record_opening', return_value=True) as record_opening:
+            first = reconcile_wallets.check_wallet('u1', Decimal('20'), open_with=Decimal('0'))
+            lagging = reconcile_wallets.check_wallet('u1', Decimal('20'), open_with=Decimal('15'))
+            record_opening.assert_not_called()
+            settled = reconcile_wallets.check_wallet('u1', Decimal('20'), open_with=first['drift'])
+
+        assert first['unopened'] and first['drift'] == Decimal('17')
+        assert lagging['unopened']
+        record_opening.assert_called_once_with('u1', Decimal('17'))
+        assert settled['drift'] == 0 and not settled['unopened']
+
+    def test_lagging_snapshots_are_not_flagged_or_opened(self):
+        """An unexplained amount that changes between checks waits for the next run."""
+        from handlers.wallet import reconcile_wallets
+
+        snapshots = iter([{'DAY#2026-10-18': Decimal('3')}, {'DAY#2026-10-18': Decimal('5')}])
+        with patch.object(reconcile_wallets, 'read_wallets', return_value={'u1': Decimal('20')}), \
+                patch.object(reconcile_wallets, 'read_snapshots', side_effect=lambda _: next(snapshots)), \
+                patch.object(reconcile_wallets, 'record_opening') as record_opening, \
+                patch.object(reconcile_wallets, 'flag_drift') as flag_drift, \
+                patch.object(reconcile_wallets.time, 'sleep'):
+            result = reconcile_wallets.handler({}, None)
+
+        assert result == {'checked': 1, 'drifted': []}
+        record_opening.assert_not_called()
+        flag_drift.assert_not_called()
+
+
+class TestPayouts:
+    """Tests for the withdrawal payout batcher."""
+
+    def test_batch_id_is_stable_and_mock_is_idempotent(self):
+        """Resending a batch under its ID returns the first result without paying again."""
+        from shared.payouts import MockPayPalPayouts, payout_batch_id, ITEM_SUCCESS
+
+        assert payout_batch_id(['b', 'a']) == payout_batch_id(['a', 'b'])
+        assert payout_batch_id(['a']) != payout_batch_id(['a', 'b'])
+
+        provider = MockPayPalPayouts()
+        items = [{'transactionId': 't1', 'amount': '10', 'receiver': 'w@example.com'}]
+        assert provider.create_batch_payout('batch-1', items) == {'t1': ITEM_SUCCESS}
+        provider.create_batch_payout('batch-1', items + [{'transactionId': 't2', 'amount': '5'}])
+        assert provider.batches == {'batch-1': {'t1': ITEM_SUCCESS}}
+
+    def test_pending_withdrawals_paid_in_batches(self):
+        """Pending withdrawals are claimed and completed in bulk, BATCH_SIZE per payout."""
+        from handlers.wallet import process_payouts
+        from shared.config import config
+        from shared.dynamo import TransitionResult
+
+        pending = [{'transactionId': f't{i}', 'amount': Decimal('10'), 'paypalEmail': 'w@example.com'} for i in range(5)]
+        transitions = []
+
+        def transition(table, keys, from_status, to_status, attributes=None):
+            transitions.append((from_status, to_status, [k['transactionId'] for k in keys]))
+            result = TransitionResult()
+            result.transitioned = [p for p in pending if {'transactionId': p['transactionId']} in keys]
+            return result
+
+        provider = MagicMock()
+        provider.create_batch_payout.side_effect = lambda batch_id, items: {i['transactionId']: 'SUCCESS' for i in items}
+        with patch.object(config, 'PAYOUT_BATCH_SIZE', 2), \
+                patch.object(process_payouts, 'read_withdrawals', side_effect=[[], pending]), \
+                patch.object(process_payouts, 'transition_status', side_effect=transition), \
+                patch.object(process_payouts, 'payouts', provider):
+            result = process_payouts.handler({}, None)
+
+        assert result == {'batches': 3, 'paid': 5, 'failed': 0}
+        assert provider.create_batch_payout.call_count == 3
+        assert transitions[0] == ('PENDING', 'PROCESSING', ['t0', 't1'])
+        assert transitions[1] == ('PROCESSING', 'COMPLETED', ['t0', 't1'])
+
+    def test_failed_payout_is_reversed_and_unsent_batch_kept(self):
+        """A failed item is credited back; a batch the provider didn't answer is left for the next run."""
+        from handlers.wallet import process_payouts
+        from shared.dynamo import TransitionResult
+
+        withdrawals = [
+            {'transactionId': 'ok', 'amount': Decimal('10'), 'fromUserId': 'u1'},
+            {'transactionId': 'bad', 'amount': Decimal('20'), 'fromUserId': 'u2'}
+        ]
+        provider = MagicMock()
+        provider.create_batch_payout.return_value = {'ok': 'SUCCESS', 'bad': 'FAILED'}
+        with patch.object(process_payouts, 'payouts', provider), \
+                patch.object(process_payouts, 'transition_status', return_value=TransitionResult()) as transition, \
+                patch.object(process_payouts, 'reverse_withdrawal') as reverse:
+            assert process_payouts.send_batch('batch-1', withdrawals) == (1, 1)
+            reverse.assert_called_once_with(withdrawals[1], 'FAILED')
+            assert [k['transactionId'] for k in transition.call_args[0][1]] == ['ok']
+
+            provider.create_batch_payout.side_effect = Exception('timeout')
+            transition.reset_mock()
+            assert process_payouts.send_batch('batch-1', withdrawals) == (0, 0)
+            transition.assert_not_called()
+
+    def test_unsettled_payouts_stay_processing(self):
+        """Only an explicit FAILED is reversed; pending, unclaimed or missing items wait for a resend."""
+        from handlers.wallet import process_payouts
+        from shared.dynamo import TransitionResult
+
+        withdrawals = [
+            {'transactionId': t, 'amount': Decimal('10'), 'fromUserId': 'u1'}
+            for t in ('ok', 'pending', 'unclaimed', 'missing')
+        ]
+        provider = MagicMock()
+        provider.create_batch_payout.return_value = {'ok': 'SUCCESS', 'pending': 'PENDING', 'unclaimed': 'UNCLAIMED'}
+        with patch.object(process_payouts, 'payouts', provider), \
+                patch.object(process_payouts, 'transition_status', return_value=TransitionResult()) as transition, \
+                patch.object(process_payouts, 'reverse_withdrawal') as reverse:
+            assert process_payouts.send_batch('batch-1', withdrawals) == (1, 0)
+
+        reverse.assert_not_called()
+        assert [k['transactionId'] for k in transition.call_args[0][1]] == ['ok']
+
+    def test_reversal_notifies_worker(self):
+        """A reversed payout queues a failure notice; one already settled elsewhere doesn't."""
+        from botocore.exceptions import ClientError
+        from handlers.wallet import process_payouts
+        from shared.notifications import WITHDRAWAL_FAILED, render
+
+        withdrawal = {'transactionId': 'bad', 'amount': Decimal('20'), 'fromUserId': 'u2', 'paypalEmail': 'u2@example.com'}
+        client = MagicMock()
+        with patch.object(process_payouts.boto3, 'client', return_value=client), \
+                patch.object(process_payouts, 'enqueue_notifications') as enqueue:
+            process_payouts.reverse_withdrawal(withdrawal, 'FAILED')
+
+            client.transact_write_items.side_effect = ClientError(
+                {'Error': {'Code': 'TransactionCanceledException', 'Message': 'cancelled'}}, 'TransactWriteItems'
+            )
+            process_payouts.reverse_withdrawal(withdrawal, 'FAILED')
+
+        enqueue.assert_called_once()
+        [intent] = enqueue.call_args[0][0]
+        assert (intent['kind'], intent['userId'], intent['email']) == (WITHDRAWAL_FAILED, 'u2', 'u2@example.com')
+        subject, text = render(intent['kind'], [intent['data']])
+        assert 'returned to your wallet' in text
+
+    def test_payouts_client_is_abstract(self):
+        """A provider must implement create_batch_payout."""
+        from shared.payouts import PayoutsClient
+
+        with pytest.raises(TypeError):
+            PayoutsClient()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
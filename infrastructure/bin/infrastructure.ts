@@ -46,7 +46,16 @@ const pythonLambdaStack = new PythonLambdaStack(app, 'PythonLambdaStack', {
   transactionsTable: databaseStack.transactionsTable,
   assignmentsTable: databaseStack.assignmentsTable,
   workersTable: databaseStack.workersTable,
+  requestersTable: databaseStack.requestersTable,
+  batchesTable: databaseStack.batchesTable,
+  ledgerSnapshotsTable: databaseStack.ledgerSnapshotsTable,
   submissionQueue: workflowStack.submissionQueue,
+  validationQueue: workflowStack.validationQueue,
+  ingestionQueue: workflowStack.ingestionQueue,
+  transcriptionQueue: workflowStack.transcriptionQueue,
+  notificationQueue: workflowStack.notificationQueue,
+  deadLetterQueue: workflowStack.deadLetterQueue,
+  readyQueues: workflowStack.readyQueues,
   disputeStateMachine: workflowStack.disputeStateMachine,
   mediaBucket: storageStack.mediaBucket,
 });
@@ -26,6 +26,7 @@ interface ApiStackProps extends cdk.StackProps {
     depositFundsLambda?: lambda.Function;
     withdrawFundsLambda?: lambda.Function;
     getWalletLambda?: lambda.Function;
+    listTransactionsLambda?: lambda.Function;
     startDisputeLambda?: lambda.Function;
     adminReviewLambda?: lambda.Function;
 }
@@ -42,6 +43,7 @@ export class ApiStack extends cdk.Stack {
             defaultCorsPreflightOptions: {
                 allowOrigins: apigateway.Cors.ALL_ORIGINS,
                 allowMethods: apigateway.Cors.ALL_METHODS,
+                allowHeaders: [...apigateway.Cors.DEFAULT_HEADERS, 'Idempotency-Key'],  // Deposits
             },
         });
 
@@ -328,7 +330,7 @@ export class ApiStack extends cdk.Stack {
 
 
         // ============ Wallet Endpoints (if lambdas provided) ============
-        if (props.depositFundsLambda || props.withdrawFundsLambda || props.getWalletLambda) {
+        if (props.depositFundsLambda || props.withdrawFundsLambda || props.getWalletLambda || props.listTransactionsLambda) {
             const wallet = this.api.root.addResource('wallet');
 
             if (props.getWalletLambda) {
@@ -353,6 +355,14 @@ export class ApiStack extends cdk.Stack {
                     authorizer: platformAuthorizer,
                 });
             }
+
+            if (props.listTransactionsLambda) {
+                const transactions = wallet.addResource('transactions');
+                // GET /wallet/transactions - Paginated wallet history (?since=&until=&type=)
+                transactions.addMethod('GET', new apigateway.LambdaIntegration(props.listTransactionsLambda), {
+                    authorizer: platformAuthorizer,
+                });
+            }
         }
 
         // ============ Dispute Endpoints ============
@@ -11,15 +11,27 @@ export class DatabaseStack extends cdk.Stack {
     public readonly assignmentsTable: dynamodb.Table;
     public readonly workersTable: dynamodb.Table;
     public readonly requestersTable: dynamodb.Table;
+    public readonly batchesTable: dynamodb.Table;
+    public readonly ledgerSnapshotsTable: dynamodb.Table;
 
     constructor(scope: Construct, id: string, props?: cdk.StackProps) {
         super(scope, id, props);
 
+        // DynamoDB creates (or deletes) at most one GSI per table per update,
+        // so indexes added to existing tables are rolled out in stages: the
+        // n-th new index of each table is added at gsiStage n. An existing
+        // deployment is upgraded with `cdk deploy -c gsiStage=1`, then 2, ...
+        // up to GSI_STAGES (each run after the previous indexes are ACTIVE);
+        // a new deployment creates every index at once.
+        const GSI_STAGES = 3;
+        const gsiStage = Number(this.node.tryGetContext('gsiStage') ?? GSI_STAGES);
+
         // Tasks Table
         this.tasksTable = new dynamodb.Table(this, 'TasksTable', {
             partitionKey: { name: 'taskId', type: dynamodb.AttributeType.STRING },
             billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
             removalPolicy: cdk.RemovalPolicy.DESTROY, // For dev/test only
+            stream: dynamodb.StreamViewType.NEW_IMAGE, // Status changes feed the requester dashboard index/counters
         });
 
         // GSI for querying tasks by requester
@@ -29,6 +41,21 @@ export class DatabaseStack extends cdk.Stack {
             sortKey: { name: 'createdAt', type: dynamodb.AttributeType.STRING },
         });
 
+        if (gsiStage >= 3) {
+            // A requester's tasks by status, newest first ('<status>#<createdAt>',
+            // kept by track_task_status); projects the dashboard's summary fields
+            this.tasksTable.addGlobalSecondaryIndex({
+                indexName: 'RequesterStatusIndex',
+                partitionKey: { name: 'requesterId', type: dynamodb.AttributeType.STRING },
+                sortKey: { name: 'statusCreatedAt', type: dynamodb.AttributeType.STRING },
+                projectionType: dynamodb.ProjectionType.INCLUDE,
+                nonKeyAttributes: [
+                    'createdAt', 'status', 'type', 'batchId', 'requiredLevel',
+                    'requiredSubmissions', 'submissionCount', 'transcriptionStatus',
+                ],
+            });
+        }
+
         // GSI for querying tasks by assigned worker
         this.tasksTable.addGlobalSecondaryIndex({
             indexName: 'AssignedToIndex',
@@ -43,6 +70,25 @@ export class DatabaseStack extends cdk.Stack {
             sortKey: { name: 'createdAt', type: dynamodb.AttributeType.STRING },
         });
 
+        if (gsiStage >= 1) {
+            // Write-sharded status GSI ('<status>#shard<N>'), read with scatter-gather
+            this.tasksTable.addGlobalSecondaryIndex({
+                indexName: 'StatusShardIndex',
+                partitionKey: { name: 'statusShard', type: dynamodb.AttributeType.STRING },
+                sortKey: { name: 'createdAt', type: dynamodb.AttributeType.STRING },
+            });
+        }
+
+        if (gsiStage >= 2) {
+            // Sparse GSI of audio tasks waiting for Transcribe dispatch, by queued time
+            // (requeue_transcriptions resends requests stuck in QUEUED)
+            this.tasksTable.addGlobalSecondaryIndex({
+                indexName: 'TranscriptionQueueIndex',
+                partitionKey: { name: 'transcriptionStatus', type: dynamodb.AttributeType.STRING },
+                sortKey: { name: 'transcriptionQueuedAt', type: dynamodb.AttributeType.STRING },
+            });
+        }
+
         // GSI for querying tasks by batch
         this.tasksTable.addGlobalSecondaryIndex({
             indexName: 'BatchIdIndex',
@@ -96,9 +142,38 @@ export class DatabaseStack extends cdk.Stack {
         this.transactionsTable = new dynamodb.Table(this, 'TransactionsTable', {
             partitionKey: { name: 'transactionId', type: dynamodb.AttributeType.STRING },
             billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+            stream: dynamodb.StreamViewType.NEW_IMAGE, // Payment rows feed worker earnings
             removalPolicy: cdk.RemovalPolicy.DESTROY,
         });
 
+        if (gsiStage >= 1) {
+            // Per-user ledger history, one index per side of a transaction.
+            // Sparse: the platform fee wallet has no fromUserId/toUserId.
+            this.transactionsTable.addGlobalSecondaryIndex({
+                indexName: 'FromUserIndex',
+                partitionKey: { name: 'fromUserId', type: dynamodb.AttributeType.STRING },
+                sortKey: { name: 'createdAt', type: dynamodb.AttributeType.STRING },
+            });
+        }
+
+        if (gsiStage >= 2) {
+            this.transactionsTable.addGlobalSecondaryIndex({
+                indexName: 'ToUserIndex',
+                partitionKey: { name: 'toUserId', type: dynamodb.AttributeType.STRING },
+                sortKey: { name: 'createdAt', type: dynamodb.AttributeType.STRING },
+            });
+        }
+
+        if (gsiStage >= 3) {
+            // Withdrawals by payout status, write-sharded ('<status>#shard<N>').
+            // Sparse: only withdrawal rows have payoutShard.
+            this.transactionsTable.addGlobalSecondaryIndex({
+                indexName: 'PayoutStatusIndex',
+                partitionKey: { name: 'payoutShard', type: dynamodb.AttributeType.STRING },
+                sortKey: { name: 'createdAt', type: dynamodb.AttributeType.STRING },
+            });
+        }
+
         // Assignments Table (worker task assignments)
         this.assignmentsTable = new dynamodb.Table(this, 'AssignmentsTable', {
             partitionKey: { name: 'assignmentId', type: dynamodb.AttributeType.STRING },
@@ -139,5 +214,23 @@ export class DatabaseStack extends cdk.Stack {
             billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
             removalPolicy: cdk.RemovalPolicy.DESTROY,
         });
+
+        // Batches Table (task batches and manifest ingestion progress)
+        this.batchesTable = new dynamodb.Table(this, 'BatchesTable', {
+            partitionKey: { name: 'batchId', type: dynamodb.AttributeType.STRING },
+            billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+            removalPolicy: cdk.RemovalPolicy.DESTROY,
+        });
+
+        // Ledger Snapshots Table (per-user daily aggregates of the ledger,
+        // period 'DAY#YYYY-MM-DD', plus OPENING/DRIFT items for reconciliation
+        // and expiring APPLIED#<transactionId> markers)
+        this.ledgerSnapshotsTable = new dynamodb.Table(this, 'LedgerSnapshotsTable', {
+            partitionKey: { name: 'userId', type: dynamodb.AttributeType.STRING },
+            sortKey: { name: 'period', type: dynamodb.AttributeType.STRING },
+            billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+            timeToLiveAttribute: 'expiresAt',
+            removalPolicy: cdk.RemovalPolicy.DESTROY,
+        });
     }
 }
@@ -20,7 +20,16 @@ interface PythonLambdaStackProps extends cdk.StackProps {
     transactionsTable: dynamodb.Table;
     assignmentsTable: dynamodb.Table;
     workersTable: dynamodb.Table;
+    requestersTable: dynamodb.Table;
+    batchesTable: dynamodb.Table;
+    ledgerSnapshotsTable: dynamodb.Table;
     submissionQueue: sqs.Queue;
+    validationQueue: sqs.Queue;  // FIFO
+    ingestionQueue: sqs.Queue;
+    transcriptionQueue: sqs.Queue;
+    notificationQueue: sqs.Queue;
+    deadLetterQueue: sqs.Queue;  // Stream records that exhausted their retries
+    readyQueues?: { [level: string]: sqs.Queue };  // Optional: queue-backed task dispatch
     disputeStateMachine: sfn.StateMachine;
     mediaBucket?: s3.Bucket;  // Optional: for AI services
 }
@@ -30,10 +39,20 @@ export class PythonLambdaStack extends cdk.Stack {
     public readonly createTaskBatchLambda: lambda.Function;
     public readonly publishTaskBatchLambda: lambda.Function;
     public readonly listTasksLambda: lambda.Function;
+    public readonly trackTaskStatusLambda: lambda.Function;
     public readonly listAvailableTasksLambda: lambda.Function;
     public readonly assignTaskLambda: lambda.Function;
     public readonly processTranscriptionLambda: lambda.Function;
     public readonly expireAssignmentsLambda: lambda.Function;
+    public readonly backfillStatusShardsLambda: lambda.Function;
+    public readonly backfillTaskSlotsLambda: lambda.Function;
+    public readonly backfillTaskCountsLambda: lambda.Function;
+    public readonly backfillLedgerPartiesLambda: lambda.Function;
+    public readonly renewAssignmentLambda: lambda.Function;
+    public readonly ingestManifestLambda: lambda.Function;
+    public readonly dispatchTranscriptionsLambda: lambda.Function;
+    public readonly requeueTranscriptionsLambda: lambda.Function;
+    public readonly getBatchLambda: lambda.Function;
 
     // Submission handlers
     public readonly submitWorkLambda: lambda.Function;
@@ -54,10 +73,17 @@ export class PythonLambdaStack extends cdk.Stack {
     public readonly getWalletLambda: lambda.Function;
     public readonly depositFundsLambda: lambda.Function;
     public readonly withdrawFundsLambda: lambda.Function;
+    public readonly listTransactionsLambda: lambda.Function;
+    public readonly snapshotLedgerLambda: lambda.Function;
+    public readonly reconcileWalletsLambda: lambda.Function;
+    public readonly processPayoutsLambda: lambda.Function;
 
     // Worker/Gamification handlers
     public readonly updateWorkerStatsLambda: lambda.Function;
 
+    // Notification handlers
+    public readonly sendNotificationsLambda: lambda.Function;
+
     constructor(scope: Construct, id: string, props: PythonLambdaStackProps) {
         super(scope, id, props);
 
@@ -70,10 +96,28 @@ export class PythonLambdaStack extends cdk.Stack {
             TRANSACTIONS_TABLE: props.transactionsTable.tableName,
             ASSIGNMENTS_TABLE: props.assignmentsTable.tableName,
             WORKERS_TABLE: props.workersTable.tableName,
+            REQUESTERS_TABLE: props.requestersTable.tableName,
+            BATCHES_TABLE: props.batchesTable.tableName,
+            LEDGER_SNAPSHOTS_TABLE: props.ledgerSnapshotsTable.tableName,
             SUBMISSION_QUEUE_URL: props.submissionQueue.queueUrl,
+            VALIDATION_QUEUE_URL: props.validationQueue.queueUrl,
+            INGESTION_QUEUE_URL: props.ingestionQueue.queueUrl,
+            TRANSCRIPTION_QUEUE_URL: props.transcriptionQueue.queueUrl,
+            NOTIFICATION_QUEUE_URL: props.notificationQueue.queueUrl,
             DISPUTE_STATE_MACHINE_ARN: props.disputeStateMachine.stateMachineArn,
         };
 
+        // Ready queue shards for queue-backed dispatch (DISPATCH_MODE=queue)
+        const readyQueues = Object.values(props.readyQueues ?? {});
+        if (props.readyQueues && props.readyQueues['Novice']) {
+            const shardUrls: { [shard: string]: string } = {};
+            for (const [level, queue] of Object.entries(props.readyQueues)) {
+                shardUrls[level] = queue.queueUrl;
+            }
+            commonEnv.READY_QUEUE_URLS = cdk.Stack.of(this).toJsonString(shardUrls);
+            commonEnv.AVAILABLE_TASKS_QUEUE_URL = props.readyQueues['Novice'].queueUrl;
+        }
+
         // Add MEDIA_BUCKET if provided (for AI services)
         if (props.mediaBucket) {
             commonEnv.MEDIA_BUCKET = props.mediaBucket.bucketName;
@@ -92,7 +136,8 @@ export class PythonLambdaStack extends cdk.Stack {
             id: string,
             handlerPath: string,
             handlerFile: string,
-            additionalEnv?: { [key: string]: string }
+            additionalEnv?: { [key: string]: string },
+            timeout: cdk.Duration = cdk.Duration.seconds(30)
         ): lambda.Function => {
             return new lambda.Function(this, id, {
                 runtime: lambda.Runtime.PYTHON_3_11,
@@ -100,7 +145,7 @@ export class PythonLambdaStack extends cdk.Stack {
                 code: lambda.Code.fromAsset(path.join(__dirname, `../../backend/src/handlers/${handlerPath}`)),
                 environment: { ...commonEnv, ...additionalEnv },
                 layers: [sharedLayer],
-                timeout: cdk.Duration.seconds(30),
+                timeout,
             });
         };
 
@@ -112,15 +157,68 @@ export class PythonLambdaStack extends cdk.Stack {
             'create_task_batch'
         );
         props.tasksTable.grantWriteData(this.createTaskBatchLambda);
+        props.batchesTable.grantWriteData(this.createTaskBatchLambda);
+        props.ingestionQueue.grantSendMessages(this.createTaskBatchLambda);
+        props.transcriptionQueue.grantSendMessages(this.createTaskBatchLambda);  // Audio tasks
+
+        // Manifest ingestion: streams S3 manifests into the tasks table
+        this.ingestManifestLambda = createPythonLambda(
+            'IngestManifestFn',
+            'tasks',
+            'ingest_manifest',
+            undefined,
+            cdk.Duration.minutes(15)
+        );
+        props.tasksTable.grantWriteData(this.ingestManifestLambda);
+        props.batchesTable.grantReadWriteData(this.ingestManifestLambda);
+        props.ingestionQueue.grantSendMessages(this.ingestManifestLambda);  // Continuations
+        props.transcriptionQueue.grantSendMessages(this.ingestManifestLambda);
+        if (props.mediaBucket) {
+            props.mediaBucket.grantRead(this.ingestManifestLambda);
+        }
+        this.ingestManifestLambda.addEventSource(
+            new lambdaEventSources.SqsEventSource(props.ingestionQueue, { batchSize: 1 })
+        );
 
-        // Transcribe permissions for audio task creation
-        this.createTaskBatchLambda.addToRolePolicy(new iam.PolicyStatement({
+        // Transcription dispatcher: starts queued Transcribe jobs at a paced rate
+        // (TRANSCRIBE_START_RATE per instance x maxConcurrency instances)
+        this.dispatchTranscriptionsLambda = createPythonLambda(
+            'DispatchTranscriptionsFn',
+            'tasks',
+            'dispatch_transcriptions'
+        );
+        props.tasksTable.grantWriteData(this.dispatchTranscriptionsLambda);
+        props.transcriptionQueue.grantConsumeMessages(this.dispatchTranscriptionsLambda);  // Backoff via visibility
+        this.dispatchTranscriptionsLambda.addToRolePolicy(new iam.PolicyStatement({
             actions: ['transcribe:StartTranscriptionJob'],
             resources: ['*'],
         }));
         if (props.mediaBucket) {
-            props.mediaBucket.grantRead(this.createTaskBatchLambda);
+            props.mediaBucket.grantReadWrite(this.dispatchTranscriptionsLambda);  // Reads audio, Transcribe writes results
         }
+        this.dispatchTranscriptionsLambda.addEventSource(
+            new lambdaEventSources.SqsEventSource(props.transcriptionQueue, {
+                batchSize: 10,
+                maxConcurrency: 2,
+                reportBatchItemFailures: true,
+            })
+        );
+
+        // Resends Transcribe requests for tasks stuck in QUEUED (lost sends)
+        this.requeueTranscriptionsLambda = createPythonLambda(
+            'RequeueTranscriptionsFn',
+            'tasks',
+            'requeue_transcriptions'
+        );
+        props.tasksTable.grantReadWriteData(this.requeueTranscriptionsLambda);
+        props.transcriptionQueue.grantSendMessages(this.requeueTranscriptionsLambda);
+
+        this.getBatchLambda = createPythonLambda(
+            'GetBatchFn',
+            'tasks',
+            'get_batch'
+        );
+        props.batchesTable.grantReadData(this.getBatchLambda);
 
         this.publishTaskBatchLambda = createPythonLambda(
             'PublishTaskBatchFn',
@@ -129,6 +227,7 @@ export class PythonLambdaStack extends cdk.Stack {
         );
         props.tasksTable.grantReadWriteData(this.publishTaskBatchLambda);
         props.submissionQueue.grantSendMessages(this.publishTaskBatchLambda);
+        readyQueues.forEach(queue => queue.grantSendMessages(this.publishTaskBatchLambda));
 
         this.listTasksLambda = createPythonLambda(
             'ListTasksFn',
@@ -136,6 +235,31 @@ export class PythonLambdaStack extends cdk.Stack {
             'list_tasks'
         );
         props.tasksTable.grantReadData(this.listTasksLambda);
+        props.requestersTable.grantReadData(this.listTasksLambda);
+
+        // Tasks stream: RequesterStatusIndex keys and per-status counters
+        this.trackTaskStatusLambda = createPythonLambda(
+            'TrackTaskStatusFn',
+            'tasks',
+            'track_task_status'
+        );
+        props.tasksTable.grantReadWriteData(this.trackTaskStatusLambda);
+        props.requestersTable.grantReadWriteData(this.trackTaskStatusLambda);
+
+        this.trackTaskStatusLambda.addEventSource(
+            new lambdaEventSources.DynamoEventSource(props.tasksTable, {
+                startingPosition: lambda.StartingPosition.TRIM_HORIZON,
+                batchSize: 100,
+                maxBatchingWindow: cdk.Duration.seconds(1),
+                retryAttempts: 10,
+                reportBatchItemFailures: true,
+                filters: [
+                    lambda.FilterCriteria.filter({
+                        eventName: lambda.FilterRule.or('INSERT', 'MODIFY'),
+                    }),
+                ],
+            })
+        );
 
         this.listAvailableTasksLambda = createPythonLambda(
             'ListAvailableTasksFn',
@@ -152,6 +276,18 @@ export class PythonLambdaStack extends cdk.Stack {
         );
         props.tasksTable.grantReadWriteData(this.assignTaskLambda);
         props.assignmentsTable.grantWriteData(this.assignTaskLambda);
+        props.workersTable.grantReadData(this.assignTaskLambda);  // Level/certifications for matching
+        readyQueues.forEach(queue => queue.grantConsumeMessages(this.assignTaskLambda));
+
+        // Lease heartbeat for long-running assignments
+        this.renewAssignmentLambda = createPythonLambda(
+            'RenewAssignmentFn',
+            'tasks',
+            'renew_assignment'
+        );
+        props.assignmentsTable.grantReadWriteData(this.renewAssignmentLambda);
+        props.tasksTable.grantWriteData(this.renewAssignmentLambda);  // Lease hint on the task
+        readyQueues.forEach(queue => queue.grantConsumeMessages(this.renewAssignmentLambda));  // Extend message visibility
 
         // Process Transcription Handler (triggered by EventBridge)
         this.processTranscriptionLambda = createPythonLambda(
@@ -199,7 +335,6 @@ export class PythonLambdaStack extends cdk.Stack {
         props.tasksTable.grantReadWriteData(this.submitWorkLambda);
         props.submissionsTable.grantWriteData(this.submitWorkLambda);
         props.assignmentsTable.grantReadWriteData(this.submitWorkLambda);
-        props.submissionQueue.grantSendMessages(this.submitWorkLambda);
 
         // ============ QC Handlers ============
 
@@ -240,9 +375,12 @@ export class PythonLambdaStack extends cdk.Stack {
             props.mediaBucket.grantRead(this.validateSubmissionLambda);
         }
 
-        // SQS trigger for QC
+        // SQS trigger for QC (FIFO: batch size is capped at 10)
         this.validateSubmissionLambda.addEventSource(
-            new lambdaEventSources.SqsEventSource(props.submissionQueue)
+            new lambdaEventSources.SqsEventSource(props.validationQueue, {
+                batchSize: 10,
+                reportBatchItemFailures: true,
+            })
         );
 
         // ============ Dispute Handlers ============
@@ -272,21 +410,33 @@ export class PythonLambdaStack extends cdk.Stack {
             'process_payment'
         );
         props.tasksTable.grantReadData(this.processPaymentLambda);
+        props.submissionsTable.grantWriteData(this.processPaymentLambda);  // Mark failed payments
         props.walletTable.grantReadWriteData(this.processPaymentLambda);
-        props.transactionsTable.grantWriteData(this.processPaymentLambda);
-
-        // Allow SES for notifications
-        this.processPaymentLambda.addToRolePolicy(new iam.PolicyStatement({
-            actions: ['ses:SendEmail'],
-            resources: ['*'],
-        }));
-
-        // DynamoDB Stream trigger for payments (when submission approved)
+        props.transactionsTable.grantReadWriteData(this.processPaymentLambda);  // Ledger rows double as idempotency keys
+        props.notificationQueue.grantSendMessages(this.processPaymentLambda);  // Emails go through the outbox
+
+        // DynamoDB Stream trigger for payments (when submission approved).
+        // Larger, windowed batches give batch settlement more to net together;
+        // ledger IDs derived from submissionId make retried records no-ops,
+        // so shards can also be processed in parallel. A failing batch is
+        // split to isolate the bad record, and records that still fail are
+        // sent to the dead-letter queue rather than dropped.
         this.processPaymentLambda.addEventSource(
             new lambdaEventSources.DynamoEventSource(props.submissionsTable, {
                 startingPosition: lambda.StartingPosition.TRIM_HORIZON,
-                batchSize: 10,
+                batchSize: 100,
+                maxBatchingWindow: cdk.Duration.seconds(5),
+                parallelizationFactor: 4,
                 retryAttempts: 3,
+                bisectBatchOnError: true,
+                reportBatchItemFailures: true,
+                onFailure: new lambdaEventSources.SqsDlq(props.deadLetterQueue),
+                filters: [
+                    lambda.FilterCriteria.filter({
+                        eventName: lambda.FilterRule.isEqual('MODIFY'),
+                        dynamodb: { NewImage: { status: { S: lambda.FilterRule.isEqual('Approved') } } },
+                    }),
+                ],
             })
         );
 
@@ -305,7 +455,7 @@ export class PythonLambdaStack extends cdk.Stack {
             'deposit_funds'
         );
         props.walletTable.grantReadWriteData(this.depositFundsLambda);
-        props.transactionsTable.grantWriteData(this.depositFundsLambda);
+        props.transactionsTable.grantReadWriteData(this.depositFundsLambda);  // Reads the original row of a replayed deposit
 
         this.withdrawFundsLambda = createPythonLambda(
             'WithdrawFundsFn',
@@ -314,11 +464,81 @@ export class PythonLambdaStack extends cdk.Stack {
         );
         props.walletTable.grantReadWriteData(this.withdrawFundsLambda);
         props.transactionsTable.grantWriteData(this.withdrawFundsLambda);
-        // SES permission for email notifications
-        this.withdrawFundsLambda.addToRolePolicy(new iam.PolicyStatement({
+        props.notificationQueue.grantSendMessages(this.withdrawFundsLambda);  // Emails go through the outbox
+
+        this.listTransactionsLambda = createPythonLambda(
+            'ListTransactionsFn',
+            'wallet',
+            'list_transactions'
+        );
+        props.transactionsTable.grantReadData(this.listTransactionsLambda);  // Ledger history indexes
+
+        // Per-user daily ledger aggregates, maintained from the Transactions stream
+        this.snapshotLedgerLambda = createPythonLambda(
+            'SnapshotLedgerFn',
+            'wallet',
+            'snapshot_ledger'
+        );
+        props.ledgerSnapshotsTable.grantReadWriteData(this.snapshotLedgerLambda);
+        this.snapshotLedgerLambda.addEventSource(
+            new lambdaEventSources.DynamoEventSource(props.transactionsTable, {
+                startingPosition: lambda.StartingPosition.TRIM_HORIZON,
+                batchSize: 100,
+                retryAttempts: 10,
+                reportBatchItemFailures: true,
+                filters: [
+                    lambda.FilterCriteria.filter({
+                        eventName: lambda.FilterRule.isEqual('INSERT'),
+                    }),
+                ],
+            })
+        );
+
+        // Daily balance audit against the snapshots
+        this.reconcileWalletsLambda = createPythonLambda(
+            'ReconcileWalletsFn',
+            'wallet',
+            'reconcile_wallets',
+            undefined,
+            cdk.Duration.minutes(15)
+        );
+        props.walletTable.grantReadData(this.reconcileWalletsLambda);
+        props.ledgerSnapshotsTable.grantReadWriteData(this.reconcileWalletsLambda);  // OPENING/DRIFT items
+
+        // Pays out pending withdrawals in batches, once per batching window
+        const payoutWindowMinutes = 15;
+        this.processPayoutsLambda = createPythonLambda(
+            'ProcessPayoutsFn',
+            'wallet',
+            'process_payouts',
+            { PAYOUT_BATCH_WINDOW_MINUTES: String(payoutWindowMinutes) },
+            cdk.Duration.minutes(5)
+        );
+        props.transactionsTable.grantReadWriteData(this.processPayoutsLambda);  // Payout status transitions, reversal rows
+        props.walletTable.grantReadWriteData(this.processPayoutsLambda);  // Failed payouts are credited back
+        props.notificationQueue.grantSendMessages(this.processPayoutsLambda);  // Failed payout notices go through the outbox
+
+        // ============ Notification Handlers ============
+
+        // Drains the notification outbox: coalesces each user's intents per
+        // batch and sends them through SES at a paced rate
+        this.sendNotificationsLambda = createPythonLambda(
+            'SendNotificationsFn',
+            'notifications',
+            'send_notifications'
+        );
+        this.sendNotificationsLambda.addToRolePolicy(new iam.PolicyStatement({
             actions: ['ses:SendEmail'],
             resources: ['*'],
         }));
+        this.sendNotificationsLambda.addEventSource(
+            new lambdaEventSources.SqsEventSource(props.notificationQueue, {
+                batchSize: 100,
+                maxBatchingWindow: cdk.Duration.minutes(5),
+                maxConcurrency: 2,
+                reportBatchItemFailures: true,
+            })
+        );
 
         // ============ Worker/Gamification Handlers ============
 
@@ -328,18 +548,43 @@ export class PythonLambdaStack extends cdk.Stack {
             'update_worker_stats'
         );
         props.workersTable.grantReadWriteData(this.updateWorkerStatsLambda);
-        props.tasksTable.grantReadData(this.updateWorkerStatsLambda);
 
-        // DynamoDB Stream trigger: process Approved/Rejected submissions
+        // Outbox relay: new Pending submissions -> FIFO validation queue
+        props.validationQueue.grantSendMessages(this.updateWorkerStatsLambda);
+
+        // DynamoDB Stream trigger: relay new Pending submissions and process
+        // Approved/Rejected ones. One reader for both, since a stream shard
+        // serves at most two Lambda readers.
         this.updateWorkerStatsLambda.addEventSource(
             new lambdaEventSources.DynamoEventSource(props.submissionsTable, {
                 startingPosition: lambda.StartingPosition.TRIM_HORIZON,
-                batchSize: 10,
-                retryAttempts: 3,
+                batchSize: 100,
+                maxBatchingWindow: cdk.Duration.seconds(1),
+                retryAttempts: 10,
+                reportBatchItemFailures: true,
                 filters: [
                     lambda.FilterCriteria.filter({
                         eventName: lambda.FilterRule.isEqual('MODIFY'),
                     }),
+                    lambda.FilterCriteria.filter({
+                        eventName: lambda.FilterRule.isEqual('INSERT'),
+                        dynamodb: { NewImage: { status: { S: lambda.FilterRule.isEqual('Pending') } } },
+                    }),
+                ],
+            })
+        );
+
+        // Transactions stream trigger: earnings from recorded worker payments
+        this.updateWorkerStatsLambda.addEventSource(
+            new lambdaEventSources.DynamoEventSource(props.transactionsTable, {
+                startingPosition: lambda.StartingPosition.TRIM_HORIZON,
+                batchSize: 100,
+                retryAttempts: 3,
+                filters: [
+                    lambda.FilterCriteria.filter({
+                        eventName: lambda.FilterRule.isEqual('INSERT'),
+                        dynamodb: { NewImage: { type: { S: lambda.FilterRule.isEqual('TASK_PAYMENT') } } },
+                    }),
                 ],
             })
         );
@@ -372,18 +617,92 @@ export class PythonLambdaStack extends cdk.Stack {
         props.assignmentsTable.grantReadWriteData(this.expireAssignmentsLambda);
         props.tasksTable.grantReadWriteData(this.expireAssignmentsLambda);
 
+        // ============ Migrations (invoked on demand) ============
+
+        // statusShard for tasks written before StatusShardIndex; set
+        // STATUS_SHARD_READS=true once it reports done
+        this.backfillStatusShardsLambda = createPythonLambda(
+            'BackfillStatusShardsFn',
+            'tasks',
+            'backfill_status_shards',
+            undefined,
+            cdk.Duration.minutes(15)
+        );
+        props.tasksTable.grantReadWriteData(this.backfillStatusShardsLambda);
+
+        this.backfillTaskSlotsLambda = createPythonLambda(
+            'BackfillTaskSlotsFn',
+            'tasks',
+            'backfill_task_slots',
+            undefined,
+            cdk.Duration.minutes(15)
+        );
+        props.tasksTable.grantReadWriteData(this.backfillTaskSlotsLambda);
+
+        // Run after TrackTaskStatusFn is deployed; set REQUESTER_STATUS_READS=true
+        // once it reports done
+        this.backfillTaskCountsLambda = createPythonLambda(
+            'BackfillTaskCountsFn',
+            'tasks',
+            'backfill_task_counts',
+            undefined,
+            cdk.Duration.minutes(15)
+        );
+        props.tasksTable.grantReadWriteData(this.backfillTaskCountsLambda);
+        props.requestersTable.grantReadWriteData(this.backfillTaskCountsLambda);
+
+        // Run after FromUserIndex/ToUserIndex are deployed (gsiStage 2)
+        this.backfillLedgerPartiesLambda = createPythonLambda(
+            'BackfillLedgerPartiesFn',
+            'wallet',
+            'backfill_ledger_parties',
+            undefined,
+            cdk.Duration.minutes(15)
+        );
+        props.transactionsTable.grantReadWriteData(this.backfillLedgerPartiesLambda);
+
         // ============ EventBridge Scheduled Rules ============
 
         // Rule: Expire stale assignments every 1 minute
         new events.Rule(this, 'ExpireAssignmentsRule', {
             ruleName: 'expire-stale-assignments',
-            description: 'Expire task assignments older than 10 minutes',
+            description: 'Expire task assignments whose lease has lapsed',
             schedule: events.Schedule.rate(cdk.Duration.minutes(1)),
             targets: [new targets.LambdaFunction(this.expireAssignmentsLambda, {
                 retryAttempts: 2,
             })],
         });
 
+        // Rule: Resend transcription requests that never reached the queue
+        new events.Rule(this, 'RequeueTranscriptionsRule', {
+            ruleName: 'requeue-stuck-transcriptions',
+            description: 'Resend Transcribe requests for tasks stuck in QUEUED',
+            schedule: events.Schedule.rate(cdk.Duration.minutes(15)),
+            targets: [new targets.LambdaFunction(this.requeueTranscriptionsLambda, {
+                retryAttempts: 2,
+            })],
+        });
+
+        // Rule: Reconcile wallet balances with the ledger daily
+        new events.Rule(this, 'ReconcileWalletsRule', {
+            ruleName: 'reconcile-wallets-daily',
+            description: 'Check wallet balances against ledger snapshots',
+            schedule: events.Schedule.rate(cdk.Duration.hours(24)),
+            targets: [new targets.LambdaFunction(this.reconcileWalletsLambda, {
+                retryAttempts: 2,
+            })],
+        });
+
+        // Rule: Batch pending withdrawals into payouts
+        new events.Rule(this, 'ProcessPayoutsRule', {
+            ruleName: 'process-withdrawal-payouts',
+            description: 'Send pending withdrawals to the payouts provider in batches',
+            schedule: events.Schedule.rate(cdk.Duration.minutes(payoutWindowMinutes)),
+            targets: [new targets.LambdaFunction(this.processPayoutsLambda, {
+                retryAttempts: 2,
+            })],
+        });
+
         // Rule: Auto-resolve disputes daily
         new events.Rule(this, 'AutoResolveDisputesRule', {
             ruleName: 'auto-resolve-disputes-daily',
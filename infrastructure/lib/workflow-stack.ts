@@ -18,6 +18,11 @@ interface WorkflowStackProps extends cdk.StackProps {
 
 export class WorkflowStack extends cdk.Stack {
     public readonly submissionQueue: sqs.Queue;
+    public readonly validationQueue: sqs.Queue;
+    public readonly readyQueues: { [level: string]: sqs.Queue };
+    public readonly ingestionQueue: sqs.Queue;
+    public readonly transcriptionQueue: sqs.Queue;
+    public readonly notificationQueue: sqs.Queue;
     public readonly deadLetterQueue: sqs.Queue;
     public readonly disputeStateMachine: sfn.StateMachine;
     public readonly adminNotificationTopic: sns.Topic;
@@ -39,6 +44,64 @@ export class WorkflowStack extends cdk.Stack {
             },
         });
 
+        // FIFO QC queue fed from the Submissions stream (one message per
+        // submission: deduplicated by submissionId, grouped by taskId)
+        this.validationQueue = new sqs.Queue(this, 'ValidationQueue', {
+            fifo: true,
+            visibilityTimeout: cdk.Duration.seconds(300),
+            deadLetterQueue: {
+                queue: new sqs.Queue(this, 'ValidationDeadLetterQueue', {
+                    fifo: true,
+                    retentionPeriod: cdk.Duration.days(14),
+                }),
+                maxReceiveCount: 3,
+            },
+        });
+
+        // Ready queues for queue-backed task dispatch, sharded by required level.
+        // Visibility timeout is set per receive to the assignment lease.
+        // No redrive: messages skipped by ineligible workers or re-offered for
+        // further slots are received many times while their task is still
+        // Published; stale messages are deleted by the claim path instead.
+        this.readyQueues = {};
+        for (const level of ['Novice', 'Intermediate', 'Expert']) {
+            this.readyQueues[level] = new sqs.Queue(this, `ReadyTasks${level}Queue`, {
+                retentionPeriod: cdk.Duration.days(14),
+            });
+        }
+
+        // Manifest ingestion jobs (one message per manifest or continuation).
+        // Visibility covers the 15-minute ingestion Lambda timeout.
+        this.ingestionQueue = new sqs.Queue(this, 'IngestionQueue', {
+            visibilityTimeout: cdk.Duration.minutes(16),
+            deadLetterQueue: {
+                queue: this.deadLetterQueue,
+                maxReceiveCount: 3,
+            },
+        });
+
+        // Transcribe job requests, drained by the transcription dispatcher.
+        // Throttled requests are redelivered with backoff, hence the high receive count.
+        this.transcriptionQueue = new sqs.Queue(this, 'TranscriptionQueue', {
+            visibilityTimeout: cdk.Duration.seconds(180),
+            retentionPeriod: cdk.Duration.days(4),
+            deadLetterQueue: {
+                queue: this.deadLetterQueue,
+                maxReceiveCount: 25,
+            },
+        });
+
+        // Notification intents (email outbox), drained in batches by the
+        // notification sender. Deferred sends are redelivered, so allow a few.
+        this.notificationQueue = new sqs.Queue(this, 'NotificationQueue', {
+            visibilityTimeout: cdk.Duration.minutes(6),
+            retentionPeriod: cdk.Duration.days(4),
+            deadLetterQueue: {
+                queue: this.deadLetterQueue,
+                maxReceiveCount: 10,
+            },
+        });
+
         // SNS Topic for admin notifications
         this.adminNotificationTopic = new sns.Topic(this, 'AdminNotificationTopic', {
             topicName: 'dispute-admin-notifications',